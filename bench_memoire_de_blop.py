@@ -0,0 +1,489 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks des chemins chauds de memoire_de_blop.py.
+
+Exécution headless sur images synthétiques ; résultats en JSON.
+
+    python3 bench_memoire_de_blop.py                          # affiche les résultats
+    python3 bench_memoire_de_blop.py --output bench.json      # les écrit dans un fichier
+    python3 bench_memoire_de_blop.py --compare bench_baseline.json
+    python3 bench_memoire_de_blop.py --update-baseline bench_baseline.json
+
+Avec --compare, le code de sortie est 1 si le temps médian d'une mesure
+dépasse sa référence multipliée par --tolerance. Les références sont d'abord
+mises à l'échelle de la machine : une charge fixe (`reference_ms`) est mesurée
+à chaque exécution et le rapport entre les deux exécutions corrige les temps. Sans serveur d'affichage, les objets Tk
+(PhotoImage, canvas, label) sont remplacés par des objets nuls : on mesure
+alors le travail Python/PIL/NumPy, pas le coût de Tk.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from unittest import mock
+
+import numpy as np
+from mss.screenshot import ScreenShot
+from PIL import Image, ImageDraw
+
+import memoire_de_blop as mdb
+
+QUAD = [(1026, 310), (1494, 542), (1216, 687), (748, 447)]
+
+
+# ------------------ Mesure ------------------
+def measure(fn, repeat: int = 20, warmup: int = 2):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    return {
+        "median_ms": statistics.median(samples),
+        "min_ms": min(samples),
+        "runs": repeat,
+    }
+
+
+class Results:
+    def __init__(self):
+        self.entries = {}
+
+    def add(self, name: str, timing, **params):
+        self.entries[name] = dict(timing, params=params)
+        print(f"{name:<48} {timing['median_ms']:10.3f} ms (min {timing['min_ms']:.3f})", file=sys.stderr)
+
+
+# ------------------ Tk réel ou nul ------------------
+class _NullPhoto:
+    def __init__(self, image=None, **kw):
+        self.size = image.size if image is not None else (kw.get("width", 0), kw.get("height", 0))
+
+    def width(self):
+        return self.size[0]
+
+    def height(self):
+        return self.size[1]
+
+    def paste(self, image):
+        return None
+
+
+class _NullTk:
+    def call(self, *args):
+        return None
+
+
+class _NullWidget:
+    """Canvas/label/root minimal : accepte les appels Tk utilisés par l'application."""
+
+    def __init__(self):
+        self.tk = _NullTk()
+        self._ids = 0
+
+    def _next(self, *args, **kw):
+        self._ids += 1
+        return self._ids
+
+    create_image = create_rectangle = _next
+
+    def after(self, ms, fn=None, *args):
+        return self._next()
+
+    def _noop(self, *args, **kw):
+        return None
+
+    itemconfig = itemconfigure = coords = delete = config = configure = tag_lower = tag_raise = after_cancel = _noop
+
+
+@contextmanager
+def tk_backend():
+    """Fournit (root, canvas, label) réels si un affichage est disponible, nuls sinon."""
+    root = None
+    try:
+        root = mdb.tk.Tk()
+        root.withdraw()
+    except Exception:
+        root = None
+    if root is not None:
+        try:
+            yield "tk", root, mdb.tk.Canvas(root), mdb.tk.Label(root)
+        finally:
+            root.destroy()
+        return
+    saved = mdb.ImageTk
+    mdb.ImageTk = type("NullImageTk", (), {"PhotoImage": _NullPhoto})
+    try:
+        yield "null", _NullWidget(), _NullWidget(), _NullWidget()
+    finally:
+        mdb.ImageTk = saved
+
+
+@contextmanager
+def headless_app(root, canvas, label, n: int = 3, m: int = 5, display_cell: int = 60):
+    """QuadGridNodesApp construite par son vrai constructeur, sans fenêtre.
+
+    Tk et ttk sont remplacés par des doubles le temps de la construction (source
+    synthétique, sans calibration mémorisée ni écoute clavier), puis root, canvas
+    et label par ceux du banc. L'application est fermée par on_quit à la sortie.
+    """
+    saved_warm_start = mdb.CONFIG["warm_start"]
+    mdb.CONFIG["warm_start"] = False
+    try:
+        with mock.patch.object(mdb, "tk", mock.MagicMock(TclError=Exception)), \
+                mock.patch.object(mdb, "ttk", mock.MagicMock()), \
+                mock.patch.object(mdb.QuadGridNodesApp, "start_keyboard_listener"):
+            app = mdb.QuadGridNodesApp(frame_source=mdb.SyntheticFrameSource())
+    finally:
+        mdb.CONFIG["warm_start"] = saved_warm_start
+    stub_root = app.root
+    app.root, app.canvas, app.click_map_label = root, canvas, label
+    app.status = app.memory_label = app.preview_label = None
+    app.engine.configure_grid(QUAD, n, m)
+    app.display_cell = display_cell
+    try:
+        yield app
+    finally:
+        app.root = stub_root
+        app.on_quit()
+
+
+def synthetic_sequence(source, monitor, frames: int = 10) -> mdb.TileFrames:
+    seq = mdb.TileFrames(frames, monitor["height"], monitor["width"])
+    for tick in range(frames):
+        seq.append(np.asarray(source.render(monitor, tick)), float(tick))
+    return seq
+
+
+class _BufferedMss:
+    """Instance mss factice : grab() rend un ScreenShot sur le buffer BGRA (préparé une
+    fois par zone) d'une image, comme après la copie écran -> mémoire faite par l'OS."""
+
+    def __init__(self, img: Image.Image):
+        rgba = np.asarray(img.convert("RGBA"))
+        self.screen = np.ascontiguousarray(rgba[..., [2, 1, 0, 3]])
+        screen = {"left": 0, "top": 0, "width": img.width, "height": img.height}
+        self.monitors = [dict(screen), dict(screen)]
+        self._buffers = {}
+
+    def grab(self, monitor):
+        key = mdb._monitor_key(monitor)
+        left, top, width, height = key
+        if key not in self._buffers:
+            self._buffers[key] = bytearray(self.screen[top:top + height, left:left + width].tobytes())
+        return ScreenShot(self._buffers[key], monitor)
+
+
+def mss_source(img: Image.Image) -> "mdb.MssFrameSource":
+    """MssFrameSource branché sur _BufferedMss : le chemin mss -> stockage, sans écran."""
+    fake = _BufferedMss(img)
+    source = mdb.MssFrameSource.__new__(mdb.MssFrameSource)
+    mdb.FrameSource.__init__(source)
+    source._sct = lambda: fake
+    source.monitors = fake.monitors
+    return source
+
+
+def synthetic_board(width: int, height: int, n: int = 3, m: int = 5):
+    """Capture d'écran factice : fond bruité, panneaux d'interface et plateau isométrique
+    de (m+1) × (n+1) tuiles. Retourne (image, contour du plateau)."""
+    rng = np.random.default_rng(0)
+    noise = rng.normal(80, 12, (height // 8, width // 8, 3)).clip(0, 255).astype(np.uint8)
+    img = Image.fromarray(noise).resize((width, height), Image.BILINEAR)
+    draw = ImageDraw.Draw(img)
+    draw.rectangle([0, int(height * 0.88), width, height], fill=(40, 40, 48))
+    side = width * 0.05
+    ux, uy = np.cos(np.radians(26.565)), np.sin(np.radians(26.565))
+    top = np.array([width * 0.58 - (m + 1 - n - 1) * side * ux / 2, height * 0.46 - (m + n + 2) * side * uy / 2])
+    u, v = np.array([ux, uy]) * side, np.array([-ux, uy]) * side
+    for j in range(n + 1):
+        for i in range(m + 1):
+            origin = top + i * u + j * v
+            tile = [tuple(origin), tuple(origin + u), tuple(origin + u + v), tuple(origin + v)]
+            draw.polygon(tile, fill=tuple(int(c) for c in rng.integers(120, 230, 3)), outline=(40, 30, 20))
+    outer = [top, top + (m + 1) * u, top + (m + 1) * u + (n + 1) * v, top + (n + 1) * v]
+    return img, [tuple(map(float, p)) for p in outer]
+
+
+def reference_workload():
+    """Charge fixe Python + NumPy : étalon de vitesse de la machine pour --compare."""
+    total = 0
+    for k in range(20000):
+        total += k * k
+    array = np.arange(256 * 256, dtype=np.float64).reshape(256, 256)
+    for _ in range(10):
+        array = np.sqrt(array * 1.0001 + 1.0)
+    return total, float(array.sum())
+
+
+# ------------------ Benchmarks ------------------
+def bench_grid(results: Results):
+    rng = random.Random(0)
+    for n, m in ((3, 5), (10, 10), (30, 30), (100, 100)):
+        results.add(f"grid.intersections[{n}x{m}]",
+                    measure(lambda: mdb.grid_intersections_in_quad(*QUAD, n, m)), n=n, m=m)
+        grid = mdb.grid_intersections_in_quad(*QUAD, n, m)
+        index = mdb.QuadGridIndex(QUAD, n, m)
+        clicks = [(rng.uniform(748, 1494), rng.uniform(310, 687)) for _ in range(1000)]
+        results.add(f"grid.closest_point[{n}x{m}]",
+                    measure(lambda: mdb.closest_point_with_indices(grid, clicks[0])), n=n, m=m)
+        results.add(f"grid.index_lookup[{n}x{m}]",
+                    measure(lambda: index.lookup(clicks[0])), n=n, m=m)
+        results.add(f"grid.index_batch_1000[{n}x{m}]",
+                    measure(lambda: index.lookup_many(clicks)), n=n, m=m, clicks=len(clicks))
+
+
+def bench_capture(results: Results):
+    source = mdb.SyntheticFrameSource()
+    frames = mdb.CONFIG["capture_frames"]
+    # Buffer BGRA de mss -> TileFrames RGB : conversion et copie comprises.
+    screen = mss_source(source.render(source.monitors[0], 0))
+    for cell in (100, 200, 400, 800):
+        monitor = {"left": 300, "top": 200, "width": cell, "height": cell}
+
+        def convert_and_store():
+            seq = mdb.TileFrames(frames, cell, cell)
+            for _ in range(frames):
+                seq.append(screen.grab_array(monitor))
+            return seq
+
+        results.add(f"capture.convert_store[{cell}px]", measure(convert_and_store), cell=cell, frames=frames)
+    window = {"left": 0, "top": 0, "width": 1280, "height": 720}
+    results.add("capture.window_image[1280x720]", measure(lambda: screen.grab(window)), width=1280, height=720)
+
+    for cell in (200, 400):
+        seq = synthetic_sequence(source, {"left": 0, "top": 0, "width": cell, "height": cell})
+        encoded = mdb.DeltaFrames.encode(seq)
+        results.add(f"capture.delta_encode[{cell}px]", measure(lambda: mdb.DeltaFrames.encode(seq)),
+                    cell=cell, raw_bytes=seq.nbytes, encoded_bytes=encoded.nbytes, entries=len(encoded.durations))
+
+    engine = mdb.CaptureEngine(source)
+    try:
+        for tiles in (1, 3, 10):
+            def tick():
+                jobs = [
+                    mdb.CaptureJob((0, k), {"left": 100 + 150 * k, "top": 200, "width": 200, "height": 200},
+                                   1, None)
+                    for k in range(tiles)
+                ]
+                engine._tick(jobs, 0.0)
+            results.add(f"capture.engine_tick[{tiles} tuiles]", measure(tick), tiles=tiles, cell=200)
+    finally:
+        engine.stop()
+
+
+def bench_resize(results: Results):
+    source = mdb.SyntheticFrameSource()
+    for cell, display in ((200, 60), (200, 150), (400, 60)):
+        seq = synthetic_sequence(source, {"left": 0, "top": 0, "width": cell, "height": cell})
+        for quality in mdb.RESAMPLE_TIERS:
+            results.add(f"resize.sequence[{cell}->{display},{quality}]",
+                        measure(lambda: mdb.resize_sequence(seq, display, quality)),
+                        cell=cell, display=display, quality=quality)
+    # Aperçu de configuration (25 %) et base de la carte des clics d'une fenêtre 4K.
+    window, _ = synthetic_board(3840, 2160)
+    for quality in mdb.RESAMPLE_TIERS:
+        results.add(f"resize.preview[3840x2160->25%,{quality}]",
+                    measure(lambda: mdb.downscale(window, (960, 540), preview=True, quality=quality), repeat=5),
+                    quality=quality)
+    # Capture réduite à la source (200 px affichés à 60 px : facteur 3) contre la capture pleine.
+    screen = mss_source(source.render(source.monitors[0], 0))
+    monitor = {"left": 300, "top": 200, "width": 200, "height": 200}
+    for reduce in (1, 3):
+        def capture_and_resize():
+            job = mdb.CaptureJob((0, 0), monitor, mdb.CONFIG["capture_frames"], None, reduce=reduce)
+            for _ in range(job.frame_count):
+                job.append(screen.grab_array(monitor), 0.0)
+            return mdb.resize_sequence(job.frames, 60)
+
+        results.add(f"resize.capture_reduce[200->60,x{reduce}]", measure(capture_and_resize), reduce=reduce)
+    # Pool de processus déjà démarré : transfert par mémoire partagée + redimensionnement, aller-retour.
+    pool = mdb.ImageProcessPool(2)
+    try:
+        for future in pool.ready:
+            future.result()
+        seq = mdb.DeltaFrames.encode(synthetic_sequence(source, {"left": 0, "top": 0, "width": 200, "height": 200}))
+        results.add("resize.process_pool[200->60]",
+                    measure(lambda: pool.resize(seq, 60).result()), cell=200, display=60, workers=pool.workers)
+    finally:
+        pool.shutdown()
+
+
+def bench_match(results: Results):
+    source = mdb.SyntheticFrameSource()
+    for cell in (200, 400):
+        seq = synthetic_sequence(source, {"left": 0, "top": 0, "width": cell, "height": cell})
+        results.add(f"match.signature[{cell}px]", measure(lambda: mdb.sequence_signature(seq)), cell=cell)
+    rng = random.Random(2)
+    for tiles in (100, 1000):
+        index = mdb.TileSignatureIndex()
+        for k in range(tiles):
+            index.add((k // 100, k % 100), (rng.getrandbits(24) << 64) | rng.getrandbits(64))
+        signature = (rng.getrandbits(24) << 64) | rng.getrandbits(64)
+        results.add(f"match.index_add[{tiles} tuiles]",
+                    measure(lambda: index.add((999, 999), signature)), tiles=tiles)
+
+
+def bench_calibrate(results: Results):
+    for width, height in ((1920, 1080), (3840, 2160)):
+        img, _ = synthetic_board(width, height)
+        results.add(f"calibrate.detect[{width}x{height}]",
+                    measure(lambda: mdb.detect_board_quad(img), repeat=5), width=width, height=height)
+
+    # Lancement : capture + détection + grille, contre la reprise d'une calibration mémorisée.
+    saved_path = mdb.CONFIG["calibration_cache"]
+    with tempfile.TemporaryDirectory() as tmp:
+        mdb.CONFIG["calibration_cache"] = os.path.join(tmp, "calibrations.json")
+        engine = mdb.MemoryEngine(mdb.SyntheticFrameSource())
+        engine.target_window_title = "bench"
+
+        def cold_start():
+            engine.capture_target_window_image()
+            engine.board_quad = None
+            if not engine.calibrate():
+                engine.points = engine.load_points_from_ratios()
+            engine.configure_grid()
+
+        results.add("calibrate.cold_start[1920x1080]", measure(cold_start, repeat=5))
+        engine.remember_calibration()
+        engine.calibrations = mdb.CalibrationCache(mdb.CONFIG["calibration_cache"])
+        results.add("calibrate.warm_start[1920x1080]", measure(engine.warm_start))
+        engine.close()
+    mdb.CONFIG["calibration_cache"] = saved_path
+
+
+def bench_click_map(results: Results, backend):
+    kind, root, canvas, label = backend
+    with headless_app(root, canvas, label) as app:
+        app.engine.initial_img = Image.new("RGB", (1920, 1080), (40, 60, 80))
+        app.engine.original_w, app.engine.original_h = app.engine.initial_img.size
+        rng = random.Random(1)
+        for history in (1, 100, 1000):
+            while len(app.engine.click_history) < history:
+                app.engine.click_history.append({
+                    "index": len(app.engine.click_history) + 1,
+                    "relative_point": (rng.randrange(1920), rng.randrange(1080)),
+                })
+                app.update_click_map_preview()
+
+            def add_click():
+                app.engine.click_history.append({
+                    "index": len(app.engine.click_history) + 1,
+                    "relative_point": (rng.randrange(1920), rng.randrange(1080)),
+                })
+                app.update_click_map_preview()
+                app.engine.click_history.pop()
+                app._click_map_drawn -= 1
+
+            results.add(f"click_map.update[{history} clics]", measure(add_click), history=history, tk=kind)
+
+
+def bench_animation(results: Results, backend):
+    kind, root, canvas, label = backend
+    source = mdb.SyntheticFrameSource()
+    for composite in (False, True):
+        for side in (4, 10, 20):
+            with headless_app(root, canvas, label, n=side - 1, m=side - 1, display_cell=40) as app:
+                if composite:
+                    app.tile_renderer = mdb.CompositeTileRenderer(canvas, side, side, 40)
+                for j in range(side):
+                    for i in range(side):
+                        seq = synthetic_sequence(source, {"left": i * 40, "top": j * 40, "width": 120, "height": 120})
+                        app._show_tile((j, i), mdb.resize_sequence(seq, 40))
+                mode = "composite" if composite else "photos"
+                results.add(f"animation.tick[{mode},{side * side} tuiles]",
+                            measure(app._animation_loop, repeat=30), tiles=side * side, renderer=mode, tk=kind)
+
+
+# ------------------ Comparaison ------------------
+def compare(current, baseline, tolerance: float, floor_ms: float) -> int:
+    """Compte les mesures plus lentes que référence × tolerance (et d'au moins floor_ms).
+
+    On compare le temps médian (median_ms), celui qu'affiche chaque ligne du banc,
+    après avoir ramené la référence à la vitesse de la machine courante
+    (rapport des `reference_ms` des deux exécutions) ; --tolerance et --floor-ms
+    absorbent le bruit restant.
+    """
+    scale = 1.0
+    if baseline.get("reference_ms") and current.get("reference_ms"):
+        scale = current["reference_ms"] / baseline["reference_ms"]
+    failures = 0
+    for name, ref in baseline.get("results", {}).items():
+        cur = current["results"].get(name)
+        if cur is None:
+            continue
+        expected = ref["median_ms"] * scale
+        limit = max(expected * tolerance, expected + floor_ms)
+        if cur["median_ms"] > limit:
+            failures += 1
+            print(f"RÉGRESSION {name}: médiane {cur['median_ms']:.3f} ms > {limit:.3f} ms "
+                  f"(référence {expected:.3f} ms à cette vitesse)", file=sys.stderr)
+    return failures
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="fichier JSON de résultats (défaut : stdout)")
+    parser.add_argument("--compare", metavar="BASELINE", help="échoue si une mesure régresse par rapport à ce fichier")
+    parser.add_argument("--tolerance", type=float, default=2.0, help="facteur de tolérance pour --compare")
+    parser.add_argument("--floor-ms", type=float, default=0.25,
+                        help="écart absolu minimal (ms) pour signaler une régression")
+    parser.add_argument("--update-baseline", metavar="BASELINE", help="écrit les résultats comme nouvelle référence")
+    parser.add_argument("--only", help="ne lance que les groupes listés "
+                                       "(grid,capture,resize,match,calibrate,click_map,animation)")
+    args = parser.parse_args(argv)
+
+    reference = measure(reference_workload)
+    print(f"{'référence machine':<48} {reference['median_ms']:10.3f} ms", file=sys.stderr)
+    groups = set((args.only or "grid,capture,resize,match,calibrate,click_map,animation").split(","))
+    results = Results()
+    with tk_backend() as backend:
+        if "grid" in groups:
+            bench_grid(results)
+        if "capture" in groups:
+            bench_capture(results)
+        if "resize" in groups:
+            bench_resize(results)
+        if "match" in groups:
+            bench_match(results)
+        if "calibrate" in groups:
+            bench_calibrate(results)
+        if "click_map" in groups:
+            bench_click_map(results, backend)
+        if "animation" in groups:
+            bench_animation(results, backend)
+        tk_kind = backend[0]
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "tk": tk_kind,
+        "reference_ms": reference["median_ms"],
+        "results": results.entries,
+    }
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text)
+    if args.update_baseline:
+        with open(args.update_baseline, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        if compare(report, baseline, args.tolerance, args.floor_ms):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -15,223 +15,3484 @@ if hasattr(ctypes, "windll"):
 # ================================================
 
 import threading
-import tkinter as tk
-from tkinter import messagebox, ttk
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Tuple, List, Optional, Dict
-from concurrent.futures import ThreadPoolExecutor
-from PIL import Image, ImageTk, ImageDraw
-from pynput import mouse, keyboard
-import mss
+from PIL import Image, ImageDraw
 import ctypes as ct
 from ctypes import wintypes
 import time
-import psutil
 import sys
-try:
-    import win32gui
-    import win32process
-except ImportError:
-    win32gui = None
-    win32process = None
+import os
+import traceback
+import json
+import math
+import bisect
+import csv
+import importlib
+import itertools
+import shutil
+import struct
+import mmap
+import tempfile
+from collections import OrderedDict, deque
+import numpy as np
+
+
+class _LazyModule:
+    """Module importé au premier accès à l'un de ses attributs.
+
+    Tk, mss, psutil et ImageTk ne sont chargés que sur les chemins qui s'en
+    servent : démarrage plus rapide et moteur utilisable sans affichage.
+    """
+
+    def __init__(self, name: str):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def __getattr__(self, attr):
+        module = self.__dict__["_module"]
+        if module is None:
+            module = importlib.import_module(self.__dict__["_name"])
+            self.__dict__["_module"] = module
+        return getattr(module, attr)
+
+
+tk = _LazyModule("tkinter")
+ttk = _LazyModule("tkinter.ttk")
+messagebox = _LazyModule("tkinter.messagebox")
+ImageTk = _LazyModule("PIL.ImageTk")
+mss = _LazyModule("mss")
+psutil = _LazyModule("psutil")
+shared_memory = _LazyModule("multiprocessing.shared_memory")
+
+_OPTIONAL_MODULES: Dict[str, Tuple[object, ...]] = {}
+
+
+def load_win32():
+    """(win32gui, win32process), ou (None, None) hors Windows ou sans pywin32."""
+    if "win32" not in _OPTIONAL_MODULES:
+        try:
+            import win32gui
+            import win32process
+            _OPTIONAL_MODULES["win32"] = (win32gui, win32process)
+        except ImportError:
+            _OPTIONAL_MODULES["win32"] = (None, None)
+    return _OPTIONAL_MODULES["win32"]
+
+
+def load_pynput():
+    """(mouse, keyboard) de pynput, ou (None, None) sans serveur d'affichage."""
+    if "pynput" not in _OPTIONAL_MODULES:
+        try:
+            from pynput import mouse, keyboard
+            _OPTIONAL_MODULES["pynput"] = (mouse, keyboard)
+        except Exception:  # pas de serveur d'affichage (exécution headless)
+            _OPTIONAL_MODULES["pynput"] = (None, None)
+    return _OPTIONAL_MODULES["pynput"]
 
 Point = Tuple[float, float]
 
-IS_WINDOWS = sys.platform.startswith("win")
-IS_MAC = sys.platform == "darwin"
-IS_LINUX = sys.platform.startswith("linux")
+IS_WINDOWS = sys.platform.startswith("win")
+IS_MAC = sys.platform == "darwin"
+IS_LINUX = sys.platform.startswith("linux")
+
+CONFIG = {
+    "memory_window_ratio": 0.35,
+    "capture_frames": 10,
+    "capture_interval": 0.2,
+    "adaptive_capture": True,
+    "capture_min_frames": 3,
+    "capture_stable_frames": 3,
+    "capture_change_threshold": 1.5,
+    "capture_fast_threshold": 12.0,
+    "capture_fast_interval": 0.1,
+    "capture_grab_retries": 2,
+    "animation_interval": 0.2,
+    "animation_max_fps": 30,
+    "composite_renderer": False,
+    "resize_threads": 2,
+    "resize_processes": 0,
+    "frame_budget_mb": 256,
+    "spill_budget_mb": 1024,
+    "spill_dir": None,
+    "canvas_horizontal_padding": 20,
+    "canvas_vertical_padding": 40,
+    "frame_source": "mss",
+    "replay_dir": None,
+    "replay_realtime": True,
+    "record_dir": None,
+    "latency_window": 500,
+    "latency_in_status": False,
+    "latency_export": None,
+    "window_poll_interval": 0.25,
+    "window_scan_interval": 2.0,
+    "match_crop": 0.6,
+    "match_distance": 6,
+    "match_tone_delta": 24,
+    "delta_patch_ratio": 0.25,
+    "session_file": None,
+    "click_delay": 0.2,
+    "click_queue_size": 32,
+    "ui_batch_interval": 0.02,
+    "preroll": 0.0,
+    "preroll_interval": 0.05,
+    "multi_client": False,
+    "auto_calibrate": True,
+    "calibration_cache": os.path.join(os.path.expanduser("~"), ".memoire_de_blop", "calibrations.json"),
+    "warm_start": True,
+    "resample_quality": "balanced",
+    "capture_reduce": False,
+}
+
+# === API Windows ===
+if IS_WINDOWS and hasattr(ct, "windll"):
+    try:
+        user32 = ct.windll.user32
+    except AttributeError:
+        user32 = None
+else:
+    user32 = None
+
+if IS_WINDOWS and hasattr(ct, "WINFUNCTYPE"):
+    EnumWindowsProc = ct.WINFUNCTYPE(ct.c_bool, wintypes.HWND, wintypes.LPARAM)
+else:
+    EnumWindowsProc = None
+
+class RECT(ct.Structure):
+    _fields_ = [
+        ("left", ct.c_long),
+        ("top", ct.c_long),
+        ("right", ct.c_long),
+        ("bottom", ct.c_long)
+    ]
+
+def find_window_by_title(partial_title: str):
+    if not IS_WINDOWS or user32 is None:
+        return None
+    hwnd = user32.GetTopWindow(None)
+    while hwnd:
+        length = user32.GetWindowTextLengthW(hwnd)
+        if length > 0:
+            buffer = ct.create_unicode_buffer(length + 1)
+            user32.GetWindowTextW(hwnd, buffer, length + 1)
+            if partial_title.lower() in buffer.value.lower():
+                return hwnd
+        hwnd = user32.GetWindow(hwnd, 2)
+    return None
+
+def get_window_rect(hwnd):
+    if not IS_WINDOWS or user32 is None:
+        return None
+    rect = RECT()
+    if user32.GetWindowRect(hwnd, ct.byref(rect)):
+        return rect.left, rect.top, rect.right - rect.left, rect.bottom - rect.top
+    return None
+
+class MONITORINFO(ct.Structure):
+    _fields_ = [
+        ("cbSize", wintypes.DWORD),
+        ("rcMonitor", RECT),
+        ("rcWork", RECT),
+        ("dwFlags", wintypes.DWORD),
+    ]
+
+if IS_WINDOWS and hasattr(ct, "WINFUNCTYPE"):
+    MonitorEnumProc = ct.WINFUNCTYPE(ct.c_bool, wintypes.HMONITOR, wintypes.HDC, ct.POINTER(RECT), wintypes.LPARAM)
+else:
+    MonitorEnumProc = None
+
+def get_work_area(root=None):
+    """Zone de travail de l'écran principal ; réutilise `root` plutôt que de créer un Tk."""
+    if IS_WINDOWS and user32 is not None:
+        try:
+            rect = RECT()
+            if user32.SystemParametersInfoW(0x0030, 0, ct.byref(rect), 0):
+                return rect.left, rect.top, rect.right - rect.left, rect.bottom - rect.top
+        except Exception:
+            pass
+    if root is not None:
+        return 0, 0, root.winfo_screenwidth(), root.winfo_screenheight()
+    root = tk.Tk()
+    root.withdraw()
+    w, h = root.winfo_screenwidth(), root.winfo_screenheight()
+    root.destroy()
+    return 0, 0, w, h
+
+def enumerate_monitors() -> List[Dict[str, object]]:
+    """Rectangle et zone de travail de chaque écran (Windows) ; liste vide ailleurs."""
+    if not IS_WINDOWS or user32 is None or MonitorEnumProc is None:
+        return []
+    results: List[Dict[str, object]] = []
+
+    def _callback(hmonitor, hdc, lprect, lparam):
+        info = MONITORINFO()
+        info.cbSize = ct.sizeof(MONITORINFO)
+        if user32.GetMonitorInfoW(hmonitor, ct.byref(info)):
+            mon, work = info.rcMonitor, info.rcWork
+            results.append({
+                "left": mon.left, "top": mon.top,
+                "width": mon.right - mon.left, "height": mon.bottom - mon.top,
+                "work": (work.left, work.top, work.right - work.left, work.bottom - work.top),
+                "primary": bool(info.dwFlags & 1),
+            })
+        return True
+
+    enum_cb = MonitorEnumProc(_callback)
+    user32.EnumDisplayMonitors(None, None, enum_cb, 0)
+    return results
+
+
+def enumerate_windows_for_pids(pid_set: set) -> List[Tuple[int, int, str]]:
+    win32gui, win32process = load_win32() if IS_WINDOWS else (None, None)
+    if not IS_WINDOWS or win32process is None or win32gui is None or EnumWindowsProc is None or user32 is None:
+        return []
+    results: List[Tuple[int, int, str]] = []
+
+    def _callback(hwnd, lparam):
+        if not user32.IsWindowVisible(hwnd):
+            return True
+        _, pid = win32process.GetWindowThreadProcessId(hwnd)
+        if pid not in pid_set:
+            return True
+        title = win32gui.GetWindowText(hwnd)
+        if title and "release" in title.lower():
+            results.append((hwnd, pid, title.strip()))
+        return True
+
+    enum_cb = EnumWindowsProc(_callback)
+    user32.EnumWindows(enum_cb, 0)
+    return results
+
+# ------------------ Écrans ------------------
+class DisplayTopology:
+    """Géométrie des écrans calculée une fois : zone de travail et rectangle de chaque écran.
+
+    Réutilise la racine Tk de l'application. Le cache n'est recalculé que si la
+    signature de l'affichage change (taille du bureau, nombre d'écrans, DPI),
+    vérifiée à chaque événement <Configure> de la racine. Hors Windows, le nombre
+    d'écrans vient de `fallback_monitors`, qui doit relire la liste à chaque appel
+    pour qu'un écran branché ou débranché change la signature.
+    """
+
+    def __init__(self, root=None, fallback_monitors=None):
+        self.root = root
+        self._fallback_monitors = fallback_monitors or (lambda: [])
+        self._signature = None
+        self._work_area: Optional[Tuple[int, int, int, int]] = None
+        self._monitors: Optional[List[Dict[str, object]]] = None
+        self.invalidations = 0
+
+    def attach(self, root):
+        self.root = root
+        self._signature = self.signature()
+        root.bind("<Configure>", self._on_configure, add="+")
+
+    def signature(self):
+        if IS_WINDOWS and user32 is not None:
+            # SM_XVIRTUALSCREEN, SM_YVIRTUALSCREEN, SM_CXVIRTUALSCREEN, SM_CYVIRTUALSCREEN, SM_CMONITORS
+            metrics = tuple(user32.GetSystemMetrics(k) for k in (76, 77, 78, 79, 80))
+        else:
+            metrics = (len(self._fallback_monitors()),)
+        if self.root is None:
+            return metrics
+        try:
+            metrics += (
+                self.root.winfo_screenwidth(),
+                self.root.winfo_screenheight(),
+                round(float(self.root.winfo_fpixels("1i")), 2),
+            )
+        except Exception:
+            return metrics
+        if IS_WINDOWS and user32 is not None and hasattr(user32, "GetDpiForWindow"):
+            # DPI de l'écran qui porte la fenêtre : change quand on la déplace d'un écran à l'autre.
+            try:
+                metrics += (user32.GetDpiForWindow(int(self.root.wm_frame(), 16)),)
+            except Exception:
+                pass
+        return metrics
+
+    def _on_configure(self, event):
+        if event.widget is not self.root:
+            return
+        signature = self.signature()
+        if signature != self._signature:
+            self._signature = signature
+            self.invalidate()
+
+    def invalidate(self):
+        self._work_area = None
+        self._monitors = None
+        self.invalidations += 1
+
+    def work_area(self) -> Tuple[int, int, int, int]:
+        if self._work_area is None:
+            self._work_area = get_work_area(self.root)
+        return self._work_area
+
+    def monitors(self) -> List[Dict[str, object]]:
+        """Rectangles des écrans physiques ({left, top, width, height, work, primary})."""
+        if self._monitors is None:
+            monitors = enumerate_monitors()
+            if not monitors:
+                work = self.work_area()
+                monitors = [
+                    dict(mon, work=_monitor_key(mon) if k else work, primary=(k == 0))
+                    for k, mon in enumerate(self._fallback_monitors())
+                ] or [{"left": work[0], "top": work[1], "width": work[2], "height": work[3],
+                       "work": work, "primary": True}]
+            self._monitors = monitors
+        return self._monitors
+
+    def monitor_at(self, x: float, y: float) -> Dict[str, object]:
+        """Écran contenant le point, ou l'écran principal s'il n'est sur aucun."""
+        monitors = self.monitors()
+        for mon in monitors:
+            if mon["left"] <= x < mon["left"] + mon["width"] and mon["top"] <= y < mon["top"] + mon["height"]:
+                return mon
+        return next((mon for mon in monitors if mon["primary"]), monitors[0])
+
+# ------------------ Grille bilinéaire ------------------
+def grid_intersections_in_quad(c1, c2, c3, c4, n, m) -> List[List[Point]]:
+    x1, y1 = map(float, c1)
+    x2, y2 = map(float, c2)
+    x3, y3 = map(float, c3)
+    x4, y4 = map(float, c4)
+    def bilinear(u: float, v: float) -> Point:
+        return (
+            (1 - u) * (1 - v) * x1 + u * (1 - v) * x2 + u * v * x3 + (1 - u) * v * x4,
+            (1 - u) * (1 - v) * y1 + u * (1 - v) * y2 + u * v * y3 + (1 - u) * v * y4,
+        )
+    return [[bilinear(i / m, j / n) for i in range(m + 1)] for j in range(n + 1)]
+
+def closest_point_with_indices(grid: List[List[Point]], target: Point):
+    tx, ty = target
+    best_pt, best_idx, best_d2 = None, (-1, -1), float("inf")
+    for j, row in enumerate(grid):
+        for i, (px, py) in enumerate(row):
+            d2 = (px - tx) ** 2 + (py - ty) ** 2
+            if d2 < best_d2:
+                best_d2, best_pt, best_idx = d2, (px, py), (j, i)
+    return best_pt, best_idx
+
+def _cross(ax, ay, bx, by):
+    return ax * by - ay * bx
+
+
+class QuadGridIndex:
+    """Table vectorisée des nœuds + inversion bilinéaire : point écran -> (j, i) en O(1).
+
+    Un point est accepté s'il tombe à moins de `margin` case d'un nœud de la grille
+    (les tuiles du bord débordent d'une demi-case hors du quadrilatère) ; au-delà,
+    il est rejeté au lieu d'être rabattu sur le nœud le plus proche.
+
+    Le nœud retenu est le plus proche à l'écran, comme closest_point_with_indices.
+    Sur des cases très allongées (grille 8×1, 20×2…), ce nœud peut se trouver à
+    plusieurs lignes ou colonnes du nœud arrondi : le voisinage examiné s'élargit selon
+    le rapport entre la plus grande et la plus petite arête de case.
+    """
+
+    # Jusqu'à ce nombre de nœuds, lookup() fait un parcours linéaire plutôt que l'accès
+    # O(1) : sur ces petites grilles (3×5 par défaut), le parcours en Python coûte moins
+    # que le coût fixe des appels numpy. lookup_many() reste vectorisé à toute taille.
+    BRUTE_FORCE_NODES = 400
+
+    def __init__(self, corners, n: int, m: int, margin: float = 0.5):
+        self.n, self.m = int(n), int(m)
+        self.margin = float(margin)
+        self.corners = np.asarray(corners, dtype=np.float64).reshape(4, 2)
+        c1, c2, c3, c4 = self.corners
+        u = np.arange(self.m + 1, dtype=np.float64)[None, :, None] / self.m
+        v = np.arange(self.n + 1, dtype=np.float64)[:, None, None] / self.n
+        self.nodes = (1 - u) * (1 - v) * c1 + u * (1 - v) * c2 + u * v * c3 + (1 - u) * v * c4
+        # Écarts des coins (e, f) et terme croisé (g) de l'interpolation bilinéaire.
+        self._efg = tuple(tuple(vec.tolist()) for vec in (c2 - c1, c4 - c1, c1 - c2 + c3 - c4))
+        self._origin = np.float64(c1[0]), np.float64(c1[1])
+        self._bounds = (-self.margin / self.m, 1 + self.margin / self.m,
+                        -self.margin / self.n, 1 + self.margin / self.n)
+        self._grid = self.grid()
+        self._offsets = self._neighbourhood()
+
+    def _neighbourhood(self) -> np.ndarray:
+        """Décalages (dj, di) à examiner autour du nœud arrondi pour trouver le plus proche."""
+        du = np.hypot(*np.moveaxis(np.diff(self.nodes, axis=1), 2, 0))
+        dv = np.hypot(*np.moveaxis(np.diff(self.nodes, axis=0), 2, 0))
+        # Distance maximale entre un point accepté et son nœud arrondi.
+        reach = 0.5 * (du.max() + dv.max())
+        def extent(step: float, limit: int) -> int:
+            if step <= 1e-9:
+                return limit
+            return int(min(limit, max(1, math.ceil(reach / step - 0.5))))
+        rj, ri = extent(dv.min(), self.n), extent(du.min(), self.m)
+        return np.array(
+            [(dj, di) for dj in range(-rj, rj + 1) for di in range(-ri, ri + 1)], dtype=np.int64
+        )
+
+    def grid(self) -> List[List[Point]]:
+        return [[(float(x), float(y)) for x, y in row] for row in self.nodes]
+
+    def translated(self, dx: float, dy: float) -> "QuadGridIndex":
+        """Même grille décalée de (dx, dy) : l'inversion bilinéaire ne dépend que des écarts entre coins."""
+        return QuadGridIndex(self.corners + (dx, dy), self.n, self.m, self.margin)
+
+    def _invert(self, hx, hy):
+        """Candidats (u, v) de l'inversion bilinéaire, pour des écarts au coin c1 en
+        tableaux ou en scalaires numpy (NaN/inf quand une racine n'existe pas)."""
+        e, f, g = self._efg
+        k2 = _cross(g[0], g[1], f[0], f[1])
+        k1 = _cross(e[0], e[1], f[0], f[1]) + _cross(hx, hy, g[0], g[1])
+        k0 = _cross(hx, hy, e[0], e[1])
+        if abs(k2) < 1e-9:
+            candidates = [-k0 / k1]
+        else:
+            root = np.sqrt(k1 * k1 - 4.0 * k0 * k2)
+            candidates = [(-k1 - root) / (2.0 * k2), (-k1 + root) / (2.0 * k2)]
+        for v in candidates:
+            den_x = e[0] + g[0] * v
+            den_y = e[1] + g[1] * v
+            use_x = abs(den_x) >= abs(den_y)
+            yield np.where(use_x, (hx - f[0] * v) / den_x, (hy - f[1] * v) / den_y), v
+
+    def _accepts(self, u, v):
+        """(u, v) à moins de `margin` case de la grille."""
+        lo_u, hi_u, lo_v, hi_v = self._bounds
+        return (u >= lo_u) & (u <= hi_u) & (v >= lo_v) & (v <= hi_v)
+
+    def to_uv(self, points) -> np.ndarray:
+        """Coordonnées (u, v) de chaque point ; NaN si l'inversion n'a pas de solution."""
+        pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        uv = np.full((pts.shape[0], 2), np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for u, v in self._invert(pts[:, 0] - self.corners[0, 0], pts[:, 1] - self.corners[0, 1]):
+                ok = np.isnan(uv[:, 0]) & self._accepts(u, v)
+                uv[ok, 0] = u[ok]
+                uv[ok, 1] = v[ok]
+        return uv
+
+    def _point_uv(self, point: Point) -> Optional[Tuple[float, float]]:
+        """to_uv pour un seul point, sur des scalaires numpy : sans le coût des tableaux."""
+        hx = point[0] - self._origin[0]
+        hy = point[1] - self._origin[1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for u, v in self._invert(hx, hy):
+                if self._accepts(u, v):
+                    return float(u), float(v)
+        return None
+
+    def lookup_many(self, points) -> Tuple[np.ndarray, np.ndarray]:
+        """Indices (j, i) et nœuds pour un lot de points ; (-1, -1) et NaN hors de la grille."""
+        pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        uv = self.to_uv(pts)
+        inside = ~np.isnan(uv[:, 0])
+        idx = np.full((pts.shape[0], 2), -1, dtype=np.int64)
+        nodes = np.full((pts.shape[0], 2), np.nan)
+        if inside.any():
+            # Nœud le plus proche (distance écran) dans le voisinage du nœud arrondi,
+            # comme le ferait un parcours complet de la grille.
+            pj = np.rint(uv[inside, 1] * self.n).astype(np.int64)[:, None] + self._offsets[:, 0]
+            pi = np.rint(uv[inside, 0] * self.m).astype(np.int64)[:, None] + self._offsets[:, 1]
+            np.clip(pj, 0, self.n, out=pj)
+            np.clip(pi, 0, self.m, out=pi)
+            cand = self.nodes[pj, pi]
+            d2 = ((cand - pts[inside][:, None, :]) ** 2).sum(axis=2)
+            best = d2.argmin(axis=1)
+            rows = np.arange(best.shape[0])
+            idx[inside, 0] = pj[rows, best]
+            idx[inside, 1] = pi[rows, best]
+            nodes[inside] = cand[rows, best]
+        return idx, nodes
+
+    def lookup(self, point: Point):
+        """Équivalent de closest_point_with_indices ; None si le point est hors de la grille.
+
+        O(1) au-delà de BRUTE_FORCE_NODES nœuds, parcours linéaire en deçà.
+        """
+        if self.nodes.shape[0] * self.nodes.shape[1] <= self.BRUTE_FORCE_NODES:
+            if self._point_uv(point) is None:
+                return None
+            return closest_point_with_indices(self._grid, point)
+        idx, nodes = self.lookup_many([point])
+        j, i = int(idx[0, 0]), int(idx[0, 1])
+        if j < 0:
+            return None
+        return (float(nodes[0, 0]), float(nodes[0, 1])), (j, i)
+
+# ------------------ Calibration automatique ------------------
+def quad_tile_centers(quad, n: int, m: int) -> List[Point]:
+    """Coins de la grille (centres des tuiles d'angle) pour un plateau de (m+1) × (n+1) tuiles
+    dont quad est le contour (haut, droite, bas, gauche)."""
+    q = np.asarray(quad, dtype=np.float64).reshape(4, 2)
+    du, dv = 0.5 / (m + 1), 0.5 / (n + 1)
+    corners = []
+    for u, v in ((du, dv), (1 - du, dv), (1 - du, 1 - dv), (du, 1 - dv)):
+        x, y = (1 - u) * (1 - v) * q[0] + u * (1 - v) * q[1] + u * v * q[2] + (1 - u) * v * q[3]
+        corners.append((float(x), float(y)))
+    return corners
+
+
+def _oriented_edges(gx: np.ndarray, gy: np.ndarray, slope: float) -> np.ndarray:
+    """Réponse aux bords de pente `slope` : gradient projeté sur la normale, nul si le
+    gradient s'écarte trop de cette normale (bords d'interface horizontaux/verticaux)."""
+    norm = np.hypot(1.0, slope)
+    across = np.abs(gy - slope * gx) / norm
+    along = np.abs(gx + slope * gy) / norm
+    return np.where(along <= 0.5 * across, across, 0.0)
+
+
+def _line_profile(acc: np.ndarray) -> np.ndarray:
+    return np.convolve(acc, (0.25, 0.5, 0.25), mode="same")
+
+
+def _line_peaks(acc: np.ndarray, count: int = 10) -> np.ndarray:
+    """Indices des maxima locaux les plus forts d'un accumulateur de Hough 1-D."""
+    prof = _line_profile(acc)
+    inner = prof[1:-1]
+    peaks = np.flatnonzero((inner >= prof[:-2]) & (inner > prof[2:]) & (inner > 0.15 * prof.max())) + 1
+    return np.sort(peaks[np.argsort(prof[peaks])[::-1][:count]])
+
+
+def _best_family(gx, gy, ys, xs, sign: float, angles) -> Tuple[float, np.ndarray, float]:
+    """Pente (parmi `angles`) qui aligne le mieux les bords ; retourne (pente, accumulateur, origine)."""
+    best = None
+    for angle in angles:
+        slope = sign * float(np.tan(angle))
+        weights = _oriented_edges(gx, gy, slope)
+        offsets = ys - slope * xs
+        origin = float(np.floor(offsets.min()))
+        acc = np.bincount((offsets - origin).astype(np.int64), weights=weights)
+        sharpness = float((acc * acc).sum())
+        if best is None or sharpness > best[0]:
+            best = (sharpness, slope, acc, origin)
+    return best[1], best[2], best[3]
+
+
+def _intersect(line_a: Tuple[float, float], line_b: Tuple[float, float]) -> np.ndarray:
+    """Intersection(s) de droites y = k·x + c (tableaux acceptés)."""
+    (ka, ca), (kb, cb) = line_a, line_b
+    x = (cb - ca) / (ka - kb)
+    return np.stack([x, ka * x + ca], axis=-1)
+
+
+def _side_support(response: np.ndarray, start: np.ndarray, end: np.ndarray, samples: int = 24) -> np.ndarray:
+    """Moyenne de la réponse le long de segments (lots de segments : start/end en (..., 2))."""
+    t = np.linspace(0.1, 0.9, samples)[:, None]
+    pts = start[..., None, :] + (end - start)[..., None, :] * t
+    h, w = response.shape
+    x = np.clip(np.rint(pts[..., 0]).astype(np.int64), 0, w - 1)
+    y = np.rint(pts[..., 1]).astype(np.int64)
+    near = np.maximum.reduce([response[np.clip(y + dy, 0, h - 1), x] for dy in (-1, 0, 1)])
+    return near.mean(axis=-1)
+
+
+def _refine_line(gray: np.ndarray, slope: float, start, end, radius: float) -> Tuple[float, float]:
+    """Ajuste pente et position d'un bord à pleine résolution, autour du segment start-end."""
+    h, w = gray.shape
+    t = np.linspace(0.1, 0.9, 64)
+    xs = start[0] + (end[0] - start[0]) * t
+    xm, ym = (start[0] + end[0]) / 2.0, (start[1] + end[1]) / 2.0
+    angle0 = np.arctan(slope)
+    slopes = np.tan(angle0 + np.radians(np.arange(-0.6, 0.61, 0.1)))[:, None, None]
+    shifts = np.arange(-radius, radius + 0.5, 0.5)[None, :, None]
+    ys = ym + shifts + slopes * (xs[None, None, :] - xm)
+    x = np.clip(np.rint(xs).astype(np.int64), 1, w - 2)[None, None, :]
+    y = np.clip(np.rint(ys).astype(np.int64), 1, h - 2)
+    gx = gray[y, x + 1] - gray[y, x - 1]
+    gy = gray[y + 1, x] - gray[y - 1, x]
+    score = _oriented_edges(gx, gy, slopes).mean(axis=-1)
+    a, b = np.unravel_index(int(score.argmax()), score.shape)
+    best_slope = float(slopes[a, 0, 0])
+    shift = float(shifts[0, b, 0])
+    if 0 < b < score.shape[1] - 1:
+        # Sommet de la parabole passant par les trois scores autour du maximum.
+        left, mid, right = score[a, b - 1], score[a, b], score[a, b + 1]
+        den = left - 2 * mid + right
+        if den < 0:
+            shift += 0.25 * (left - right) / den
+    return best_slope, ym + shift - best_slope * xm
+
+
+def detect_board_quad(img: Image.Image, max_width: int = 480) -> Optional[List[Point]]:
+    """Contour du plateau (haut, droite, bas, gauche) dans img, ou None s'il n'est pas trouvé.
+
+    Le plateau est un quadrilatère isométrique : ses bords suivent deux familles de
+    droites de pentes ±tan(θ), θ proche de 26,6°. Sur une version réduite de l'image
+    (pyramide de reduce(2)), une transformée de Hough 1-D par famille (bincount des
+    gradients orientés) donne les droites candidates ; on retient le plus grand
+    quadrilatère dont les quatre côtés sont bien soutenus par les bords, puis chaque
+    côté est réajusté (pente et position) à pleine résolution.
+    """
+    full = img.convert("L")
+    level, scale = full, 1
+    while level.width > max_width and min(level.size) >= 64:
+        level = level.reduce(2)
+        scale *= 2
+    gray = np.asarray(level, dtype=np.float32)
+    h, w = gray.shape
+    if h < 16 or w < 16:
+        return None
+    gx = np.zeros_like(gray)
+    gy = np.zeros_like(gray)
+    gx[:, 1:-1] = gray[:, 2:] - gray[:, :-2]
+    gy[1:-1, :] = gray[2:, :] - gray[:-2, :]
+    magnitude = np.hypot(gx, gy)
+    strong = magnitude > max(8.0, float(np.percentile(magnitude, 85)))
+    ys, xs = np.nonzero(strong)
+    if ys.size < 50:
+        return None
+    sgx, sgy = gx[ys, xs], gy[ys, xs]
+    ys, xs = ys.astype(np.float64), xs.astype(np.float64)
+    angles = np.radians(np.arange(20.0, 33.01, 0.5))
+
+    families = []
+    for sign in (1.0, -1.0):
+        slope, acc, origin = _best_family(sgx, sgy, ys, xs, sign, angles)
+        offsets = _line_peaks(acc) + origin
+        families.append((slope, offsets, _oriented_edges(gx, gy, slope)))
+    (ka, offsets_a, resp_a), (kb, offsets_b, resp_b) = families
+    if offsets_a.size < 2 or offsets_b.size < 2:
+        return None
+
+    # Toutes les paires (bord haut/bas) × (bord gauche/droit) en un lot.
+    ia, ja = np.triu_indices(offsets_a.size, 1)
+    ib, jb = np.triu_indices(offsets_b.size, 1)
+    a_lo, a_hi = offsets_a[ia][:, None], offsets_a[ja][:, None]
+    b_lo, b_hi = offsets_b[ib][None, :], offsets_b[jb][None, :]
+    p0 = _intersect((ka, a_lo), (kb, b_lo))
+    p1 = _intersect((ka, a_lo), (kb, b_hi))
+    p2 = _intersect((ka, a_hi), (kb, b_hi))
+    p3 = _intersect((ka, a_hi), (kb, b_lo))
+    support = np.minimum.reduce([
+        _side_support(resp_a, p0, p1), _side_support(resp_b, p1, p2),
+        _side_support(resp_a, p2, p3), _side_support(resp_b, p3, p0),
+    ])
+    corners = np.stack([p0, p1, p2, p3], axis=-2)
+    inside = ((corners[..., 0] >= -1) & (corners[..., 0] <= w) &
+              (corners[..., 1] >= -1) & (corners[..., 1] <= h)).all(axis=-1)
+    x, y = corners[..., 0], corners[..., 1]
+    area = 0.5 * np.abs((x * np.roll(y, -1, axis=-1) - np.roll(x, -1, axis=-1) * y).sum(axis=-1))
+    valid = inside & (area >= 0.01 * w * h) & (support > 3.0 * float(resp_a.mean() + resp_b.mean()))
+    if not valid.any():
+        return None
+    # Le plateau : le plus grand quadrilatère aussi bien soutenu que le meilleur (à 50 % près).
+    support = np.where(valid, support, 0.0)
+    candidates = support >= 0.5 * support.max()
+    best = np.unravel_index(int(np.where(candidates, area, -1.0).argmax()), area.shape)
+    coarse = corners[best]
+
+    # Passage à pleine résolution (centres de pixels) puis réajustement de chaque côté.
+    quad = coarse * scale + (scale - 1) / 2.0
+    gray_full = np.asarray(full, dtype=np.float32)
+    radius = 2.0 * scale
+    sides = [
+        _refine_line(gray_full, ka, quad[0], quad[1], radius),
+        _refine_line(gray_full, kb, quad[1], quad[2], radius),
+        _refine_line(gray_full, ka, quad[2], quad[3], radius),
+        _refine_line(gray_full, kb, quad[3], quad[0], radius),
+    ]
+    refined = [_intersect(sides[k - 1], sides[k]) for k in (0, 1, 2, 3)]
+    return [(float(px), float(py)) for px, py in refined]
+
+
+def detect_grid_corners(img: Image.Image, n: int, m: int) -> Optional[List[Point]]:
+    """Coins de grille (coordonnées de img) prêts pour grid_intersections_in_quad, ou None."""
+    quad = detect_board_quad(img)
+    return quad_tile_centers(quad, n, m) if quad is not None else None
+
+
+def check_calibration(folder: str, tolerance: float = 0.01) -> List[Dict[str, object]]:
+    """Rejoue la calibration sur des captures d'écran annotées.
+
+    Chaque image (png/jpg/bmp) du dossier a un fichier JSON du même nom :
+    {"points": [[x, y] × 4], "n": 3, "m": 5}, coins de grille en pixels de l'image.
+    Une image passe si aucun coin détecté n'est à plus de tolerance × diagonale.
+    """
+    results = []
+    for name in sorted(os.listdir(folder)):
+        stem, ext = os.path.splitext(name)
+        truth_path = os.path.join(folder, stem + ".json")
+        if ext.lower() not in (".png", ".jpg", ".jpeg", ".bmp") or not os.path.exists(truth_path):
+            continue
+        with open(truth_path, "r", encoding="utf-8") as handle:
+            truth = json.load(handle)
+        with Image.open(os.path.join(folder, name)) as img:
+            img = img.convert("RGB")
+        started = time.perf_counter()
+        points = detect_grid_corners(img, int(truth.get("n", 3)), int(truth.get("m", 5)))
+        elapsed = time.perf_counter() - started
+        limit = tolerance * float(np.hypot(*img.size))
+        error = None
+        if points is not None:
+            error = float(np.hypot(*(np.asarray(points) - np.asarray(truth["points"], dtype=np.float64)).T).max())
+        results.append({
+            "image": name, "size": img.size, "seconds": elapsed, "error_px": error,
+            "ok": error is not None and error <= limit,
+        })
+    return results
+
+
+# ------------------ Sources d'images ------------------
+Monitor = Dict[str, int]
+
+
+def _monitor_key(monitor: Monitor) -> Tuple[int, int, int, int]:
+    return int(monitor["left"]), int(monitor["top"]), int(monitor["width"]), int(monitor["height"])
+
+
+class FrameSource:
+    """Interface commune des backends de capture : grab(monitor) -> Image RGB."""
+    name = "abstract"
+    is_live = False
+
+    def __init__(self):
+        self.monitors: List[Monitor] = []
+
+    def grab(self, monitor: Monitor) -> Image.Image:
+        raise NotImplementedError
+
+    def grab_array(self, monitor: Monitor) -> np.ndarray:
+        """Capture sous forme de tableau uint8 : (H, W, 3) RGB, ou (H, W, 4) BGRX brut
+        (voir store_pixels) quand le backend le fournit sans conversion."""
+        return np.asarray(self.grab(monitor))
+
+    def refresh_monitors(self) -> List[Monitor]:
+        """Relit la liste des écrans (branchement à chaud) ; fixe par défaut."""
+        return self.monitors
+
+    def close(self):
+        pass
+
+
+def store_pixels(dst: np.ndarray, src: np.ndarray):
+    """Copie une capture dans dst (H, W, 3) RGB.
+
+    Un src à 4 canaux est du BGRX brut (grab_array de mss) : la conversion se fait
+    pendant cette copie, canal par canal, ce qui reste l'unique copie entre le
+    buffer de l'écran et le stockage.
+    """
+    if src.shape[-1] == 4:
+        dst[..., 0] = src[..., 2]
+        dst[..., 1] = src[..., 1]
+        dst[..., 2] = src[..., 0]
+    else:
+        dst[...] = src
+
+
+def reduce_pixels(pixels: np.ndarray, factor: int) -> np.ndarray:
+    """Moyenne par blocs factor × factor (Image.reduce), canaux inchangés (RGB ou BGRX)."""
+    h, w = pixels.shape[0] // factor * factor, pixels.shape[1] // factor * factor
+    block = np.ascontiguousarray(pixels[:h, :w])
+    mode = "RGBX" if block.shape[2] == 4 else "RGB"
+    return np.asarray(Image.frombuffer(mode, (w, h), block, "raw", mode, 0, 1).reduce(factor))
+
+
+class MssFrameSource(FrameSource):
+    """Capture réelle de l'écran via mss (une instance mss par thread)."""
+    name = "mss"
+    is_live = True
+
+    def __init__(self):
+        super().__init__()
+        self._local = threading.local()
+        self._instances = []
+        self._lock = threading.Lock()
+        self.monitors = list(self._sct().monitors)
+
+    def _sct(self):
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            sct = mss.mss()
+            self._local.sct = sct
+            with self._lock:
+                self._instances.append(sct)
+        return sct
+
+    def grab(self, monitor: Monitor) -> Image.Image:
+        # Décodage BGRX -> RGB par PIL, directement depuis le buffer de mss (pas de raw.rgb).
+        raw = self._sct().grab(monitor)
+        return Image.frombuffer("RGB", (raw.width, raw.height), raw.raw, "raw", "BGRX", 0, 1)
+
+    def grab_array(self, monitor: Monitor) -> np.ndarray:
+        # Vue sur le buffer BGRX : la conversion est faite par store_pixels, dans la copie vers le stockage.
+        raw = self._sct().grab(monitor)
+        return np.frombuffer(raw.raw, dtype=np.uint8).reshape(raw.height, raw.width, 4)
+
+    def refresh_monitors(self) -> List[Monitor]:
+        # mss met les écrans en cache par instance : une instance neuve les énumère à nouveau.
+        try:
+            with mss.mss() as sct:
+                self.monitors = list(sct.monitors)
+        except Exception:
+            pass
+        return self.monitors
+
+    def close(self):
+        with self._lock:
+            instances, self._instances = self._instances, []
+        for sct in instances:
+            try:
+                sct.close()
+            except Exception:
+                pass
+
+
+class SyntheticFrameSource(FrameSource):
+    """Écran virtuel déterministe : damier de tuiles qui s'animent puis se stabilisent.
+
+    L'image ne dépend que de la zone demandée et du numéro de tick
+    (temps écoulé / frame_period), ce qui rend les captures reproductibles.
+    """
+    name = "synthetic"
+
+    def __init__(self, width: int = 1920, height: int = 1080, tile: int = 120,
+                 frame_period: float = 0.2, settle_frames: int = 4, cycle_frames: int = 30,
+                 seed: int = 0, clock=time.monotonic):
+        super().__init__()
+        self.width, self.height = int(width), int(height)
+        self.tile = max(4, int(tile))
+        self.frame_period = max(1e-3, float(frame_period))
+        self.settle_frames = max(0, int(settle_frames))
+        self.cycle_frames = max(self.settle_frames + 1, int(cycle_frames))
+        self.seed = int(seed)
+        self._clock = clock
+        self._t0: Optional[float] = None
+        screen = {"left": 0, "top": 0, "width": self.width, "height": self.height}
+        self.monitors = [dict(screen), dict(screen)]
+
+    def current_tick(self) -> int:
+        now = self._clock()
+        if self._t0 is None:
+            self._t0 = now
+        return int((now - self._t0) / self.frame_period)
+
+    def _tile_color(self, col: int, row: int, tick: int) -> Tuple[int, int, int]:
+        h = ((col * 73856093) ^ (row * 19349663) ^ (self.seed * 83492791)) & 0xFFFFFFFF
+        step = min((tick + h % self.cycle_frames) % self.cycle_frames, self.settle_frames)
+        return (
+            ((h >> 16) + step * 40) & 0xFF,
+            ((h >> 8) + step * 25) & 0xFF,
+            (h + step * 60) & 0xFF,
+        )
+
+    def render(self, monitor: Monitor, tick: int) -> Image.Image:
+        left, top, width, height = _monitor_key(monitor)
+        img = Image.new("RGB", (max(1, width), max(1, height)), (24, 24, 32))
+        draw = ImageDraw.Draw(img)
+        t = self.tile
+        for row in range(top // t, (top + height - 1) // t + 1):
+            for col in range(left // t, (left + width - 1) // t + 1):
+                x0, y0 = col * t - left, row * t - top
+                draw.rectangle((x0 + 2, y0 + 2, x0 + t - 3, y0 + t - 3), fill=self._tile_color(col, row, tick))
+        return img
+
+    def grab(self, monitor: Monitor) -> Image.Image:
+        return self.render(monitor, self.current_tick())
+
+
+class FrameRecorder(FrameSource):
+    """Enveloppe une source et enregistre chaque capture (PNG + index.json) pour le rejeu."""
+
+    def __init__(self, inner: FrameSource, directory: str, clock=time.monotonic):
+        super().__init__()
+        self.inner = inner
+        self.name = f"{inner.name}+record"
+        self.is_live = inner.is_live
+        self.monitors = inner.monitors
+        self.directory = directory
+        self._clock = clock
+        self._t0: Optional[float] = None
+        self._entries: List[Dict[str, object]] = []
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def grab(self, monitor: Monitor) -> Image.Image:
+        img = self.inner.grab(monitor)
+        left, top, width, height = _monitor_key(monitor)
+        with self._lock:
+            now = self._clock()
+            if self._t0 is None:
+                self._t0 = now
+            filename = f"{len(self._entries):06d}.png"
+            self._entries.append({
+                "t": now - self._t0,
+                "left": left, "top": top, "width": img.width, "height": img.height,
+                "file": filename,
+            })
+        img.save(os.path.join(self.directory, filename), compress_level=1)
+        return img
+
+    def close(self):
+        with self._lock:
+            entries = sorted(self._entries, key=lambda e: e["t"])
+        with open(os.path.join(self.directory, "index.json"), "w", encoding="utf-8") as fh:
+            json.dump({"screen": self.monitors[0] if self.monitors else None, "frames": entries}, fh)
+        self.inner.close()
+
+
+class ReplayFrameSource(FrameSource):
+    """Rejoue une session enregistrée par FrameRecorder.
+
+    realtime=True : renvoie l'image enregistrée au même instant relatif que la capture d'origine.
+    realtime=False : chaque zone avance d'une image par grab, indépendamment de l'horloge
+    (reproduction octet par octet quel que soit le timing).
+    """
+    name = "replay"
+
+    def __init__(self, directory: str, realtime: bool = True, loop: bool = False, clock=time.monotonic):
+        super().__init__()
+        with open(os.path.join(directory, "index.json"), encoding="utf-8") as fh:
+            index = json.load(fh)
+        self.directory = directory
+        self.realtime = realtime
+        self.loop = loop
+        self._entries: List[Dict[str, object]] = index.get("frames", [])
+        screen = index.get("screen")
+        if not screen:
+            right = max((e["left"] + e["width"] for e in self._entries), default=1)
+            bottom = max((e["top"] + e["height"] for e in self._entries), default=1)
+            screen = {"left": 0, "top": 0, "width": right, "height": bottom}
+        self.monitors = [dict(screen), dict(screen)]
+        self._clock = clock
+        self._t0: Optional[float] = None
+        self._cursors: Dict[Tuple[int, int, int, int], int] = {}
+        self._matches: Dict[Tuple[int, int, int, int], List[int]] = {}
+        self._cache: Dict[int, Image.Image] = {}
+        self._lock = threading.Lock()
+
+    def _covering(self, key) -> List[int]:
+        found = self._matches.get(key)
+        if found is None:
+            left, top, width, height = key
+            found = [
+                idx for idx, e in enumerate(self._entries)
+                if e["left"] <= left and e["top"] <= top
+                and e["left"] + e["width"] >= left + width and e["top"] + e["height"] >= top + height
+            ] or list(range(len(self._entries)))
+            self._matches[key] = found
+        return found
+
+    def _load(self, idx: int) -> Image.Image:
+        img = self._cache.get(idx)
+        if img is None:
+            with Image.open(os.path.join(self.directory, self._entries[idx]["file"])) as fh:
+                img = fh.convert("RGB")
+            if len(self._cache) >= 64:
+                self._cache.pop(next(iter(self._cache)))
+            self._cache[idx] = img
+        return img
+
+    def grab(self, monitor: Monitor) -> Image.Image:
+        key = _monitor_key(monitor)
+        left, top, width, height = key
+        with self._lock:
+            candidates = self._covering(key)
+            if not candidates:
+                return Image.new("RGB", (max(1, width), max(1, height)))
+            if self.realtime:
+                now = self._clock()
+                if self._t0 is None:
+                    self._t0 = now
+                times = [self._entries[idx]["t"] for idx in candidates]
+                pos = max(0, bisect.bisect_right(times, now - self._t0) - 1)
+            else:
+                pos = self._cursors.get(key, 0)
+                self._cursors[key] = pos + 1
+                pos = pos % len(candidates) if self.loop else min(pos, len(candidates) - 1)
+            idx = candidates[pos]
+            frame = self._load(idx)
+        entry = self._entries[idx]
+        ox, oy = left - entry["left"], top - entry["top"]
+        return frame.crop((ox, oy, ox + width, oy + height))
+
+
+def create_frame_source(kind: Optional[str] = None) -> FrameSource:
+    kind = kind or CONFIG["frame_source"]
+    if kind == "synthetic":
+        source: FrameSource = SyntheticFrameSource()
+    elif kind == "replay":
+        if not CONFIG["replay_dir"]:
+            raise ValueError("replay_dir est requis pour la source 'replay'.")
+        source = ReplayFrameSource(CONFIG["replay_dir"], realtime=CONFIG["replay_realtime"])
+    elif kind == "mss":
+        source = MssFrameSource()
+    else:
+        raise ValueError(f"Source d'images inconnue : {kind!r}")
+    if CONFIG["record_dir"]:
+        source = FrameRecorder(source, CONFIG["record_dir"])
+    return source
+
+# ------------------ Stockage des séquences ------------------
+class TileFrames:
+    """Séquence d'une tuile dans un seul buffer uint8 contigu (frames × H × W × 3).
+
+    Les vues PIL ne sont créées qu'à la demande (image(), images()).
+    """
+    __slots__ = ("array", "times", "count")
+
+    def __init__(self, frame_count: int, height: int, width: int):
+        self.array = np.empty((max(1, int(frame_count)), max(1, int(height)), max(1, int(width)), 3), dtype=np.uint8)
+        self.times = np.zeros(self.array.shape[0], dtype=np.float64)
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def capacity(self) -> int:
+        return self.array.shape[0]
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.array.shape[2], self.array.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        return self.array.nbytes
+
+    def append(self, pixels: np.ndarray, timestamp: float = 0.0):
+        store_pixels(self.array[self.count], pixels)
+        self.times[self.count] = timestamp
+        self.count += 1
+
+    @classmethod
+    def from_arrays(cls, array: np.ndarray, times: Optional[np.ndarray] = None) -> "TileFrames":
+        frames = cls.__new__(cls)
+        frames.array = np.ascontiguousarray(array, dtype=np.uint8)
+        frames.count = frames.array.shape[0]
+        frames.times = np.zeros(frames.count) if times is None else np.asarray(times, dtype=np.float64)
+        return frames
+
+    def clear(self):
+        self.count = 0
+
+    def trim(self):
+        """Libère la capacité inutilisée (séquence arrêtée avant capture_frames)."""
+        if 0 < self.count < self.capacity:
+            self.array = self.array[:self.count].copy()
+            self.times = self.times[:self.count].copy()
+
+    def frames(self) -> np.ndarray:
+        return self.array[:self.count]
+
+    def image(self, idx: int) -> Image.Image:
+        return Image.fromarray(self.array[idx], "RGB")
+
+    def images(self):
+        for idx in range(self.count):
+            yield self.image(idx)
+
+    @property
+    def durations(self) -> List[int]:
+        return [1] * self.count
+
+    def entry_images(self):
+        return self.images()
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {"frames": self.frames(), "times": self.times[:self.count]}
+
+
+class DeltaFrames:
+    """Séquence encodée : images clés, patchs rectangulaires et durées.
+
+    Les images consécutives identiques ne forment qu'une entrée dont la durée
+    compte les images d'origine ; une image qui ne diffère de la précédente que
+    sur une petite zone (moins de `patch_ratio` de la surface) n'est stockée
+    que sous forme du rectangle modifié. Même interface de lecture que TileFrames.
+    """
+    __slots__ = ("keyframes", "patch_data", "patch_boxes", "patch_offsets",
+                 "entry_kinds", "entry_refs", "entry_durations", "times", "count")
+
+    KEY, PATCH = 0, 1
+
+    @classmethod
+    def encode(cls, frames: TileFrames, patch_ratio: Optional[float] = None) -> "DeltaFrames":
+        patch_ratio = CONFIG["delta_patch_ratio"] if patch_ratio is None else patch_ratio
+        data = frames.frames()
+        height, width = data.shape[1:3]
+        flat = data.reshape(len(data), height, width * 3)
+        keys, patches, boxes = [], [], []
+        kinds, refs, durations = [], [], []
+        for idx in range(len(data)):
+            if idx:
+                # Lignes modifiées d'abord, puis colonnes sur cette bande seulement.
+                changed = flat[idx] != flat[idx - 1]
+                rows = np.flatnonzero(changed.any(axis=1))
+                if rows.size == 0:
+                    durations[-1] += 1
+                    continue
+                y0, y1 = rows[0], rows[-1] + 1
+                cols = np.flatnonzero(changed[y0:y1].any(axis=0).reshape(width, 3).any(axis=1))
+                x0, x1 = cols[0], cols[-1] + 1
+                if (y1 - y0) * (x1 - x0) <= patch_ratio * height * width:
+                    kinds.append(cls.PATCH)
+                    refs.append(len(boxes))
+                    durations.append(1)
+                    boxes.append((x0, y0, x1, y1))
+                    patches.append(data[idx, y0:y1, x0:x1].ravel())
+                    continue
+            kinds.append(cls.KEY)
+            refs.append(len(keys))
+            durations.append(1)
+            keys.append(data[idx])
+        seq = cls.__new__(cls)
+        seq.keyframes = np.stack(keys) if keys else np.zeros((0, height, width, 3), np.uint8)
+        seq.patch_data = np.concatenate(patches) if patches else np.zeros(0, np.uint8)
+        seq.patch_boxes = np.array(boxes, dtype=np.int32).reshape(-1, 4)
+        seq.patch_offsets = np.cumsum([0] + [p.size for p in patches])[:-1].astype(np.int64)
+        seq.entry_kinds = np.array(kinds, dtype=np.int8)
+        seq.entry_refs = np.array(refs, dtype=np.int32)
+        seq.entry_durations = np.array(durations, dtype=np.int32)
+        seq.times = np.array(frames.times[:frames.count], dtype=np.float64)
+        seq.count = len(data)
+        return seq
+
+    _ARRAYS = ("keyframes", "patch_data", "patch_boxes", "patch_offsets",
+               "entry_kinds", "entry_refs", "entry_durations", "times")
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {name: getattr(self, name) for name in self._ARRAYS}
+
+    @classmethod
+    def from_arrays(cls, arrays) -> "DeltaFrames":
+        seq = cls.__new__(cls)
+        for name in cls._ARRAYS:
+            setattr(seq, name, np.asarray(arrays[name]))
+        seq.count = int(seq.entry_durations.sum())
+        return seq
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.keyframes.shape[2], self.keyframes.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in self._ARRAYS)
+
+    @property
+    def durations(self) -> List[int]:
+        return self.entry_durations.tolist()
+
+    def entry_arrays(self):
+        """Image complète de chaque entrée, reconstruite au fil des patchs."""
+        current = None
+        for kind, ref in zip(self.entry_kinds, self.entry_refs):
+            if kind == self.KEY:
+                current = self.keyframes[ref]
+            else:
+                x0, y0, x1, y1 = self.patch_boxes[ref]
+                start = self.patch_offsets[ref]
+                current = current.copy()
+                current[y0:y1, x0:x1] = self.patch_data[start:start + (y1 - y0) * (x1 - x0) * 3].reshape(
+                    y1 - y0, x1 - x0, 3)
+            yield current
+
+    def entry_images(self):
+        for pixels in self.entry_arrays():
+            yield Image.fromarray(pixels, "RGB")
+
+    def frames(self) -> np.ndarray:
+        """Séquence décodée (frames × H × W × 3)."""
+        return np.repeat(np.stack(list(self.entry_arrays())), self.entry_durations, axis=0)
+
+    def image(self, idx: int) -> Image.Image:
+        return Image.fromarray(self.frames()[idx], "RGB")
+
+    def images(self):
+        for pixels in self.frames():
+            yield Image.fromarray(pixels, "RGB")
+
+
+def sequence_from_arrays(arrays):
+    if "entry_durations" in arrays:
+        return DeltaFrames.from_arrays(arrays)
+    return TileFrames.from_arrays(arrays["frames"], arrays["times"])
+
+
+class SequenceStore:
+    """Budget mémoire des séquences capturées (historique des clics).
+
+    Au-delà de `budget_bytes`, les séquences les moins récemment vues sont
+    écrites compressées sur disque (thread dédié) puis rechargées à la demande ;
+    au-delà de `spill_budget_bytes` sur disque, les plus anciennes sont
+    supprimées. Les séquences épinglées (tuiles visibles) restent en RAM ; une
+    séquence en cours d'écriture reste servie depuis `_spilling`.
+    """
+
+    def __init__(self, budget_bytes: int, spill_budget_bytes: int = 0, spill_dir: Optional[str] = None):
+        self.budget_bytes = max(0, int(budget_bytes))
+        self.spill_budget_bytes = max(0, int(spill_budget_bytes))
+        self.spill_dir = spill_dir
+        self._owns_spill_dir = spill_dir is None
+        self._resident: "OrderedDict[int, DeltaFrames]" = OrderedDict()
+        self._spilled: "OrderedDict[int, Tuple[str, int]]" = OrderedDict()
+        self._spilling: Dict[int, TileFrames] = {}
+        self._pinned: Dict[int, int] = {}
+        self._resident_bytes = 0
+        self._spilled_bytes = 0
+        self.evicted_count = 0
+        self._generation = 0
+        self._spill_serial = 0
+        self._lock = threading.RLock()
+        self._writer: Optional[ThreadPoolExecutor] = None
+
+    def add(self, key: int, frames: TileFrames, pinned: bool = False):
+        with self._lock:
+            self._forget(key)
+            self._resident[key] = frames
+            self._resident_bytes += frames.nbytes
+            if pinned:
+                self._pinned[key] = self._pinned.get(key, 0) + 1
+        self._enforce()
+
+    def pin(self, key: int):
+        with self._lock:
+            self._pinned[key] = self._pinned.get(key, 0) + 1
+
+    def unpin(self, key: int):
+        with self._lock:
+            count = self._pinned.get(key, 0) - 1
+            if count > 0:
+                self._pinned[key] = count
+            else:
+                self._pinned.pop(key, None)
+                if key in self._resident:
+                    self._resident.move_to_end(key)
+        self._enforce()
+
+    def touch(self, key: int):
+        with self._lock:
+            if key in self._resident:
+                self._resident.move_to_end(key)
+
+    def get(self, key: int) -> Optional[TileFrames]:
+        """Séquence en RAM, rechargée depuis le disque si elle a été déversée ; None si évincée."""
+        with self._lock:
+            frames = self._resident.get(key)
+            if frames is not None:
+                self._resident.move_to_end(key)
+                return frames
+            frames = self._spilling.pop(key, None)
+            if frames is not None:
+                # Écriture encore en cours : la séquence redevient résidente, _spill l'ignorera.
+                self._resident[key] = frames
+                self._resident_bytes += frames.nbytes
+            spilled = self._spilled.get(key)
+        if frames is not None:
+            self._enforce()
+            return frames
+        if spilled is None:
+            return None
+        path, _ = spilled
+        try:
+            with np.load(path) as data:
+                frames = sequence_from_arrays(data)
+        except (OSError, KeyError, ValueError):
+            return None
+        with self._lock:
+            if key in self._spilled:
+                self._forget(key)
+                self._resident[key] = frames
+                self._resident_bytes += frames.nbytes
+        self._enforce()
+        return frames
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "resident_bytes": self._resident_bytes,
+                "resident_count": len(self._resident),
+                "spilled_bytes": self._spilled_bytes,
+                "spilled_count": len(self._spilled),
+                "spilling_count": len(self._spilling),
+                "evicted_count": self.evicted_count,
+            }
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._spilled):
+                self._forget(key)
+            self._resident.clear()
+            self._spilling.clear()
+            self._pinned.clear()
+            self._resident_bytes = 0
+            self.evicted_count = 0
+            self._generation += 1
+
+    def close(self):
+        self.clear()
+        if self._writer is not None:
+            self._writer.shutdown(wait=True)
+            self._writer = None
+        if self._owns_spill_dir and self.spill_dir:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+            self.spill_dir = None
+
+    def _forget(self, key: int):
+        frames = self._resident.pop(key, None)
+        if frames is not None:
+            self._resident_bytes -= frames.nbytes
+        self._spilling.pop(key, None)
+        spilled = self._spilled.pop(key, None)
+        if spilled is not None:
+            path, size = spilled
+            self._spilled_bytes -= size
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _enforce(self):
+        victims: List[Tuple[int, TileFrames]] = []
+        with self._lock:
+            excess = self._resident_bytes - self.budget_bytes
+            for key in list(self._resident):
+                if excess <= 0:
+                    break
+                if key in self._pinned:
+                    continue
+                frames = self._resident.pop(key)
+                self._resident_bytes -= frames.nbytes
+                excess -= frames.nbytes
+                victims.append((key, frames))
+                self._spilling[key] = frames
+            if not victims:
+                return
+            if self.spill_budget_bytes <= 0:
+                for key, _ in victims:
+                    del self._spilling[key]
+                self.evicted_count += len(victims)
+                return
+            if self.spill_dir is None:
+                self.spill_dir = tempfile.mkdtemp(prefix="memoire_de_blop_")
+            if self._writer is None:
+                self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="frame-spill")
+            writer, generation, spill_dir = self._writer, self._generation, self.spill_dir
+            serial = self._spill_serial
+            self._spill_serial += len(victims)
+        for offset, (key, frames) in enumerate(victims):
+            path = os.path.join(spill_dir, f"{generation}_{key:06d}_{serial + offset}.npz")
+            writer.submit(self._spill, key, frames, generation, path)
+
+    def _spill(self, key: int, frames: TileFrames, generation: int, path: str):
+        try:
+            np.savez_compressed(path, **frames.to_arrays())
+            size = os.path.getsize(path)
+        except OSError:
+            with self._lock:
+                if self._spilling.get(key) is frames:
+                    del self._spilling[key]
+                    self.evicted_count += 1
+            return
+        with self._lock:
+            if generation != self._generation or self._spilling.get(key) is not frames:
+                # Historique effacé, séquence relue ou remplacée entre-temps.
+                os.remove(path)
+                return
+            del self._spilling[key]
+            self._spilled[key] = (path, size)
+            self._spilled_bytes += size
+            while self._spilled_bytes > self.spill_budget_bytes and self._spilled:
+                oldest = next(iter(self._spilled))
+                self._forget(oldest)
+                self.evicted_count += 1
+
+
+class DisplaySequence(list):
+    """Images prêtes à afficher, chacune avec sa durée en ticks d'animation (`durations`)."""
+
+    def __init__(self, images=(), durations=None):
+        super().__init__(images)
+        self.durations = list(durations) if durations is not None else [1] * len(self)
+
+
+# Palier -> (filtre des tuiles, filtre des aperçus, reducing_gap). Avec reducing_gap, PIL
+# commence par un reduce() entier (moyenne par blocs) tant que le filtre final garde au
+# moins ce facteur à traiter ; LANCZOS ne travaille plus que sur une image déjà petite.
+RESAMPLE_TIERS = {
+    "fast": (Image.BILINEAR, Image.BOX, 1.0),
+    "balanced": (Image.LANCZOS, Image.BOX, 2.0),
+    "best": (Image.LANCZOS, Image.LANCZOS, None),
+}
+
+
+def downscale(img: Image.Image, size: Tuple[int, int], preview: bool = False,
+              quality: Optional[str] = None) -> Image.Image:
+    """Nouvelle image réduite à size selon le palier (CONFIG["resample_quality"]).
+
+    LANCZOS est gardé là où il se voit : les tuiles, sauf en "fast". Les aperçus
+    (configuration, carte des clics) passent en BOX dès "balanced", et un facteur
+    entier exact hors LANCZOS se résume à reduce().
+    """
+    tile_filter, preview_filter, gap = RESAMPLE_TIERS.get(quality or CONFIG["resample_quality"], RESAMPLE_TIERS["best"])
+    resample = preview_filter if preview else tile_filter
+    size = (max(1, int(size[0])), max(1, int(size[1])))
+    if img.size == size:
+        return img.copy()
+    factor = img.width // size[0]
+    if resample != Image.LANCZOS and factor > 1 and img.size == (size[0] * factor, size[1] * factor):
+        return img.reduce(factor)
+    return img.resize(size, resample, reducing_gap=gap)
+
+
+def resize_sequence(frames, size: int, quality: Optional[str] = None) -> DisplaySequence:
+    """Redimensionne une séquence à size × size (exécuté hors du thread Tk).
+
+    Une seule image par entrée distincte ; les entrées qui deviennent identiques
+    une fois réduites sont fusionnées et leurs durées additionnées.
+    """
+    size = max(1, int(size))
+    images, durations, previous = [], [], None
+    for frame, duration in zip(frames.entry_images(), frames.durations):
+        small = downscale(frame, (size, size), quality=quality)
+        data = small.tobytes()
+        if data == previous:
+            durations[-1] += duration
+            continue
+        images.append(small)
+        durations.append(duration)
+        previous = data
+    return DisplaySequence(images, durations)
+
+# ------------------ Pool d'images (processus) ------------------
+def _pack_shared(arrays: Dict[str, np.ndarray]):
+    """Copie des tableaux dans un segment de mémoire partagée ; retourne (segment, description)."""
+    layout, offset = [], 0
+    for name, array in arrays.items():
+        layout.append((name, array.dtype.str, array.shape, offset))
+        offset += -(-array.nbytes // 64) * 64
+    segment = shared_memory.SharedMemory(create=True, size=max(1, offset))
+    for (_, dtype, shape, start), array in zip(layout, arrays.values()):
+        np.ndarray(shape, dtype, buffer=segment.buf, offset=start)[...] = array
+    return segment, layout
+
+
+def _unpack_shared(buf, layout) -> Dict[str, np.ndarray]:
+    return {name: np.ndarray(shape, dtype, buffer=buf, offset=start) for name, dtype, shape, start in layout}
+
+
+def _resize_into(src_buf, layout, size: int, out_buf, quality: Optional[str] = None) -> List[int]:
+    resized = resize_sequence(sequence_from_arrays(_unpack_shared(src_buf, layout)), size, quality)
+    stack = np.ndarray((len(resized), size, size, 3), np.uint8, buffer=out_buf)
+    for idx, image in enumerate(resized):
+        stack[idx] = np.asarray(image)
+    return resized.durations
+
+
+def _resize_shared(src_name: str, layout, size: int, out_name: str, quality: Optional[str] = None) -> List[int]:
+    """Tâche d'un worker : séquence lue dans src, images réduites écrites dans out, durées retournées."""
+    src = shared_memory.SharedMemory(name=src_name)
+    out = shared_memory.SharedMemory(name=out_name)
+    try:
+        # Les vues numpy sur les segments disparaissent au retour de _resize_into.
+        return _resize_into(src.buf, layout, size, out.buf, quality)
+    finally:
+        src.close()
+        out.close()
+
+
+def _worker_ready() -> int:
+    return os.getpid()
+
+
+class ImageProcessPool:
+    """Redimensionnement des tuiles dans des processus, hors du GIL de Tk et des écouteurs.
+
+    Le pool est démarré une fois (chaque worker importe le module dès la création)
+    et les séquences transitent par multiprocessing.shared_memory : seuls les noms
+    des segments, la description des tableaux et les durées sont sérialisés.
+    resize() a la même sémantique que resize_sequence mais retourne un Future.
+    """
+
+    def __init__(self, workers: int):
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        self.workers = max(1, int(workers))
+        # spawn partout : pas de fork d'un processus qui a déjà Tk et des threads.
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        self.ready = [self._executor.submit(_worker_ready) for _ in range(self.workers)]
+
+    def resize(self, frames, size: int) -> Future:
+        size = max(1, int(size))
+        src, layout = _pack_shared(frames.to_arrays())
+        out = shared_memory.SharedMemory(create=True, size=max(1, len(frames.durations) * size * size * 3))
+        result: Future = Future()
+
+        def release():
+            for segment in (src, out):
+                segment.close()
+                segment.unlink()
+
+        def finish(task):
+            try:
+                if task.cancelled():
+                    result.cancel()
+                elif task.exception() is not None:
+                    result.set_exception(task.exception())
+                else:
+                    durations = task.result()
+                    stack = np.ndarray((len(durations), size, size, 3), np.uint8, buffer=out.buf)
+                    images = [Image.fromarray(stack[idx].copy(), "RGB") for idx in range(len(durations))]
+                    del stack
+                    result.set_result(DisplaySequence(images, durations))
+            finally:
+                release()
+
+        try:
+            # Le palier part avec la tâche : les workers (spawn) ont la CONFIG par défaut.
+            task = self._executor.submit(_resize_shared, src.name, layout, size, out.name, CONFIG["resample_quality"])
+        except RuntimeError:
+            release()
+            raise
+        task.add_done_callback(finish)
+        return result
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+# ------------------ Enregistrement de session ------------------
+class SessionWriter:
+    """Journal binaire append-only des captures de tuiles d'une session.
+
+    Format : en-tête `MDBSESS1`, puis pour chaque capture un enregistrement
+    `REC1` (longueur des métadonnées JSON, longueur des données) suivi des
+    métadonnées (tuile, coins, grille, horodatages, description des tableaux)
+    et des tableaux de la séquence encodée, chacun aligné sur 64 octets. À la
+    fermeture, un index JSON et une fin `MDBINDEX` permettent d'ouvrir le
+    fichier sans le parcourir ; sans eux (session interrompue), SessionReader
+    reconstruit l'index en sautant d'enregistrement en enregistrement.
+    Les écritures passent par un thread dédié : la capture n'attend jamais le disque.
+    """
+
+    MAGIC = b"MDBSESS1"
+    RECORD = struct.Struct("<4sIQ")
+    TRAILER = struct.Struct("<Q8s")
+    ALIGN = 64
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._fh = open(path, "wb")
+        self._fh.write(self.MAGIC)
+        self._index: List[Dict[str, object]] = []
+        self._writer: Optional[ThreadPoolExecutor] = ThreadPoolExecutor(max_workers=1, thread_name_prefix="session-writer")
+        self.pending = 0
+        self.written_bytes = len(self.MAGIC)
+        self._lock = threading.Lock()
+
+    def append(self, coord, frames, **meta):
+        """Met la séquence (TileFrames ou DeltaFrames, non modifiée ensuite) en file d'écriture."""
+        with self._lock:
+            writer = self._writer
+            if writer is None:
+                return
+            self.pending += 1
+        meta = dict(meta, coord=list(coord), kind=type(frames).__name__, wall_time=time.time())
+        writer.submit(self._write, frames, meta)
+
+    def _write(self, frames, meta: Dict[str, object]):
+        try:
+            arrays = frames.to_arrays()
+            start = self._fh.tell()
+            layout, cursor = {}, 0
+            for name, array in arrays.items():
+                array = np.ascontiguousarray(array)
+                cursor += -cursor % self.ALIGN
+                layout[name] = [array.dtype.str, list(array.shape), cursor]
+                cursor += array.nbytes
+            meta = dict(meta, arrays=layout)
+            header = json.dumps(meta).encode("utf-8")
+            # Les données commencent à une position alignée du fichier (vues mmap alignées).
+            head_len = self.RECORD.size + len(header)
+            pad = -(start + head_len) % self.ALIGN
+            header += b" " * pad
+            self._fh.write(self.RECORD.pack(b"REC1", len(header), cursor))
+            self._fh.write(header)
+            data_start = self._fh.tell()
+            for name, array in arrays.items():
+                offset = data_start + layout[name][2]
+                self._fh.write(b"\0" * (offset - self._fh.tell()))
+                self._fh.write(np.ascontiguousarray(array).tobytes())
+            self._fh.write(b"\0" * (data_start + cursor - self._fh.tell()))
+            self._fh.flush()
+            self._index.append({"offset": start, "coord": meta["coord"], "index": meta.get("index")})
+            self.written_bytes = self._fh.tell()
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    def close(self):
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is None:
+            return
+        writer.shutdown(wait=True)
+        index_offset = self._fh.tell()
+        self._fh.write(json.dumps(self._index).encode("utf-8"))
+        self._fh.write(self.TRAILER.pack(index_offset, b"MDBINDEX"))
+        self._fh.close()
+
+
+class SessionReader:
+    """Lecture d'une session SessionWriter par mmap : accès direct à n'importe quelle
+    capture, les tableaux renvoyés sont des vues sur le fichier (aucune copie)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fh = open(path, "rb")
+        if os.fstat(self._fh.fileno()).st_size < len(SessionWriter.MAGIC):
+            self._fh.close()
+            raise ValueError(f"{path} : pas une session memoire_de_blop")
+        self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(SessionWriter.MAGIC)] != SessionWriter.MAGIC:
+            self.close()
+            raise ValueError(f"{path} : pas une session memoire_de_blop")
+        self.index = self._read_index()
+
+    def _read_index(self) -> List[Dict[str, object]]:
+        mm, trailer = self._mm, SessionWriter.TRAILER
+        if len(mm) >= len(SessionWriter.MAGIC) + trailer.size:
+            index_offset, tag = trailer.unpack_from(mm, len(mm) - trailer.size)
+            if tag == b"MDBINDEX" and index_offset < len(mm):
+                try:
+                    return json.loads(bytes(mm[index_offset:len(mm) - trailer.size]))
+                except ValueError:
+                    pass
+        # Session interrompue : on suit la chaîne des enregistrements complets.
+        index, offset, record = [], len(SessionWriter.MAGIC), SessionWriter.RECORD
+        while offset + record.size <= len(mm):
+            tag, meta_len, data_len = record.unpack_from(mm, offset)
+            end = offset + record.size + meta_len + data_len
+            if tag != b"REC1" or end > len(mm):
+                break
+            meta = json.loads(bytes(mm[offset + record.size:offset + record.size + meta_len]))
+            index.append({"offset": offset, "coord": meta["coord"], "index": meta.get("index")})
+            offset = end
+        return index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def meta(self, k: int) -> Dict[str, object]:
+        offset = self.index[k]["offset"]
+        _, meta_len, _ = SessionWriter.RECORD.unpack_from(self._mm, offset)
+        start = offset + SessionWriter.RECORD.size
+        return json.loads(bytes(self._mm[start:start + meta_len]))
+
+    def frames(self, k: int):
+        """Séquence de la capture k (DeltaFrames ou TileFrames) en vues sur le fichier."""
+        offset = self.index[k]["offset"]
+        _, meta_len, _ = SessionWriter.RECORD.unpack_from(self._mm, offset)
+        meta = self.meta(k)
+        data_start = offset + SessionWriter.RECORD.size + meta_len
+        arrays = {}
+        for name, (dtype, shape, rel) in meta["arrays"].items():
+            count = int(np.prod(shape)) if shape else 1
+            arrays[name] = np.frombuffer(self._mm, dtype=np.dtype(dtype), count=count,
+                                         offset=data_start + rel).reshape(shape)
+        return sequence_from_arrays(arrays)
+
+    def close(self):
+        try:
+            self._mm.close()
+        except (BufferError, ValueError):
+            # Des vues numpy sur le fichier sont encore vivantes : le mmap sera libéré avec elles.
+            pass
+        self._fh.close()
+
+
+# ------------------ Latence clic -> affichage ------------------
+class ClickTrace:
+    """Horodatages monotones (time.monotonic) des étapes d'un clic, du listener à l'affichage."""
+    __slots__ = ("trace_id", "coord", "marks")
+
+    def __init__(self, trace_id: int):
+        self.trace_id = trace_id
+        self.coord = None
+        self.marks: List[Tuple[str, float]] = []
+
+    def mark(self, stage: str, timestamp: Optional[float] = None):
+        self.marks.append((stage, time.monotonic() if timestamp is None else timestamp))
+
+    def first(self, stage: str) -> Optional[float]:
+        for name, timestamp in self.marks:
+            if name == stage:
+                return timestamp
+        return None
+
+
+class LatencyTracer:
+    """Statistiques glissantes (p50/p95/p99) du délai entre le clic et chaque étape.
+
+    Étapes : event (clic reçu), resolved (tuile trouvée), queued (confiée au moteur),
+    capture_started, frame_grabbed (une par image), sequence_complete, resized,
+    first_frame_displayed.
+    """
+    STAGES = (
+        "event", "resolved", "queued", "capture_started", "frame_grabbed",
+        "sequence_complete", "resized", "first_frame_displayed",
+    )
+
+    def __init__(self, window: int = 500):
+        self._traces: "deque[ClickTrace]" = deque(maxlen=max(1, int(window)))
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def begin(self, timestamp: Optional[float] = None) -> ClickTrace:
+        trace = ClickTrace(next(self._ids))
+        trace.mark("event", timestamp)
+        return trace
+
+    def finish(self, trace: ClickTrace):
+        with self._lock:
+            self._traces.append(trace)
+
+    def reject(self, trace: ClickTrace):
+        with self._lock:
+            self.rejected += 1
+
+    def traces(self) -> List[ClickTrace]:
+        with self._lock:
+            return list(self._traces)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Pour chaque étape : percentiles (ms) du délai depuis le clic, sur la fenêtre glissante."""
+        delays: Dict[str, List[float]] = {stage: [] for stage in self.STAGES[1:]}
+        for trace in self.traces():
+            t0 = trace.first("event")
+            for stage in delays:
+                timestamp = trace.first(stage)
+                if t0 is not None and timestamp is not None:
+                    delays[stage].append((timestamp - t0) * 1000.0)
+        result = {}
+        for stage, values in delays.items():
+            if values:
+                p50, p95, p99 = np.percentile(values, (50, 95, 99))
+                result[stage] = {"count": len(values), "p50": float(p50), "p95": float(p95), "p99": float(p99)}
+        return result
+
+    def summary_text(self) -> str:
+        display = self.stats().get("first_frame_displayed")
+        if not display:
+            return ""
+        return (f"clic→affichage p50 {display['p50']:.0f} ms · p95 {display['p95']:.0f} ms · "
+                f"p99 {display['p99']:.0f} ms ({display['count']})")
+
+    def export(self, path: str):
+        """Écrit les traces brutes et les percentiles ; CSV si path finit par .csv, sinon JSON."""
+        traces = self.traces()
+        if path.lower().endswith(".csv"):
+            with open(path, "w", encoding="utf-8", newline="") as fh:
+                writer = csv.writer(fh)
+                writer.writerow(["trace_id", "coord", "stage", "monotonic_s", "since_event_ms"])
+                for trace in traces:
+                    t0 = trace.first("event") or 0.0
+                    for stage, timestamp in trace.marks:
+                        writer.writerow([trace.trace_id, trace.coord, stage, f"{timestamp:.6f}",
+                                         f"{(timestamp - t0) * 1000.0:.3f}"])
+            return
+        payload = {
+            "stats": self.stats(),
+            "rejected": self.rejected,
+            "traces": [
+                {"id": trace.trace_id, "coord": trace.coord, "marks": trace.marks}
+                for trace in traces
+            ],
+        }
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(payload, fh, indent=1)
+
+# ------------------ Moteur de capture partagé ------------------
+def frame_difference(a: np.ndarray, b: np.ndarray, samples: int = 64) -> float:
+    """Écart moyen absolu (0-255) entre deux images, estimé sur une grille d'environ samples² pixels."""
+    step = max(1, min(a.shape[0], a.shape[1]) // samples)
+    sa = a[::step, ::step].astype(np.int16)
+    sb = b[::step, ::step].astype(np.int16)
+    return float(np.abs(sa - sb).mean())
+
+
+class CaptureJob:
+    """Enregistrement en cours d'une tuile : zone écran, images reçues, callback de fin.
+
+    En mode adaptatif, la séquence s'arrête dès que `capture_stable_frames` images
+    consécutives sont inchangées (après `capture_min_frames`), et l'échantillonnage
+    passe à `capture_fast_interval` tant que la tuile change vite.
+    """
+
+    def __init__(self, coord, monitor: Monitor, frame_count: int, on_done, adaptive: bool = False,
+                 trace: Optional[ClickTrace] = None, reduce: int = 1, on_error=None):
+        self.coord = coord
+        self.trace = trace
+        self.monitor = monitor
+        self.frame_count = max(1, int(frame_count))
+        self.on_done = on_done
+        self.on_error = on_error
+        self.adaptive = adaptive
+        self.reduce = max(1, int(reduce))
+        self.frames = TileFrames(self.frame_count, int(monitor["height"]) // self.reduce,
+                                 int(monitor["width"]) // self.reduce)
+        self.submitted_at = time.monotonic()
+        self.next_due = self.submitted_at
+        self.interval = CONFIG["capture_interval"]
+        self.stable_run = 0
+        self.cancelled = False
+        self.prefilled = 0
+        self.owner = None
+        self.grab_failures = 0
+
+    def append(self, pixels: np.ndarray, timestamp: float):
+        """Range une image (réduite d'un facteur `reduce` si demandé), sans logique d'arrêt."""
+        if self.reduce > 1:
+            pixels = reduce_pixels(pixels, self.reduce)
+        self.frames.append(pixels, timestamp)
+
+    def record(self, pixels: np.ndarray, timestamp: float) -> bool:
+        """Ajoute une image ; retourne True quand la séquence est terminée."""
+        self.append(pixels, timestamp)
+        count = len(self.frames)
+        if self.adaptive and count >= 2:
+            diff = frame_difference(self.frames.array[count - 2], self.frames.array[count - 1])
+            self.stable_run = self.stable_run + 1 if diff <= CONFIG["capture_change_threshold"] else 0
+            fast = diff >= CONFIG["capture_fast_threshold"]
+            self.interval = CONFIG["capture_fast_interval"] if fast else CONFIG["capture_interval"]
+            live = count - self.prefilled
+            if live >= CONFIG["capture_min_frames"] and self.stable_run >= CONFIG["capture_stable_frames"]:
+                return True
+        return count >= self.frame_count
+
+
+def union_monitor(monitors: List[Monitor]) -> Monitor:
+    left = min(int(mon["left"]) for mon in monitors)
+    top = min(int(mon["top"]) for mon in monitors)
+    right = max(int(mon["left"]) + int(mon["width"]) for mon in monitors)
+    bottom = max(int(mon["top"]) + int(mon["height"]) for mon in monitors)
+    return {"left": left, "top": top, "width": right - left, "height": bottom - top}
+
+
+class FrameRing:
+    """Derniers grabs d'une zone fixe (la grille) dans un buffer circulaire préalloué.
+
+    push() (thread de capture) et since() (thread de la file de clics) prennent le
+    même verrou : une image n'est jamais lue à moitié écrite ni associée à
+    l'horodatage d'une autre.
+    """
+
+    def __init__(self, monitor: Monitor, seconds: float, interval: float, owner=None):
+        self.monitor = dict(monitor)
+        self.owner = owner
+        self.seconds = float(seconds)
+        self.interval = max(1e-3, float(interval))
+        left, top, width, height = _monitor_key(monitor)
+        capacity = int(np.ceil(self.seconds / self.interval)) + 1
+        self.array = np.empty((capacity, height, width, 3), dtype=np.uint8)
+        self.times = np.full(capacity, -np.inf)
+        self.next_due = 0.0
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def push(self, pixels: np.ndarray, timestamp: float, tick_time: float):
+        with self._lock:
+            store_pixels(self.array[self._next], pixels)
+            self.times[self._next] = timestamp
+            self._next = (self._next + 1) % self.array.shape[0]
+        self.next_due = tick_time + self.interval
+
+    def contains(self, monitor: Monitor) -> bool:
+        left, top, width, height = _monitor_key(monitor)
+        rl, rt, rw, rh = _monitor_key(self.monitor)
+        return rl <= left and rt <= top and left + width <= rl + rw and top + height <= rt + rh
+
+    def since(self, t0: float, monitor: Monitor) -> List[Tuple[np.ndarray, float]]:
+        """Copies des images (découpées sur monitor, dans l'ordre) horodatées à partir de t0."""
+        if not self.contains(monitor):
+            return []
+        left, top, width, height = _monitor_key(monitor)
+        ox, oy = left - self.monitor["left"], top - self.monitor["top"]
+        with self._lock:
+            order = [(self._next + k) % len(self.times) for k in range(len(self.times))]
+            return [
+                (self.array[slot, oy:oy + height, ox:ox + width].copy(), float(self.times[slot]))
+                for slot in order if self.times[slot] >= t0
+            ]
+
+
+class CaptureEngine:
+    """Un seul thread de capture pour toutes les tuiles.
+
+    À chaque tick, la boîte englobante des tuiles dues est capturée une seule
+    fois puis découpée par tuile : N captures simultanées coûtent un grab par
+    tick au lieu de N. Les échéances des tuiles sont alignées sur l'horloge du
+    moteur (pas `tick`), donc le nombre de grabs par seconde est borné par
+    1 / tick quel que soit le nombre de tuiles. En mode multi-clients, chaque
+    propriétaire (`owner`, une fenêtre Dofus) a sa propre boîte : un grab par
+    fenêtre active et par tick, jamais l'union de fenêtres éloignées.
+
+    Avec set_preroll(), le moteur capture aussi en continu la zone d'une grille
+    (toutes les `preroll_interval` s, même sans tuile en cours) dans un FrameRing,
+    un par propriétaire (`owner`) : une tuile soumise avec `since` démarre avec
+    les images déjà vues depuis cet instant, donc avant le clic.
+
+    on_done(coord, frames) reçoit chaque séquence terminée. Un grab raté est retenté
+    au tick suivant ; après `capture_grab_retries` échecs de suite, la tuile se termine
+    avec les images déjà reçues, ou par on_error(coord) si elle n'en a aucune. Une
+    exception levée par un callback est affichée puis signalée via on_error, sans
+    arrêter le thread de capture.
+    """
+
+    def __init__(self, source: FrameSource, tick: Optional[float] = None):
+        self.source = source
+        if tick is None:
+            tick = CONFIG["capture_fast_interval"] if CONFIG["adaptive_capture"] else CONFIG["capture_interval"]
+        self.tick = self._base_tick = max(1e-3, float(tick))
+        self.grab_count = 0
+        self.tick_count = 0
+        self._jobs: List[CaptureJob] = []
+        self._rings: Dict[object, FrameRing] = {}
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="capture-engine", daemon=True)
+        self._thread.start()
+
+    def set_preroll(self, monitor: Optional[Monitor], seconds: float = 0.0, interval: Optional[float] = None,
+                    owner=None):
+        """Active (zone, durée gardée, cadence) ou coupe (monitor=None) l'enregistrement avant clic de owner."""
+        interval = max(1e-3, CONFIG["preroll_interval"] if interval is None else float(interval))
+        with self._cond:
+            ring = self._rings.get(owner)
+            if monitor is None or seconds <= 0:
+                self._rings.pop(owner, None)
+            elif ring is None or (ring.monitor, ring.seconds, ring.interval) != (dict(monitor), seconds, interval):
+                self._rings[owner] = FrameRing(monitor, seconds, interval, owner)
+            # Le pas du moteur suit la cadence du buffer le plus fin.
+            self.tick = min([self._base_tick] + [r.interval for r in self._rings.values()])
+            self._cond.notify()
+
+    def preroll_monitor(self, owner=None) -> Optional[Monitor]:
+        ring = self._rings.get(owner)
+        return ring.monitor if ring is not None else None
+
+    def submit(self, coord, monitor: Monitor, on_done, frame_count: Optional[int] = None,
+               adaptive: Optional[bool] = None, trace: Optional[ClickTrace] = None,
+               since: Optional[float] = None, owner=None, reduce: int = 1, on_error=None) -> CaptureJob:
+        frame_count = CONFIG["capture_frames"] if frame_count is None else frame_count
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError("CaptureEngine arrêté")
+            if not self._thread.is_alive():
+                # Filet de sécurité : ne jamais accepter une tuile que personne ne capturera.
+                self._thread = threading.Thread(target=self._run, name="capture-engine", daemon=True)
+                self._thread.start()
+            buffered = []
+            if since is not None:
+                ring = self._rings.get(owner)
+                ring = ring if ring is not None and ring.contains(monitor) else None
+                buffered = ring.since(since, monitor) if ring is not None else []
+            job = CaptureJob(
+                coord, monitor, frame_count + len(buffered), on_done,
+                CONFIG["adaptive_capture"] if adaptive is None else adaptive,
+                trace, reduce, on_error,
+            )
+            for pixels, timestamp in buffered:
+                job.append(pixels, timestamp)
+            job.prefilled = len(buffered)
+            job.owner = owner
+            self._jobs.append(job)
+            self._cond.notify()
+        return job
+
+    def cancel(self, job: CaptureJob) -> bool:
+        """Abandonne une séquence en cours ; son callback ne sera pas appelé."""
+        with self._cond:
+            job.cancelled = True
+            if job in self._jobs:
+                self._jobs.remove(job)
+                return True
+        return False
+
+    def active_count(self) -> int:
+        with self._cond:
+            return len(self._jobs)
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._jobs.clear()
+            self._cond.notify()
+
+    def _run(self):
+        next_tick: Optional[float] = None
+        while True:
+            with self._cond:
+                while not self._jobs and not self._rings and not self._stopped:
+                    next_tick = None
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                now = time.monotonic()
+                if next_tick is None:
+                    next_tick = now
+                if now < next_tick:
+                    self._cond.wait(next_tick - now)
+                    continue
+                tick_time = next_tick
+                next_tick = max(next_tick + self.tick, now)
+                slack = self.tick / 2
+                due = [job for job in self._jobs if job.next_due <= tick_time + slack]
+                rings = [ring for ring in self._rings.values() if ring.next_due <= tick_time + slack]
+            if not due and not rings:
+                continue
+            try:
+                finished = self._tick(due, tick_time, rings)
+            except Exception:
+                traceback.print_exc()
+                finished = due
+            with self._cond:
+                for job in finished:
+                    if job in self._jobs:
+                        self._jobs.remove(job)
+            for job in finished:
+                if not job.cancelled:
+                    self._finish(job)
+
+    def _finish(self, job: CaptureJob):
+        """Appelle le callback de fin ; une erreur de callback reste confinée à cette tuile."""
+        try:
+            if job.frames:
+                job.frames.trim()
+                job.on_done(job.coord, job.frames)
+                return
+        except Exception:
+            traceback.print_exc()
+        if job.on_error is None:
+            return
+        try:
+            job.on_error(job.coord)
+        except Exception:
+            traceback.print_exc()
+
+    def _tick(self, due: List[CaptureJob], tick_time: float,
+              rings: Optional[List[FrameRing]] = None) -> List[CaptureJob]:
+        rings = rings or []
+        regions = [job.monitor for job in due] + [ring.monitor for ring in rings]
+        owners = [job.owner for job in due] + [ring.owner for ring in rings]
+        groups: Dict[object, List[int]] = {}
+        for idx, owner in enumerate(owners):
+            groups.setdefault(owner, []).append(idx)
+        finished = []
+        self.tick_count += 1
+        for members in groups.values():
+            bbox = union_monitor([regions[idx] for idx in members])
+            started_at = time.monotonic()
+            try:
+                shot = self.source.grab_array(bbox)
+            except Exception:
+                # Capture impossible (fenêtre fermée, permissions…) : nouvel essai au tick suivant,
+                # puis la tuile se termine avec les images déjà reçues (pré-roll compris).
+                for idx in members:
+                    if idx >= len(due):
+                        rings[idx - len(due)].next_due = tick_time + rings[idx - len(due)].interval
+                        continue
+                    job = due[idx]
+                    job.grab_failures += 1
+                    if job.grab_failures > CONFIG["capture_grab_retries"]:
+                        finished.append(job)
+                    else:
+                        job.next_due = tick_time + job.interval
+                continue
+            grabbed_at = time.monotonic()
+            self.grab_count += 1
+            for idx in members:
+                left, top, width, height = _monitor_key(regions[idx])
+                ox, oy = left - bbox["left"], top - bbox["top"]
+                pixels = shot[oy:oy + height, ox:ox + width]
+                if idx >= len(due):
+                    rings[idx - len(due)].push(pixels, grabbed_at, tick_time)
+                    continue
+                job = due[idx]
+                if job.trace is not None:
+                    if len(job.frames) == job.prefilled:
+                        job.trace.mark("capture_started", started_at)
+                    job.trace.mark("frame_grabbed", grabbed_at)
+                job.grab_failures = 0
+                if job.record(pixels, grabbed_at):
+                    if job.trace is not None:
+                        job.trace.mark("sequence_complete")
+                    finished.append(job)
+                else:
+                    job.next_due = tick_time + job.interval
+        return finished
+
+# ------------------ Rendu des tuiles ------------------
+def advance_frame(index: int, hold: int, durations: List[int]) -> Tuple[int, int, bool]:
+    """Un tick d'animation : (index, ticks restants sur cette image, image changée ?)."""
+    if len(durations) < 2:
+        return 0, 0, False
+    if hold > 1:
+        return index, hold - 1, False
+    index = (index + 1) % len(durations)
+    return index, durations[index], True
+
+
+class CompositeTileRenderer:
+    """Rendu de toute la grille dans une seule image de fond et une seule PhotoImage.
+
+    À chaque tick, seules les tuiles dont l'image change (fin de sa durée) sont recopiées
+    dans l'image de fond, puis leur boîte englobante est poussée d'un bloc dans la
+    PhotoImage du canvas : un seul transfert vers Tk par tick, quel que soit le nombre
+    de tuiles changées, et aucun appel Tk pour un tick sans changement.
+    """
+
+    def __init__(self, canvas, rows: int, cols: int, cell: int, background: str = "#111111"):
+        self.canvas = canvas
+        self.background = background
+        self.rows, self.cols, self.cell = 0, 0, 0
+        self.backing: Optional[Image.Image] = None
+        self.photo = None
+        self._patch = None
+        self.item = None
+        self._frames: Dict[Tuple[int, int], List[Image.Image]] = {}
+        self._durations: Dict[Tuple[int, int], List[int]] = {}
+        self._index: Dict[Tuple[int, int], int] = {}
+        self._hold: Dict[Tuple[int, int], int] = {}
+        self.last_dirty_count = 0
+        self.skipped_ticks = 0
+        self.configure(rows, cols, cell)
+
+    def configure(self, rows: int, cols: int, cell: int):
+        cell = max(1, int(cell))
+        if cell != self.cell:
+            # Les séquences à l'ancienne taille seront remplacées par le redimensionnement en arrière-plan.
+            self._frames.clear()
+            self._durations.clear()
+            self._index.clear()
+            self._hold.clear()
+        self.rows, self.cols, self.cell = max(1, int(rows)), max(1, int(cols)), cell
+        self.backing = Image.new("RGB", (self.cols * cell, self.rows * cell), self.background)
+        for coord, frames in self._frames.items():
+            self._blit(coord, frames[self._index.get(coord, 0)])
+        self.photo = ImageTk.PhotoImage(self.backing)
+        if self.item is None:
+            self.item = self.canvas.create_image(0, 0, image=self.photo, anchor="nw")
+            self.canvas.tag_lower(self.item)
+        else:
+            self.canvas.itemconfig(self.item, image=self.photo)
+
+    def set_tile(self, coord, frames: List[Image.Image]):
+        if not frames:
+            return
+        durations = getattr(frames, "durations", None) or [1] * len(frames)
+        self._frames[coord] = frames
+        self._durations[coord] = durations
+        self._index[coord] = 0
+        self._hold[coord] = durations[0]
+        self._blit(coord, frames[0])
+        self._push([coord])
+
+    def clear(self):
+        self._frames.clear()
+        self._durations.clear()
+        self._index.clear()
+        self._hold.clear()
+        if self.item is not None:
+            self.canvas.delete(self.item)
+            self.item = None
+        self.photo = self._patch = None
+
+    def has_tiles(self) -> bool:
+        return bool(self._frames)
+
+    def tick(self) -> bool:
+        """Avance toutes les séquences ; retourne False s'il n'y a rien à animer."""
+        dirty = []
+        for coord, frames in self._frames.items():
+            idx, hold, changed = advance_frame(self._index[coord], self._hold[coord], self._durations[coord])
+            self._index[coord], self._hold[coord] = idx, hold
+            if changed:
+                self._blit(coord, frames[idx])
+                dirty.append(coord)
+        self.last_dirty_count = len(dirty)
+        if dirty:
+            self._push(dirty)
+        else:
+            self.skipped_ticks += 1
+        return bool(self._frames)
+
+    def _box(self, coord) -> Tuple[int, int, int, int]:
+        j, i = coord
+        return i * self.cell, j * self.cell, (i + 1) * self.cell, (j + 1) * self.cell
+
+    def _blit(self, coord, frame: Image.Image):
+        j, i = coord
+        if not (0 <= j < self.rows and 0 <= i < self.cols) or self.backing is None:
+            return
+        box = self._box(coord)
+        if frame.size == (self.cell, self.cell) and frame.mode == self.backing.mode:
+            # Copie directe du cœur PIL : Image.paste coûte surtout ses vérifications Python.
+            frame.load()
+            self.backing.im.paste(frame.im, box)
+        else:
+            self.backing.paste(frame, box[:2])
+
+    def _push(self, coords):
+        if self.photo is None:
+            return
+        boxes = [self._box(coord) for coord in coords]
+        x0, y0 = min(box[0] for box in boxes), min(box[1] for box in boxes)
+        x1, y1 = max(box[2] for box in boxes), max(box[3] for box in boxes)
+        if (x0, y0, x1, y1) == (0, 0) + self.backing.size:
+            self.photo.paste(self.backing)
+            return
+        # Zone partielle : une PhotoImage intermédiaire (réutilisée à taille égale) puis une copie Tk.
+        region = self.backing.crop((x0, y0, x1, y1))
+        if self._patch is None or (self._patch.width(), self._patch.height()) != region.size:
+            self._patch = ImageTk.PhotoImage(region)
+        else:
+            self._patch.paste(region)
+        self.canvas.tk.call(str(self.photo), "copy", str(self._patch), "-to", x0, y0)
+
+# ------------------ Signatures des tuiles ------------------
+def frame_hashes(frames: np.ndarray, crop: Optional[float] = None) -> np.ndarray:
+    """dHash 64 bits de chaque image d'un bloc (F, H, W, 3), calculés d'un seul tenant.
+
+    On garde le centre de la tuile (les bords montrent les cases voisines), on le
+    réduit en 8×9 par moyenne de blocs puis on compare chaque bloc à son voisin de droite.
+    """
+    crop = CONFIG["match_crop"] if crop is None else crop
+    f, h, w = frames.shape[:3]
+    if h < 9 or w < 9:
+        # Image plus petite que la grille 8×9 : pixels répétés, sinon des blocs seraient vides.
+        frames = np.repeat(np.repeat(frames, -(-9 // h), axis=1), -(-9 // w), axis=2)
+        f, h, w = frames.shape[:3]
+    ch, cw = min(h, max(9, int(h * crop))), min(w, max(9, int(w * crop)))
+    top, left = (h - ch) // 2, (w - cw) // 2
+    gray = frames[:, top:top + ch, left:left + cw].astype(np.float32) @ np.array([0.299, 0.587, 0.114], np.float32)
+    row_edges = np.linspace(0, gray.shape[1], 9, dtype=np.int64)
+    col_edges = np.linspace(0, gray.shape[2], 10, dtype=np.int64)
+    small = np.add.reduceat(np.add.reduceat(gray, row_edges[:-1], axis=1), col_edges[:-1], axis=2)
+    small /= np.outer(np.diff(row_edges), np.diff(col_edges))
+    # Le seuil évite que le bruit de capture ne tire des bits au hasard dans les aplats.
+    bits = (small[:, :, 1:] - small[:, :, :-1] > 2.0).reshape(f, 64)
+    return np.packbits(bits, axis=1).view(">u8").ravel()
+
+
+def frame_tone(frame: np.ndarray, crop: Optional[float] = None) -> Tuple[int, int, int]:
+    """Couleur moyenne du motif au centre de l'image (hors fond, estimé sur le pourtour du cadrage).
+
+    Le dHash ignore la couleur (un même motif rouge ou bleu a le même hash) : la teinte le complète.
+    """
+    crop = CONFIG["match_crop"] if crop is None else crop
+    h, w = frame.shape[:2]
+    ch, cw = max(1, int(h * crop)), max(1, int(w * crop))
+    top, left = (h - ch) // 2, (w - cw) // 2
+    center = frame[top:top + ch, left:left + cw].astype(np.int16)
+    border = np.concatenate([center[0], center[-1], center[:, 0], center[:, -1]])
+    background = np.median(border, axis=0)
+    mask = np.abs(center - background).sum(axis=2) > 40
+    tone = center[mask].mean(axis=0) if mask.any() else background
+    return tuple(int(c) for c in tone)
+
+
+def sequence_signature(frames: "TileFrames") -> int:
+    """Signature d'une séquence : teinte RVB (bits 64-87) et dHash des dernières images
+    (l'état révélé), par vote bit à bit pour absorber le bruit d'une image isolée."""
+    tail_len = max(1, CONFIG["capture_stable_frames"])
+    tail_frames = frames.frames()[-tail_len:]
+    hashes = frame_hashes(tail_frames)
+    bits = np.unpackbits(hashes.astype(">u8").view(np.uint8).reshape(len(hashes), 8), axis=1)
+    majority = (bits.sum(axis=0) * 2 > len(hashes)).astype(np.uint8)
+    r, g, b = frame_tone(tail_frames[-1])
+    return (((r << 16) | (g << 8) | b) << 64) | int.from_bytes(np.packbits(majority).tobytes(), "big")
+
+
+_HASH_MASK = (1 << 64) - 1
+
+
+def signature_distance(a: int, b: int) -> int:
+    """Distance de Hamming entre dHash, ou 65 (hors seuil) si les teintes sont trop éloignées."""
+    ta, tb = a >> 64, b >> 64
+    if max(abs(((ta >> s) & 0xFF) - ((tb >> s) & 0xFF)) for s in (0, 8, 16)) > CONFIG["match_tone_delta"]:
+        return 65
+    return bin((a ^ b) & _HASH_MASK).count("1")
+
+
+class TileSignatureIndex:
+    """Index des signatures : tuiles au contenu probablement identique en O(1) par capture.
+
+    Le dHash 64 bits est découpé en 8 bandes de 8 bits : deux signatures à
+    `max_distance` < 8 bits d'écart ou moins partagent forcément une bande. On ne
+    compare donc la nouvelle tuile (dHash puis teinte) qu'aux tuiles de ses 8
+    seaux, sans parcourir la grille.
+    Chaque paire (ou groupe) reçoit un numéro stable pour la mise en couleur.
+    """
+
+    BANDS = 8
+
+    def __init__(self, max_distance: Optional[int] = None):
+        self.max_distance = CONFIG["match_distance"] if max_distance is None else max_distance
+        self.signatures: Dict[Tuple[int, int], int] = {}
+        self._buckets: List[Dict[int, set]] = [{} for _ in range(self.BANDS)]
+        self.groups: Dict[Tuple[int, int], int] = {}
+        self._members: Dict[int, set] = {}
+        self._next_group = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def _bands(cls, signature: int):
+        for band in range(cls.BANDS):
+            yield band, (signature >> (8 * band)) & 0xFF
+
+    def _remove(self, coord):
+        old = self.signatures.pop(coord, None)
+        if old is None:
+            return
+        for band, key in self._bands(old):
+            bucket = self._buckets[band].get(key)
+            if bucket is not None:
+                bucket.discard(coord)
+                if not bucket:
+                    del self._buckets[band][key]
+        group = self.groups.pop(coord, None)
+        if group is not None:
+            members = self._members[group]
+            members.discard(coord)
+            if len(members) < 2:
+                # Une tuile seule n'est plus une paire.
+                for other in members:
+                    self.groups.pop(other, None)
+                del self._members[group]
+
+    def add(self, coord, signature: int) -> List[Tuple[int, int]]:
+        """Indexe la tuile (en remplaçant sa signature précédente) et retourne ses correspondances."""
+        with self._lock:
+            self._remove(coord)
+            candidates = set()
+            for band, key in self._bands(signature):
+                candidates |= self._buckets[band].get(key, set())
+                self._buckets[band].setdefault(key, set()).add(coord)
+            self.signatures[coord] = signature
+            matches = sorted(
+                other for other in candidates
+                if signature_distance(signature, self.signatures[other]) <= self.max_distance
+            )
+            group = next((self.groups[other] for other in matches if other in self.groups), None)
+            if matches:
+                if group is None:
+                    group = self._next_group
+                    self._next_group += 1
+                    self._members[group] = set()
+                for other in [coord, *matches]:
+                    if other not in self.groups:
+                        self.groups[other] = group
+                        self._members[group].add(other)
+            return matches
+
+    def matches(self, coord) -> List[Tuple[int, int]]:
+        with self._lock:
+            group = self.groups.get(coord)
+            if group is None:
+                return []
+            return sorted(self._members[group] - {coord})
+
+    def clear(self):
+        with self._lock:
+            self.signatures.clear()
+            for bucket in self._buckets:
+                bucket.clear()
+            self.groups.clear()
+            self._members.clear()
+            self._next_group = 0
+
+
+# ------------------ Fenêtres Dofus ------------------
+Rect = Tuple[int, int, int, int]
+
+
+class WindowProvider:
+    """Accès aux processus et fenêtres du système, remplaçable (SyntheticWindowProvider) hors Windows."""
+
+    def processes(self) -> Dict[int, str]:
+        """pid -> nom de l'exécutable (en minuscules)."""
+        raise NotImplementedError
+
+    def children(self, pid: int) -> List[int]:
+        raise NotImplementedError
+
+    def windows(self, pids: set) -> List[Tuple[int, int, str]]:
+        """(hwnd, pid, titre) des fenêtres « Release » visibles appartenant à ces processus."""
+        raise NotImplementedError
+
+    def window_rect(self, hwnd: int) -> Optional[Rect]:
+        """(x, y, w, h) de la fenêtre, ou None si elle est fermée ou réduite."""
+        raise NotImplementedError
+
+
+class Win32WindowProvider(WindowProvider):
+    def processes(self) -> Dict[int, str]:
+        result = {}
+        for proc in psutil.process_iter(["pid", "name"]):
+            try:
+                result[proc.info["pid"]] = (proc.info["name"] or "").lower()
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        return result
+
+    def children(self, pid: int) -> List[int]:
+        try:
+            return [child.pid for child in psutil.Process(pid).children(recursive=True)]
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return []
+
+    def windows(self, pids: set) -> List[Tuple[int, int, str]]:
+        return enumerate_windows_for_pids(pids)
+
+    def window_rect(self, hwnd: int) -> Optional[Rect]:
+        if user32 is None or not user32.IsWindow(hwnd) or user32.IsIconic(hwnd):
+            return None
+        return get_window_rect(hwnd)
+
+
+class SyntheticWindowProvider(WindowProvider):
+    """Processus et fenêtres en mémoire, déplaçables à la main : pour exercer le suivi sans Windows."""
+
+    def __init__(self):
+        self.procs: Dict[int, str] = {}
+        self.parents: Dict[int, int] = {}
+        self.wins: Dict[int, Dict[str, object]] = {}
+        self.calls = {"processes": 0, "children": 0, "windows": 0, "window_rect": 0}
+
+    def add_window(self, hwnd: int, pid: int, title: str, rect: Rect, parent: Optional[int] = None,
+                   name: str = "dofus.exe"):
+        self.procs.setdefault(pid, name if parent is None else "child.exe")
+        if parent is not None:
+            self.procs.setdefault(parent, name)
+            self.parents[pid] = parent
+        self.wins[hwnd] = {"pid": pid, "title": title, "rect": tuple(rect)}
+
+    def move_window(self, hwnd: int, rect: Rect):
+        self.wins[hwnd]["rect"] = tuple(rect)
+
+    def close_window(self, hwnd: int):
+        self.wins.pop(hwnd, None)
+
+    def processes(self) -> Dict[int, str]:
+        self.calls["processes"] += 1
+        return dict(self.procs)
+
+    def children(self, pid: int) -> List[int]:
+        self.calls["children"] += 1
+        found, frontier = [], [pid]
+        while frontier:
+            parent = frontier.pop()
+            kids = [child for child, p in self.parents.items() if p == parent]
+            found.extend(kids)
+            frontier.extend(kids)
+        return found
+
+    def windows(self, pids: set) -> List[Tuple[int, int, str]]:
+        self.calls["windows"] += 1
+        return [(hwnd, win["pid"], win["title"]) for hwnd, win in self.wins.items()
+                if win["pid"] in pids and "release" in win["title"].lower()]
+
+    def window_rect(self, hwnd: int) -> Optional[Rect]:
+        self.calls["window_rect"] += 1
+        win = self.wins.get(hwnd)
+        return win["rect"] if win else None
+
+
+class WindowTracker:
+    """Découverte incrémentale des fenêtres Dofus et suivi de la fenêtre cible.
+
+    Les arbres de processus ne sont recalculés que pour les nouveaux dofus.exe
+    (ou ceux dont aucune fenêtre n'a encore été trouvée) et les entrées ne sont
+    mises à jour que si leur titre ou leur rectangle a changé. Dès qu'une
+    fenêtre est suivie (une par client en mode multi-clients), le thread se
+    contente d'interroger leurs rectangles et appelle le on_move(rect) de chacune
+    à chaque déplacement (sur le thread du tracker).
+    """
+
+    def __init__(self, provider: WindowProvider, poll_interval: Optional[float] = None,
+                 scan_interval: Optional[float] = None):
+        self.provider = provider
+        self.poll_interval = CONFIG["window_poll_interval"] if poll_interval is None else poll_interval
+        self.scan_interval = CONFIG["window_scan_interval"] if scan_interval is None else scan_interval
+        self._trees: Dict[int, set] = {}
+        self._fruitless: set = set()
+        self._entries: Dict[int, Dict[str, object]] = {}
+        self._targets: Dict[int, Tuple[Rect, object]] = {}
+        self._last_scan = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # --- Découverte ---
+    def scan(self) -> List[Dict[str, object]]:
+        with self._lock:
+            procs = self.provider.processes()
+            roots = {pid for pid, name in procs.items() if name == "dofus.exe"}
+            for pid in list(self._trees):
+                if pid not in roots:
+                    del self._trees[pid]
+            for pid in roots:
+                if pid not in self._trees or pid in self._fruitless:
+                    self._trees[pid] = {pid, *self.provider.children(pid)}
+            pid_set = set().union(*self._trees.values()) if self._trees else set()
+            found = self.provider.windows(pid_set) if pid_set else []
+
+            owners = set()
+            alive = set()
+            for hwnd, pid, title in found:
+                if hwnd in alive:
+                    continue
+                rect = self.provider.window_rect(hwnd)
+                if not rect:
+                    continue
+                alive.add(hwnd)
+                title = title.strip()
+                entry = self._entries.get(hwnd)
+                if entry is None or entry["title"] != title:
+                    self._entries[hwnd] = {
+                        "hwnd": hwnd,
+                        "title": title,
+                        "rect": rect,
+                        "label": f"{title} — 0x{hwnd:08X}"
+                    }
+                elif entry["rect"] != rect:
+                    entry["rect"] = rect
+                owners.add(pid)
+            for hwnd in list(self._entries):
+                if hwnd not in alive:
+                    del self._entries[hwnd]
+            self._fruitless = {root for root, tree in self._trees.items() if not tree & owners}
+            self._last_scan = time.monotonic()
+            return sorted(self._entries.values(), key=lambda e: e["title"].lower())
+
+    # --- Suivi des fenêtres cibles ---
+    def track(self, hwnd: int, rect: Rect, on_move):
+        with self._lock:
+            self._targets[hwnd] = (tuple(rect), on_move)
+        self.start()
+
+    def untrack(self, hwnd: Optional[int] = None):
+        """Arrête de suivre hwnd (toutes les fenêtres si None)."""
+        with self._lock:
+            if hwnd is None:
+                self._targets.clear()
+            else:
+                self._targets.pop(hwnd, None)
+
+    def poll(self) -> bool:
+        """Un relevé des rectangles suivis ; True (et on_move appelé) si l'un a changé."""
+        with self._lock:
+            targets = list(self._targets.items())
+        moved = False
+        for hwnd, (previous, on_move) in targets:
+            rect = self.provider.window_rect(hwnd)
+            if not rect or rect == previous:
+                continue
+            with self._lock:
+                if hwnd not in self._targets:
+                    continue
+                self._targets[hwnd] = (rect, on_move)
+            moved = True
+            if on_move is not None:
+                on_move(rect)
+        return moved
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="window-tracker", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                if self._targets:
+                    self.poll()
+                elif time.monotonic() - self._last_scan >= self.scan_interval:
+                    self.scan()
+            except Exception:
+                # Un relevé raté (fenêtre fermée entre deux appels) ne doit pas arrêter le suivi.
+                continue
+
+
+def create_window_provider() -> Optional[WindowProvider]:
+    return Win32WindowProvider() if IS_WINDOWS else None
+
+# ------------------ Cache de calibration ------------------
+class CalibrationCache:
+    """Calibrations mémorisées par fenêtre (titre + résolution), dans un fichier JSON.
+
+    Les coins (et le plateau détecté) sont stockés relativement au rectangle de la
+    fenêtre : l'entrée reste valable quand la fenêtre est déplacée. La résolution
+    fait partie de la clé, si bien qu'une fenêtre redimensionnée ne retrouve pas
+    l'entrée périmée : le test ne demande que le rectangle, sans capture. Le
+    fichier n'est lu qu'à la première recherche.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: str):
+        self.path = path
+        self._entries: Optional[Dict[str, Dict[str, object]]] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(title: str, rect: Rect) -> str:
+        return f"{title}@{int(rect[2])}x{int(rect[3])}"
+
+    def _load(self) -> Dict[str, Dict[str, object]]:
+        if self._entries is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as handle:
+                    data = json.load(handle)
+                entries = data.get("entries", {}) if data.get("version") == self.VERSION else {}
+            except (OSError, ValueError, AttributeError):
+                entries = {}
+            self._entries = entries if isinstance(entries, dict) else {}
+        return self._entries
+
+    def lookup(self, title: str, rect: Rect) -> Optional[Dict[str, object]]:
+        """Entrée valable pour cette fenêtre à cette taille, ou None."""
+        with self._lock:
+            entry = self._load().get(self.key(title, rect))
+        if not isinstance(entry, dict):
+            return None
+        try:
+            points = [(float(px), float(py)) for px, py in entry["points"]]
+            quad = entry.get("board_quad")
+            quad = [(float(px), float(py)) for px, py in quad] if quad else None
+            n, m, cell = int(entry["n"]), int(entry["m"]), int(entry["cell"])
+        except (KeyError, TypeError, ValueError):
+            return None
+        w, h = rect[2], rect[3]
+        if len(points) != 4 or (quad is not None and len(quad) != 4) or min(n, m, cell) < 1:
+            return None
+        if any(not (0 <= px <= w and 0 <= py <= h) for px, py in points):
+            return None
+        return {"points": points, "board_quad": quad, "n": n, "m": m, "cell": cell}
+
+    def store(self, title: str, rect: Rect, points, board_quad, n: int, m: int, cell: int):
+        """Mémorise la calibration (coins absolus à l'écran) et réécrit le fichier."""
+        x, y = rect[0], rect[1]
+        entry = {
+            "points": [[round(px - x, 2), round(py - y, 2)] for px, py in points],
+            "board_quad": [[round(px - x, 2), round(py - y, 2)] for px, py in board_quad] if board_quad else None,
+            "n": int(n), "m": int(m), "cell": int(cell),
+            "saved": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        with self._lock:
+            entries = self._load()
+            entries[self.key(title, rect)] = entry
+            payload = json.dumps({"version": self.VERSION, "entries": entries}, ensure_ascii=False, indent=1)
+            try:
+                directory = os.path.dirname(os.path.abspath(self.path))
+                os.makedirs(directory, exist_ok=True)
+                # Écriture atomique : un arrêt brutal laisse l'ancien fichier intact.
+                fd, tmp_path = tempfile.mkstemp(prefix=".calibrations_", dir=directory)
+                with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                    handle.write(payload)
+                os.replace(tmp_path, self.path)
+            except OSError:
+                pass
+
+# ------------------ File des clics ------------------
+class ClickEvent:
+    __slots__ = ("engine", "coord", "point", "clicked", "due", "trace")
+
+    def __init__(self, engine: "MemoryEngine", coord, point: Point, clicked: float, due: float,
+                 trace: Optional[ClickTrace]):
+        self.engine, self.coord, self.point, self.trace = engine, coord, point, trace
+        self.clicked, self.due = clicked, due
+
+
+class ClickPipeline:
+    """File bornée entre l'écouteur souris et le(s) moteur(s) de capture.
+
+    push() est appelé sur le thread de l'écouteur : router.route(point) désigne le
+    moteur visé (le moteur lui-même, ou en mode multi-clients celui dont la fenêtre
+    contient le point), qui résout la tuile (O(1)) ; le clic est mis en file avec
+    une échéance à `click_delay` (immédiate avec le pré-enregistrement, qui fournit
+    déjà les images d'avant le clic). Un second clic sur une tuile déjà en file est
+    fusionné avec le premier ; file pleine, le clic est refusé. Un thread dédié
+    soumet les clics échus au moteur, qui annule la capture encore en cours de la
+    même tuile. Compteurs dans stats().
+
+    Chaque moteur branche ses callbacks avec attach() :
+    on_done(coord, frames, px, py, trace) est appelé sur le thread de capture ;
+    on_preview(coord, frames, px, py, trace) sur celui de la file, avec les images
+    déjà bufferisées ; on_status(kind, coord, point) sur le thread appelant
+    ("outside", "dropped"), sur celui de la file ("capturing") ou sur celui de la
+    capture ("failed" : capture impossible, la tuile est libérée ; aussi sur celui
+    de la file si la soumission lève une exception, la file continuant). Un clic
+    hors de toute fenêtre suivie (multi-clients) est seulement compté.
+    """
+
+    def __init__(self, router, on_done=None, on_status=None,
+                 maxsize: Optional[int] = None, delay: Optional[float] = None, on_preview=None):
+        self.router = router
+        self._handlers: Dict["MemoryEngine", Tuple[object, object, object]] = {}
+        self.maxsize = max(1, CONFIG["click_queue_size"] if maxsize is None else int(maxsize))
+        if delay is None:
+            delay = 0.0 if CONFIG["preroll"] > 0 else CONFIG["click_delay"]
+        self.delay = max(0.0, float(delay))
+        self._queue: deque = deque()
+        self._pending: Dict[Tuple[int, Tuple[int, int]], ClickEvent] = {}
+        self._cond = threading.Condition()
+        self._stopped = False
+        self.counters = {"received": 0, "outside": 0, "coalesced": 0, "dropped": 0, "submitted": 0}
+        if on_done is not None:
+            self.attach(router, on_done, on_status, on_preview)
+        self._thread = threading.Thread(target=self._run, name="click-pipeline", daemon=True)
+        self._thread.start()
+
+    def attach(self, engine: "MemoryEngine", on_done, on_status=None, on_preview=None):
+        with self._cond:
+            self._handlers[engine] = (on_done, on_status, on_preview)
+
+    def detach(self, engine: "MemoryEngine"):
+        """Oublie les callbacks et les clics en attente de ce moteur."""
+        with self._cond:
+            self._handlers.pop(engine, None)
+            self._queue = deque(event for event in self._queue if event.engine is not engine)
+            for key in [key for key, event in self._pending.items() if event.engine is engine]:
+                del self._pending[key]
+
+    def push(self, point: Point, trace: Optional[ClickTrace] = None) -> str:
+        """Retourne "queued", "coalesced", "dropped" ou "outside"."""
+        clicked = trace.first("event") if trace is not None else time.monotonic()
+        engine = self.router.route(point)
+        hit = engine.locate(point) if engine is not None else None
+        with self._cond:
+            self.counters["received"] += 1
+            handlers = self._handlers.get(engine)
+            if hit is None or handlers is None:
+                outcome, coord = "outside", None
+            else:
+                coord = hit[1]
+                key = (id(engine), coord)
+                if key in self._pending:
+                    outcome = "coalesced"
+                elif len(self._queue) >= self.maxsize:
+                    outcome = "dropped"
+                else:
+                    outcome = "queued"
+                    event = ClickEvent(engine, coord, point, clicked, time.monotonic() + self.delay, trace)
+                    self._queue.append(event)
+                    self._pending[key] = event
+                    self._cond.notify()
+            if outcome != "queued":
+                self.counters[outcome] += 1
+        if outcome != "queued":
+            if trace is not None:
+                self.router.latency.reject(trace)
+            on_status = handlers[1] if handlers is not None else None
+            if on_status is not None and outcome != "coalesced":
+                on_status(outcome, coord, point)
+        return outcome
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return dict(self.counters, queued=len(self._queue))
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._queue.clear()
+            self._pending.clear()
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                wait = self._queue[0].due - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                event = self._queue.popleft()
+                self._pending.pop((id(event.engine), event.coord), None)
+                handlers = self._handlers.get(event.engine)
+                if handlers is None:
+                    continue
+                self.counters["submitted"] += 1
+            try:
+                self._submit(event, handlers)
+            except Exception:
+                # Un clic fautif ne doit pas arrêter la file pour le reste de la session.
+                traceback.print_exc()
+                try:
+                    if handlers[1] is not None:
+                        handlers[1]("failed", event.coord, event.point)
+                except Exception:
+                    traceback.print_exc()
+
+    def _submit(self, event: ClickEvent, handlers):
+        on_done, on_status, on_preview = handlers
+        trace = event.trace
+        preview = failed = None
+        if on_preview is not None:
+            preview = lambda coord, frames, px, py, trace=trace, cb=on_preview: cb(coord, frames, px, py, trace)
+        if on_status is not None:
+            failed = lambda coord, px, py, point=event.point, cb=on_status: cb("failed", coord, point)
+        requested = event.engine.request_capture(
+            event.point,
+            lambda coord, frames, px, py, trace=trace, cb=on_done: cb(coord, frames, px, py, trace),
+            trace,
+            since=event.clicked - CONFIG["preroll"],
+            on_preview=preview,
+            on_failed=failed,
+        )
+        if on_status is not None:
+            on_status("capturing" if requested else "outside", event.coord, event.point)
+
+
+# ------------------ Moteur sans interface ------------------
+class MemoryEngine:
+    """Cœur de l'application, sans Tk : cible, grille, clic -> tuile, captures et stockage.
+
+    Utilisable tel quel depuis un script ou un service (avec une source
+    synthétique ou de rejeu, sans affichage) ; QuadGridNodesApp n'en est
+    qu'une vue. Les callbacks de capture sont appelés sur le thread du moteur.
+
+    Créé par un MultiClientEngine (`group`), il garde sa cible, sa grille et ses
+    séquences mais partage la source d'images, le moteur de capture, le suivi des
+    fenêtres, la file des clics, les latences et le journal du groupe.
+    """
+    DEFAULT_RATIOS = [
+        (0.5346, 0.2870),
+        (0.7786, 0.5023),
+        (0.6336, 0.6361),
+        (0.3898, 0.4139)
+    ]
+
+    def __init__(self, frame_source: Optional[FrameSource] = None,
+                 window_provider: Optional[WindowProvider] = None,
+                 group: Optional["MultiClientEngine"] = None):
+        self.group = group
+        spill_dir = CONFIG["spill_dir"]
+        if group is not None:
+            self.frame_source = group.frame_source
+            self.window_tracker = group.window_tracker
+            self.capture: Optional[CaptureEngine] = group.capture
+            self.latency = group.latency
+            self.client_index = next(group.client_ids)
+            if spill_dir:
+                spill_dir = os.path.join(spill_dir, f"client_{self.client_index}")
+                os.makedirs(spill_dir, exist_ok=True)
+        else:
+            self.frame_source = frame_source or create_frame_source()
+            if window_provider is None and self.frame_source.is_live:
+                window_provider = create_window_provider()
+            self.window_tracker = WindowTracker(window_provider) if window_provider is not None else None
+            self.capture = CaptureEngine(self.frame_source)
+            self.latency = LatencyTracer(CONFIG["latency_window"])
+            self.client_index = 0
+        self.vmon = self.frame_source.monitors[0]
+        self.sequence_store = SequenceStore(
+            CONFIG["frame_budget_mb"] * 1024 * 1024,
+            CONFIG["spill_budget_mb"] * 1024 * 1024,
+            spill_dir,
+        )
+        self.target_window_title = "Nodon"
+        self.target_hwnd: Optional[int] = None
+        self.target_rect = (self.vmon["left"], self.vmon["top"], self.vmon["width"], self.vmon["height"])
+        self.original_w, self.original_h = self.vmon["width"], self.vmon["height"]
+        self.initial_img: Optional[Image.Image] = None
+        self.points: List[Tuple[int, int]] = []
+        self.board_quad: Optional[List[Point]] = None
+        self.n, self.m, self.cell = 3, 5, 200
+        self.capture_reduce = 1
+        self.grid: Optional[List[List[Point]]] = None
+        self.grid_index: Optional[QuadGridIndex] = None
+        self.tile_history_keys: Dict[Tuple[int, int], int] = {}
+        self.click_history: List[Dict[str, object]] = []
+        self.tile_index = TileSignatureIndex()
+        if group is not None:
+            self.session: Optional[SessionWriter] = group.session
+            self.calibrations: Optional[CalibrationCache] = group.calibrations
+        else:
+            self.session = SessionWriter(CONFIG["session_file"]) if CONFIG["session_file"] else None
+            self.calibrations = CalibrationCache(CONFIG["calibration_cache"]) if CONFIG["calibration_cache"] else None
+        self.clicks: Optional[ClickPipeline] = None
+        self._inflight: Dict[Tuple[int, int], CaptureJob] = {}
+        self.cancelled_count = 0
+        self._lock = threading.Lock()
+
+    # --- Cible ---
+    def _find_target(self) -> Tuple[Optional[int], Optional[Rect]]:
+        """(hwnd, rectangle) de la fenêtre cible, sans capture ; (None, None) si introuvable."""
+        hwnd = self.target_hwnd
+        if hwnd is None and self.frame_source.is_live:
+            hwnd = find_window_by_title(self.target_window_title)
+        if hwnd:
+            rect = self.window_tracker.provider.window_rect(hwnd) if self.window_tracker else get_window_rect(hwnd)
+            if rect:
+                return hwnd, tuple(rect)
+        return None, None
+
+    def capture_target_window_image(self) -> bool:
+        """Capture la fenêtre cible. Retourne True si la fenêtre Dofus a été capturée."""
+        hwnd, rect = self._find_target()
+        if rect:
+            x, y, w, h = rect
+            monitor = {"top": y, "left": x, "width": w, "height": h}
+            self.initial_img = self.frame_source.grab(monitor)
+            self.target_rect = (x, y, w, h)
+            self.original_w, self.original_h = w, h
+            self.target_hwnd = hwnd
+            return True
+        # Fallback : écran entier
+        self.initial_img = self.frame_source.grab(self.vmon)
+        self.target_rect = (self.vmon["left"], self.vmon["top"], self.vmon["width"], self.vmon["height"])
+        self.original_w, self.original_h = self.vmon["width"], self.vmon["height"]
+        return False
+
+    def grab_target_image(self) -> Image.Image:
+        """(Re)capture initial_img sur le rectangle cible courant, sans toucher à la calibration."""
+        x, y, w, h = self.target_rect
+        self.initial_img = self.frame_source.grab({"top": y, "left": x, "width": w, "height": h})
+        return self.initial_img
+
+    def route(self, point: Point) -> Optional["MemoryEngine"]:
+        """Moteur qui reçoit un clic en point : toujours celui-ci (voir MultiClientEngine.route)."""
+        return self
+
+    def contains(self, point: Point) -> bool:
+        x, y, w, h = self.target_rect
+        return x <= point[0] < x + w and y <= point[1] < y + h
+
+    def scan_windows(self) -> List[Dict[str, object]]:
+        """Fenêtres Dofus disponibles (scan incrémental du tracker)."""
+        if self.window_tracker is None:
+            return []
+        return self.window_tracker.scan()
+
+    def follow_target(self, on_moved=None) -> bool:
+        """Suit la fenêtre cible en arrière-plan ; on_moved(old_rect, new_rect) après chaque recalage."""
+        if self.window_tracker is None or self.target_hwnd is None:
+            return False
+
+        def moved(rect):
+            old_rect = self.move_target(rect)
+            if on_moved is not None:
+                on_moved(old_rect, rect)
+
+        self.window_tracker.track(self.target_hwnd, self.target_rect, moved)
+        return True
+
+    def move_target(self, rect: Rect) -> Rect:
+        """Recale coins et grille sur le nouveau rectangle de la fenêtre cible et retourne l'ancien.
+
+        Un simple déplacement décale la grille du même vecteur ; un redimensionnement
+        remet les coins à l'échelle dans le nouveau rectangle.
+        """
+        with self._lock:
+            old_rect = self.target_rect
+            ox, oy, ow, oh = old_rect
+            x, y, w, h = rect
+            if (w, h) == (ow, oh):
+                dx, dy = x - ox, y - oy
+                self.points = [(px + dx, py + dy) for px, py in self.points]
+                if self.board_quad is not None:
+                    self.board_quad = [(px + dx, py + dy) for px, py in self.board_quad]
+                if self.grid_index is not None:
+                    self.grid_index = self.grid_index.translated(dx, dy)
+                    self.grid = self.grid_index.grid()
+            else:
+                sx, sy = w / max(1, ow), h / max(1, oh)
+                self.points = [(int(x + (px - ox) * sx), int(y + (py - oy) * sy)) for px, py in self.points]
+                if self.board_quad is not None:
+                    self.board_quad = [(x + (px - ox) * sx, y + (py - oy) * sy) for px, py in self.board_quad]
+                if self.grid_index is not None:
+                    self.grid_index = QuadGridIndex(self.points, self.n, self.m)
+                    self.grid = self.grid_index.grid()
+            self.target_rect = tuple(rect)
+        self._update_preroll()
+        return old_rect
+
+    def calibrate(self) -> bool:
+        """Cherche le plateau dans initial_img ; en cas de succès, les coins en découlent
+        (et suivent ensuite n et m). Retourne False si le plateau n'est pas trouvé."""
+        if self.initial_img is None:
+            return False
+        quad = detect_board_quad(self.initial_img)
+        if quad is None:
+            return False
+        x, y = self.target_rect[:2]
+        self.board_quad = [(x + px, y + py) for px, py in quad]
+        self.points = quad_tile_centers(self.board_quad, self.n, self.m)
+        return True
+
+    def has_calibration(self, title: str, rect: Rect) -> bool:
+        """Une calibration mémorisée existe pour cette fenêtre à cette taille."""
+        if self.calibrations is None or not CONFIG["warm_start"]:
+            return False
+        return self.calibrations.lookup(title, rect) is not None
+
+    def warm_start(self) -> bool:
+        """Reprend la calibration mémorisée de la fenêtre cible et précalcule la grille.
+
+        Ni capture ni détection : seul le rectangle de la fenêtre est relu. Retourne
+        False (rien n'est modifié) si la fenêtre n'a pas d'entrée à sa taille actuelle.
+        """
+        if self.calibrations is None or not CONFIG["warm_start"]:
+            return False
+        hwnd, rect = self._find_target()
+        if rect is None:
+            rect = (self.vmon["left"], self.vmon["top"], self.vmon["width"], self.vmon["height"])
+        entry = self.calibrations.lookup(self.target_window_title, rect)
+        if entry is None:
+            return False
+        x, y, w, h = rect
+        self.target_hwnd = hwnd
+        self.target_rect = rect
+        self.original_w, self.original_h = w, h
+        self.n, self.m, self.cell = entry["n"], entry["m"], entry["cell"]
+        if entry["board_quad"] is not None:
+            self.board_quad = [(x + px, y + py) for px, py in entry["board_quad"]]
+            self.configure_grid()
+        else:
+            self.configure_grid([(int(round(x + px)), int(round(y + py))) for px, py in entry["points"]])
+        return True
+
+    def remember_calibration(self):
+        """Mémorise coins, plateau, n, m et taille de case pour la fenêtre cible (voir CalibrationCache)."""
+        if self.calibrations is None or self.grid_index is None or len(self.points) != 4:
+            return
+        with self._lock:
+            state = (self.target_rect, list(self.points), self.board_quad, self.n, self.m, self.cell)
+        self.calibrations.store(self.target_window_title, *state)
+
+    def load_points_from_ratios(self, ratios=None):
+        x, y, w, h = self.target_rect
+        return [(int(x + rx * w), int(y + ry * h)) for (rx, ry) in (ratios or self.DEFAULT_RATIOS)]
+
+    # --- Grille ---
+    def configure_grid(self, points=None, n: Optional[int] = None, m: Optional[int] = None,
+                       cell: Optional[int] = None):
+        """Précalcule la grille (nœuds + index inverse) pour les coins et dimensions donnés.
+
+        Sans coins explicites et avec un plateau calibré, les coins sont recalculés
+        pour n et m.
+        """
+        if points is not None:
+            self.points = [tuple(p) for p in points]
+            self.board_quad = None
+        if n is not None:
+            self.n = max(1, int(n))
+        if m is not None:
+            self.m = max(1, int(m))
+        if cell is not None:
+            self.cell = max(10, int(cell))
+        if points is None and self.board_quad is not None:
+            self.points = quad_tile_centers(self.board_quad, self.n, self.m)
+        self.grid_index = QuadGridIndex(self.points, self.n, self.m)
+        self.grid = self.grid_index.grid()
+        self._update_preroll()
+
+    def preroll_monitor(self) -> Optional[Monitor]:
+        """Zone couverte par les tuiles de la grille (bornée à l'écran virtuel), ou None."""
+        if self.grid is None:
+            return None
+        xs = [p[0] for row in self.grid for p in row]
+        ys = [p[1] for row in self.grid for p in row]
+        half = self.cell // 2
+        left = max(self.vmon["left"], int(min(xs)) - half)
+        top = max(self.vmon["top"], int(min(ys)) - half)
+        right = min(self.vmon["left"] + self.vmon["width"], int(max(xs)) - half + self.cell)
+        bottom = min(self.vmon["top"] + self.vmon["height"], int(max(ys)) - half + self.cell)
+        if right <= left or bottom <= top:
+            return None
+        return {"left": left, "top": top, "width": right - left, "height": bottom - top}
+
+    def _update_preroll(self):
+        """Cale le pré-enregistrement (CONFIG["preroll"] secondes) sur la grille courante."""
+        if self.capture is None:
+            return
+        seconds = CONFIG["preroll"]
+        self.capture.set_preroll(self.preroll_monitor() if seconds > 0 else None, seconds, owner=self)
+
+    def locate(self, point: Point):
+        """((px, py), (j, i)) du nœud visé, ou None hors de la grille."""
+        if self.grid_index is None:
+            return None
+        return self.grid_index.lookup(point)
+
+    def set_cell(self, cell: int):
+        """Taille de capture des tuiles (px) ; la grille (n, m, coins) ne change pas."""
+        self.cell = max(10, int(cell))
+        self._update_preroll()
 
-CONFIG = {
-    "memory_window_ratio": 0.35,
-    "capture_frames": 10,
-    "capture_interval": 0.2,
-    "animation_interval": 0.2,
-    "max_capture_threads": 3,
-    "canvas_horizontal_padding": 20,
-    "canvas_vertical_padding": 40,
-}
+    def set_display_cell(self, display_cell: int) -> int:
+        """Taille d'affichage des tuiles : avec CONFIG["capture_reduce"], les captures sont
+        stockées réduites d'un facteur entier tant qu'elles restent au moins aussi grandes,
+        et jamais sous 9 px (la grille 8×9 du dHash de frame_hashes)."""
+        factor = self.cell // max(1, int(display_cell)) if CONFIG["capture_reduce"] else 1
+        self.capture_reduce = max(1, min(factor, self.cell // 9))
+        return self.capture_reduce
 
-# === API Windows ===
-if IS_WINDOWS and hasattr(ct, "windll"):
-    try:
-        user32 = ct.windll.user32
-    except AttributeError:
-        user32 = None
-else:
-    user32 = None
+    def tile_monitor(self, px: float, py: float) -> Monitor:
+        half = self.cell // 2
+        return {"left": int(px - half), "top": int(py - half), "width": self.cell, "height": self.cell}
 
-if IS_WINDOWS and hasattr(ct, "WINFUNCTYPE"):
-    EnumWindowsProc = ct.WINFUNCTYPE(ct.c_bool, wintypes.HWND, wintypes.LPARAM)
-else:
-    EnumWindowsProc = None
+    # --- Capture ---
+    def request_capture(self, point: Point, on_done, trace: Optional[ClickTrace] = None,
+                        since: Optional[float] = None, on_preview=None, on_failed=None):
+        """Résout le point et met la tuile en capture.
 
-class RECT(ct.Structure):
-    _fields_ = [
-        ("left", ct.c_long),
-        ("top", ct.c_long),
-        ("right", ct.c_long),
-        ("bottom", ct.c_long)
-    ]
+        on_done(coord, frames, px, py) est appelé sur le thread de capture.
+        Avec le pré-enregistrement actif, la séquence commence aux images bufferisées
+        depuis `since` (horloge time.monotonic) et on_preview(coord, frames, px, py)
+        les reçoit aussitôt, sur le thread appelant. Si la capture échoue, la tuile est
+        libérée, la trace rejetée et on_failed(coord, px, py) appelé (thread de capture).
+        Retourne (coord, (px, py)), ou None si le point est hors de la grille.
+        """
+        hit = self.locate(point)
+        if hit is None:
+            if trace is not None:
+                self.latency.reject(trace)
+            return None
+        (px, py), coord = hit
+        if trace is not None:
+            trace.coord = coord
+            trace.mark("resolved")
+        if self.capture is None:
+            return None
+        job: Optional[CaptureJob] = None
 
-def find_window_by_title(partial_title: str):
-    if not IS_WINDOWS or user32 is None:
-        return None
-    hwnd = user32.GetTopWindow(None)
-    while hwnd:
-        length = user32.GetWindowTextLengthW(hwnd)
-        if length > 0:
-            buffer = ct.create_unicode_buffer(length + 1)
-            user32.GetWindowTextW(hwnd, buffer, length + 1)
-            if partial_title.lower() in buffer.value.lower():
-                return hwnd
-        hwnd = user32.GetWindow(hwnd, 2)
-    return None
+        def done(done_coord, frames):
+            with self._lock:
+                if self._inflight.get(done_coord) is not job:
+                    return  # remplacée par une capture plus récente de la même tuile
+                del self._inflight[done_coord]
+            # Signature et encodage delta ici, sur le thread de capture : la vue n'a plus qu'à lire.
+            if len(frames):
+                self.tile_index.add(done_coord, sequence_signature(frames))
+                frames = DeltaFrames.encode(frames)
+            on_done(done_coord, frames, px, py)
 
-def get_window_rect(hwnd):
-    if not IS_WINDOWS or user32 is None:
-        return None
-    rect = RECT()
-    if user32.GetWindowRect(hwnd, ct.byref(rect)):
-        return rect.left, rect.top, rect.right - rect.left, rect.bottom - rect.top
-    return None
+        def failed(failed_coord):
+            with self._lock:
+                if self._inflight.get(failed_coord) is not job:
+                    return
+                del self._inflight[failed_coord]
+            if trace is not None:
+                self.latency.reject(trace)
+            if on_failed is not None:
+                on_failed(failed_coord, px, py)
 
-def get_work_area():
-    if IS_WINDOWS and user32 is not None:
+        with self._lock:
+            try:
+                job = self.capture.submit(coord, self.tile_monitor(px, py), done, trace=trace, since=since,
+                                          owner=self, reduce=self.capture_reduce, on_error=failed)
+            except RuntimeError:
+                return None
+            stale = self._inflight.get(coord)
+            self._inflight[coord] = job
+        if stale is not None and self.capture.cancel(stale):
+            self.cancelled_count += 1
+        if trace is not None:
+            trace.mark("queued")
+        if on_preview is not None and job.prefilled:
+            # Préfixe figé : le moteur n'écrit qu'après job.prefilled.
+            buffered = TileFrames.from_arrays(job.frames.array[:job.prefilled], job.frames.times[:job.prefilled])
+            on_preview(coord, buffered, px, py)
+        return coord, (px, py)
+
+    def open_click_pipeline(self, on_done, on_status=None, on_preview=None) -> ClickPipeline:
+        """File des clics (voir ClickPipeline) ; une seule par moteur, ou celle du groupe."""
+        if self.clicks is None:
+            if self.group is not None:
+                self.clicks = self.group.open_click_pipeline()
+                self.clicks.attach(self, on_done, on_status, on_preview)
+            else:
+                self.clicks = ClickPipeline(self, on_done, on_status, on_preview=on_preview)
+        return self.clicks
+
+    def record_sequence(self, coord, frames: DeltaFrames, px: float, py: float) -> Dict[str, object]:
+        """Range la séquence d'une tuile (historique + budget mémoire) et retourne l'entrée d'historique."""
+        with self._lock:
+            rel_point = (int(px - self.target_rect[0]), int(py - self.target_rect[1]))
+            history_key = len(self.click_history) + 1
+            snapshot_data = {
+                "index": history_key,
+                "coord": coord,
+                "relative_point": rel_point,
+                "timestamp": time.strftime("%H:%M:%S"),
+                "frame_bytes": frames.nbytes,
+            }
+            self.click_history.append(snapshot_data)
+            # La séquence affichée reste épinglée en RAM ; l'ancienne de cette tuile devient évinçable.
+            previous_key = self.tile_history_keys.get(coord)
+            self.tile_history_keys[coord] = history_key
+        self.sequence_store.add(history_key, frames, pinned=True)
+        if previous_key is not None:
+            self.sequence_store.unpin(previous_key)
+        if self.session is not None:
+            self.session.append(
+                coord, frames, index=history_key, client=self.client_index,
+                point=[px, py], target_rect=list(self.target_rect),
+                points=[list(p) for p in self.points], n=self.n, m=self.m, cell=self.cell,
+            )
+        return snapshot_data
+
+    def tile_sequence(self, coord) -> Optional[DeltaFrames]:
+        """Séquence affichée sur une tuile, lue via le SequenceStore (épinglée, donc résidente)."""
+        with self._lock:
+            key = self.tile_history_keys.get(coord)
+        return self.sequence_store.get(key) if key is not None else None
+
+    def clear_history(self):
+        with self._lock:
+            self.click_history.clear()
+            self.tile_history_keys.clear()
+        self.sequence_store.clear()
+
+    def reset(self):
+        self.clear_history()
+        self.tile_index.clear()
+
+    def close(self):
+        if self.group is not None:
+            # Ressources partagées : on ne retire que ce client, le groupe ferme le reste.
+            if self.clicks is not None:
+                self.clicks.detach(self)
+                self.clicks = None
+            if self.window_tracker is not None and self.target_hwnd is not None:
+                self.window_tracker.untrack(self.target_hwnd)
+            if self.capture is not None:
+                self.capture.set_preroll(None, owner=self)
+                self.capture = None
+            self.sequence_store.close()
+            self.group.discard(self)
+            return
+        if self.clicks is not None:
+            self.clicks.stop()
+            self.clicks = None
+        if self.window_tracker is not None:
+            self.window_tracker.stop()
+        if self.capture is not None:
+            self.capture.stop()
+            self.capture = None
+        self.sequence_store.close()
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+        if CONFIG["latency_export"]:
+            try:
+                self.latency.export(CONFIG["latency_export"])
+            except OSError:
+                pass
         try:
-            rect = RECT()
-            if user32.SystemParametersInfoW(0x0030, 0, ct.byref(rect), 0):
-                return rect.left, rect.top, rect.right - rect.left, rect.bottom - rect.top
+            self.frame_source.close()
         except Exception:
             pass
-    root = tk.Tk()
-    root.withdraw()
-    w, h = root.winfo_screenwidth(), root.winfo_screenheight()
-    root.destroy()
-    return 0, 0, w, h
 
-def enumerate_windows_for_pids(pid_set: set) -> List[Tuple[int, str]]:
-    if not IS_WINDOWS or win32process is None or win32gui is None or EnumWindowsProc is None or user32 is None:
-        return []
-    results: List[Tuple[int, str]] = []
+# ------------------ Moteur multi-clients ------------------
+class MultiClientEngine:
+    """Plusieurs fenêtres Dofus (un MemoryEngine par client) dans un seul processus.
 
-    def _callback(hwnd, lparam):
-        if not user32.IsWindowVisible(hwnd):
-            return True
-        _, pid = win32process.GetWindowThreadProcessId(hwnd)
-        if pid not in pid_set:
-            return True
-        title = win32gui.GetWindowText(hwnd)
-        if title and "release" in title.lower():
-            results.append((hwnd, title.strip()))
-        return True
+    Chaque client garde ses coins, sa grille et son SequenceStore ; la source
+    d'images, le thread de capture (un grab par fenêtre active et par tick), le
+    suivi des fenêtres, la file des clics, les latences et le journal de session
+    sont uniques. Un clic est routé vers le client dont la fenêtre le contient.
+    """
 
-    enum_cb = EnumWindowsProc(_callback)
-    user32.EnumWindows(enum_cb, 0)
-    return results
+    def __init__(self, frame_source: Optional[FrameSource] = None,
+                 window_provider: Optional[WindowProvider] = None):
+        self.frame_source = frame_source or create_frame_source()
+        self.vmon = self.frame_source.monitors[0]
+        if window_provider is None and self.frame_source.is_live:
+            window_provider = create_window_provider()
+        self.window_tracker = WindowTracker(window_provider) if window_provider is not None else None
+        self.capture: Optional[CaptureEngine] = CaptureEngine(self.frame_source)
+        self.latency = LatencyTracer(CONFIG["latency_window"])
+        self.session: Optional[SessionWriter] = SessionWriter(CONFIG["session_file"]) if CONFIG["session_file"] else None
+        self.calibrations = CalibrationCache(CONFIG["calibration_cache"]) if CONFIG["calibration_cache"] else None
+        self.clicks: Optional[ClickPipeline] = None
+        self.engines: List[MemoryEngine] = []
+        self.client_ids = itertools.count(1)
+        self._lock = threading.Lock()
 
-# ------------------ Grille bilinéaire ------------------
-def grid_intersections_in_quad(c1, c2, c3, c4, n, m) -> List[List[Point]]:
-    x1, y1 = map(float, c1)
-    x2, y2 = map(float, c2)
-    x3, y3 = map(float, c3)
-    x4, y4 = map(float, c4)
-    def bilinear(u: float, v: float) -> Point:
-        return (
-            (1 - u) * (1 - v) * x1 + u * (1 - v) * x2 + u * v * x3 + (1 - u) * v * x4,
-            (1 - u) * (1 - v) * y1 + u * (1 - v) * y2 + u * v * y3 + (1 - u) * v * y4,
-        )
-    return [[bilinear(i / m, j / n) for i in range(m + 1)] for j in range(n + 1)]
+    def scan_windows(self) -> List[Dict[str, object]]:
+        if self.window_tracker is None:
+            return []
+        return self.window_tracker.scan()
 
-def closest_point_with_indices(grid: List[List[Point]], target: Point):
-    tx, ty = target
-    best_pt, best_idx, best_d2 = None, (-1, -1), float("inf")
-    for j, row in enumerate(grid):
-        for i, (px, py) in enumerate(row):
-            d2 = (px - tx) ** 2 + (py - ty) ** 2
-            if d2 < best_d2:
-                best_d2, best_pt, best_idx = d2, (px, py), (j, i)
-    return best_pt, best_idx
+    def add_target(self, entry: Optional[Dict[str, object]] = None) -> MemoryEngine:
+        """Nouveau client ; avec une entrée de scan_windows(), sa fenêtre est capturée tout de suite."""
+        engine = MemoryEngine(group=self)
+        if entry is not None:
+            engine.target_hwnd = entry["hwnd"]
+            engine.target_window_title = entry["title"]
+            engine.capture_target_window_image()
+            engine.points = engine.load_points_from_ratios()
+        with self._lock:
+            self.engines.append(engine)
+        return engine
+
+    def discard(self, engine: MemoryEngine):
+        with self._lock:
+            if engine in self.engines:
+                self.engines.remove(engine)
+
+    def route(self, point: Point) -> Optional[MemoryEngine]:
+        """Client dont la fenêtre (avec une grille configurée) contient le point."""
+        with self._lock:
+            engines = list(self.engines)
+        for engine in engines:
+            if engine.grid_index is not None and engine.contains(point):
+                return engine
+        return None
+
+    def locate(self, point: Point):
+        engine = self.route(point)
+        return engine.locate(point) if engine is not None else None
+
+    def open_click_pipeline(self) -> ClickPipeline:
+        """File des clics commune ; chaque client s'y branche (MemoryEngine.open_click_pipeline)."""
+        with self._lock:
+            if self.clicks is None:
+                self.clicks = ClickPipeline(self)
+            return self.clicks
+
+    def close(self):
+        for engine in list(self.engines):
+            engine.close()
+        if self.clicks is not None:
+            self.clicks.stop()
+            self.clicks = None
+        if self.window_tracker is not None:
+            self.window_tracker.stop()
+        if self.capture is not None:
+            self.capture.stop()
+            self.capture = None
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+        if CONFIG["latency_export"]:
+            try:
+                self.latency.export(CONFIG["latency_export"])
+            except OSError:
+                pass
+        try:
+            self.frame_source.close()
+        except Exception:
+            pass
 
 # ------------------ Application principale ------------------
 class QuadGridNodesApp:
-    def __init__(self):
-        self.root = tk.Tk()
+    """Vue Tk du MemoryEngine : sélection de la fenêtre, configuration et affichage des tuiles.
+
+    En mode multi-clients, la vue principale (Tk) pilote un MultiClientEngine ;
+    chaque fenêtre Dofus supplémentaire a sa vue fille (Toplevel, `parent`) qui
+    partage l'interpréteur Tk, le pool de redimensionnement et les écouteurs.
+    """
+
+    BORDER_COLOR = "#ff3366"
+    MATCH_COLORS = ("#33ff99", "#33ccff", "#ffcc33", "#cc66ff", "#ff9933", "#66ffff")
+
+    def __init__(self, frame_source: Optional[FrameSource] = None, engine: Optional[MemoryEngine] = None,
+                 parent: Optional["QuadGridNodesApp"] = None):
+        self.parent = parent
+        self.children: List["QuadGridNodesApp"] = []
+        if parent is not None:
+            self.group = parent.group
+            self.engine = engine or self.group.add_target()
+            self.root = tk.Toplevel(parent.root)
+            self.screens = parent.screens
+            self.view_index = len(parent.children) + 1
+        else:
+            self.group = MultiClientEngine(frame_source) if CONFIG["multi_client"] and engine is None else None
+            self.engine = engine or (self.group.add_target() if self.group is not None else MemoryEngine(frame_source))
+            self.root = tk.Tk()
+            self.screens = DisplayTopology(fallback_monitors=lambda: self.engine.frame_source.refresh_monitors()[1:])
+            self.screens.attach(self.root)
+            self.view_index = 0
         self.root.title("🧠 Memory Helper — Aide au jeu")
         self.root.wm_attributes("-topmost", True)
 
         self.mode = "start"
-        self.points: List[Tuple[int, int]] = []
-        self.default_ratios = [
-            (0.5346, 0.2870),
-            (0.7786, 0.5023),
-            (0.6336, 0.6361),
-            (0.3898, 0.4139)
-        ]
-        self.target_window_title = "Nodon"
-        self.target_hwnd: Optional[int] = None
+        self.default_ratios = MemoryEngine.DEFAULT_RATIOS
         self._next_point_index = 0
         self._quitting = False
 
         self.preview_label = None
         self.status = None
-        self.n, self.m, self.cell = 3, 5, 200
-        self.display_cell = self.cell
+        self.canvas = None
+        self.display_cell = self.engine.cell
         self.tile_items = {}
-        self.tile_images = {}
         self.tile_border_items = {}
+        self.match_colors: Dict[Tuple[int, int], str] = {}
         self.tile_sequences = {}
         self.tile_animation_index: Dict[Tuple[int, int], int] = {}
+        self.tile_durations: Dict[Tuple[int, int], List[int]] = {}
+        self.tile_hold: Dict[Tuple[int, int], int] = {}
+        self.tile_renderer: Optional[CompositeTileRenderer] = None
+        self.memory_label = None
+        self.resized_cache: Dict[Tuple[Tuple[int, int], int], List[Image.Image]] = {}
+        self._rescale_generation = 0
+        self.resize_executor: Optional[ThreadPoolExecutor] = parent.resize_executor if parent is not None else ThreadPoolExecutor(
+            max_workers=CONFIG["resize_threads"], thread_name_prefix="tile-resize"
+        )
+        # Démarré ici, une fois : les workers sont prêts avant le premier clic.
+        self.image_pool: Optional[ImageProcessPool] = None
+        if parent is not None:
+            self.image_pool = parent.image_pool
+        elif CONFIG["resize_processes"] > 0:
+            self.image_pool = ImageProcessPool(CONFIG["resize_processes"])
         self.animation_job: Optional[str] = None
-        self.capture_executor = ThreadPoolExecutor(max_workers=CONFIG["max_capture_threads"])
         self.listener = None
         self.listener_lock = threading.Lock()
-        self.click_history: List[Dict[str, object]] = []
         self.click_map_label = None
+        self._click_map_source: Optional[Image.Image] = None
+        self._click_map_base: Optional[Image.Image] = None
+        self._click_map_preview: Optional[Image.Image] = None
+        self._click_map_photo = None
+        self._click_map_drawn = 0
         self.side_panel = None
         self.main_frame = None
         self.controls_frame = None
-        self.selector_var: Optional[tk.StringVar] = None
+        self.selector_var = None
+        self.selector_list = None
         self.dofus_entries: List[Dict[str, object]] = []
+        self._gate_auto = True
+        self._ui_pending: deque = deque()
+        self._ui_lock = threading.Lock()
+        self._ui_scheduled = False
 
-        self.sct = mss.mss()
-        self.vmon = self.sct.monitors[0]
-        self.pixel_ratio = self._detect_pixel_ratio()
+        self.pixel_ratio = parent.pixel_ratio if parent is not None else self._detect_pixel_ratio()
+        if parent is not None:
+            # Vue fille : la vue principale choisit sa fenêtre (_select_target) et garde la boucle Tk.
+            self.root.protocol("WM_DELETE_WINDOW", self.on_quit)
+            self._schedule_ui_drain()
+            return
 
         self.show_dofus_gate()
         self.root.protocol("WM_DELETE_WINDOW", self.on_quit)
+        self._schedule_ui_drain()
         self.start_keyboard_listener()
         self.root.mainloop()
 
-    def capture_target_window_image(self) -> bool:
-        """Capture la fenêtre cible. Retourne True si la fenêtre Dofus a été capturée."""
-        hwnd = self.target_hwnd or find_window_by_title(self.target_window_title)
-        if hwnd:
-            rect = get_window_rect(hwnd)
-            if rect:
-                x, y, w, h = rect
-                monitor = {"top": y, "left": x, "width": w, "height": h}
-                raw = self.sct.grab(monitor)
-                self.initial_img = Image.frombytes("RGB", (raw.width, raw.height), raw.rgb)
-                self.target_rect = (x, y, w, h)
-                self.original_w, self.original_h = w, h
-                self.target_hwnd = hwnd
-                return True
-        # Fallback : écran entier
-        raw = self.sct.grab(self.vmon)
-        self.initial_img = Image.frombytes("RGB", (raw.width, raw.height), raw.rgb)
-        self.target_rect = (self.vmon["left"], self.vmon["top"], self.vmon["width"], self.vmon["height"])
-        self.original_w, self.original_h = self.vmon["width"], self.vmon["height"]
-        return False
-
-    def load_points_from_ratios(self, ratios):
-        x, y, w, h = self.target_rect
-        return [(int(x + rx * w), int(y + ry * h)) for (rx, ry) in ratios]
-
     def _detect_pixel_ratio(self) -> float:
         if not IS_MAC:
             return 1.0
         try:
             logical_w = max(1, int(self.root.winfo_screenwidth()))
-            physical_w = int(self.vmon.get("width", logical_w))
+            physical_w = int(self.engine.vmon.get("width", logical_w))
             ratio = float(physical_w) / float(logical_w)
             if ratio < 1.0:
                 ratio = 1.0
@@ -245,46 +3506,17 @@ class QuadGridNodesApp:
             return int(round(x)), int(round(y))
         return int(round(x * self.pixel_ratio)), int(round(y * self.pixel_ratio))
 
-    def scan_dofus_windows(self) -> List[Dict[str, object]]:
-        entries: List[Dict[str, object]] = []
-        if win32gui is None or win32process is None:
-            return entries
-        pid_set = set()
-        for proc in psutil.process_iter(["pid", "name"]):
-            try:
-                name = (proc.info["name"] or "").lower()
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
-            if name == "dofus.exe":
-                pid_set.add(proc.info["pid"])
-                for child in proc.children(recursive=True):
-                    pid_set.add(child.pid)
-        if not pid_set:
-            return entries
-        seen = set()
-        for hwnd, title in enumerate_windows_for_pids(pid_set):
-            if hwnd in seen:
-                continue
-            seen.add(hwnd)
-            rect = get_window_rect(hwnd)
-            if not rect:
-                continue
-            entries.append({
-                "hwnd": hwnd,
-                "title": title,
-                "rect": rect,
-                "label": f"{title} — 0x{hwnd:08X}"
-            })
-        entries.sort(key=lambda e: e["title"].lower())
-        return entries
-
     def show_dofus_gate(self):
         self.mode = "gate"
         for widget in self.root.winfo_children():
             widget.destroy()
+        if not self.engine.frame_source.is_live:
+            self._start_on_virtual_screen()
+            return
         gate_frame = tk.Frame(self.root, padx=20, pady=20)
         gate_frame.pack(fill="both", expand=True)
 
+        win32gui, win32process = load_win32()
         if win32gui is None or win32process is None:
             tk.Label(
                 gate_frame,
@@ -299,21 +3531,41 @@ class QuadGridNodesApp:
             tk.Button(gate_frame, text="Fermer", command=self.on_quit).pack(pady=15)
             return
 
-        self.dofus_entries = self.scan_dofus_windows()
+        self.dofus_entries = self.engine.scan_windows()
+        if self._gate_auto:
+            # Fenêtres déjà calibrées à leur taille actuelle : pas de sélection, directement en capture.
+            self._gate_auto = False
+            known = [e for e in self.dofus_entries if self.engine.has_calibration(e["title"], e["rect"])]
+            if known and len(known) == len(self.dofus_entries) and (self.group is not None or len(known) == 1):
+                self._open_targets(known)
+                return
         if self.dofus_entries:
             tk.Label(
                 gate_frame,
                 text="Fenêtres Dofus détectées (Release)",
                 font=("Arial", 12, "bold")
             ).pack(pady=(0, 10))
-            self.selector_var = tk.StringVar(value=self.dofus_entries[0]["label"])
-            combo = ttk.Combobox(
-                gate_frame,
-                textvariable=self.selector_var,
-                state="readonly",
-                values=[entry["label"] for entry in self.dofus_entries]
-            )
-            combo.pack(fill="x", padx=10, pady=5)
+            if self.group is not None:
+                tk.Label(gate_frame, text="Sélectionnez un ou plusieurs clients.", font=("Arial", 10)).pack()
+                self.selector_list = tk.Listbox(
+                    gate_frame,
+                    selectmode="multiple",
+                    exportselection=False,
+                    height=min(8, len(self.dofus_entries))
+                )
+                for entry in self.dofus_entries:
+                    self.selector_list.insert("end", entry["label"])
+                self.selector_list.selection_set(0, "end")
+                self.selector_list.pack(fill="x", padx=10, pady=5)
+            else:
+                self.selector_var = tk.StringVar(value=self.dofus_entries[0]["label"])
+                combo = ttk.Combobox(
+                    gate_frame,
+                    textvariable=self.selector_var,
+                    state="readonly",
+                    values=[entry["label"] for entry in self.dofus_entries]
+                )
+                combo.pack(fill="x", padx=10, pady=5)
 
             btn_frame = tk.Frame(gate_frame)
             btn_frame.pack(pady=15)
@@ -336,22 +3588,69 @@ class QuadGridNodesApp:
             tk.Button(btn_frame, text="Fermer", command=self.on_quit).pack(side="right", padx=10)
 
     def on_validate_dofus_selection(self):
-        if not self.dofus_entries or self.selector_var is None:
+        if not self.dofus_entries:
+            return
+        if self.selector_list is not None:
+            entries = [self.dofus_entries[idx] for idx in self.selector_list.curselection()]
+        elif self.selector_var is not None:
+            label = self.selector_var.get()
+            entries = [e for e in self.dofus_entries if e["label"] == label][:1]
+        else:
             return
-        label = self.selector_var.get()
-        entry = next((e for e in self.dofus_entries if e["label"] == label), None)
-        if not entry:
+        if not entries:
             messagebox.showwarning("Sélection", "Veuillez choisir une fenêtre valide.")
             return
-        self.target_hwnd = entry["hwnd"]
-        self.target_window_title = entry["title"]
-        if not self.capture_target_window_image():
-            messagebox.showerror("Capture", "Impossible de capturer la fenêtre sélectionnée.")
+        self._open_targets(entries)
+
+    def _open_targets(self, entries: List[Dict[str, object]]):
+        """Première fenêtre dans cette vue, les suivantes (multi-clients) dans des vues filles."""
+        if not self._select_target(entries[0]):
             self.show_dofus_gate()
             return
-        self.points = self.load_points_from_ratios(self.default_ratios)
+        for entry in entries[1:]:
+            child = QuadGridNodesApp(parent=self)
+            self.children.append(child)
+            if not child._select_target(entry):
+                child.on_quit()
+
+    def _select_target(self, entry: Dict[str, object]) -> bool:
+        self.engine.target_hwnd = entry["hwnd"]
+        self.engine.target_window_title = entry["title"]
+        if self.group is not None:
+            self.root.title(f"🧠 Memory Helper — {entry['title']}")
+        if self._warm_start():
+            return True
+        if not self.engine.capture_target_window_image():
+            messagebox.showerror("Capture", f"Impossible de capturer la fenêtre « {entry['title']} ».")
+            return False
+        self.engine.points = self.engine.load_points_from_ratios(self.default_ratios)
+        self.setup_start_ui()
+        return True
+
+    def _start_on_virtual_screen(self):
+        """Sources synthétique/rejeu : pas de fenêtre Dofus, on cadre tout l'écran virtuel."""
+        self.engine.target_hwnd = None
+        self.engine.target_window_title = f"source {self.engine.frame_source.name}"
+        if self._warm_start():
+            return
+        self.engine.capture_target_window_image()
+        self.engine.points = self.engine.load_points_from_ratios(self.default_ratios)
         self.setup_start_ui()
 
+    def _warm_start(self) -> bool:
+        """Calibration mémorisée : mode capture tout de suite, sans aperçu ni configuration.
+
+        La capture de la fenêtre (base de la carte des clics) suit en arrière-plan.
+        """
+        if not self.engine.warm_start():
+            return False
+        self._enter_capture_mode()
+        self.status.config(text=f"✅ Mode capture activé (calibration mémorisée pour « {self.engine.target_window_title} »).")
+        self.resize_executor.submit(self.engine.grab_target_image).add_done_callback(
+            lambda _: self._post_ui(self.update_click_map_preview)
+        )
+        return True
+
     def setup_start_ui(self):
         # Nettoyer
         for widget in self.root.winfo_children():
@@ -359,8 +3658,8 @@ class QuadGridNodesApp:
 
         # Calculer la taille de l'aperçu (25%)
         scale = 0.25
-        preview_w = int(self.original_w * scale)
-        preview_h = int(self.original_h * scale)
+        preview_w = int(self.engine.original_w * scale)
+        preview_h = int(self.engine.original_h * scale)
 
         # Créer un canvas ou label avec taille fixe pour éviter le noir
         self.preview_frame = tk.Frame(self.root, width=preview_w, height=preview_h, bg="black")
@@ -373,10 +3672,11 @@ class QuadGridNodesApp:
         # Boutons de choix
         btn_frame = tk.Frame(self.root)
         btn_frame.pack(pady=10)
-        tk.Button(
+        default_button = tk.Button(
             btn_frame, text="✅ Utiliser configuration par défaut",
             command=self.use_default_config, font=("Arial", 10, "bold")
-        ).pack(side="left", padx=10)
+        )
+        default_button.pack(side="left", padx=10)
         tk.Button(
             btn_frame, text="🔧 Configurer les 4 points",
             command=self.enter_config_mode, font=("Arial", 10)
@@ -384,13 +3684,17 @@ class QuadGridNodesApp:
 
         self.status = tk.Label(
             self.root,
-            text=f"Cible : '{self.target_window_title}'. Aperçu à 25%.",
+            text=f"Cible : '{self.engine.target_window_title}'. Aperçu à 25%.",
             font=("Arial", 10)
         )
         self.status.pack(fill="x", pady=5)
 
-        # Charger les points par défaut
-        self.points = self.load_points_from_ratios(self.default_ratios)
+        # Charger les points par défaut, ou ceux du plateau détecté dans la capture
+        self.engine.board_quad = None
+        self.engine.points = self.engine.load_points_from_ratios(self.default_ratios)
+        if CONFIG["auto_calibrate"] and self.engine.calibrate():
+            default_button.config(text="✅ Utiliser le plateau détecté")
+            self.status.config(text=f"Cible : '{self.engine.target_window_title}'. Plateau détecté automatiquement.")
 
         # Afficher l'aperçu APRÈS que l'UI soit prête
         self.root.after(50, self._update_preview_image)
@@ -398,22 +3702,22 @@ class QuadGridNodesApp:
 
 
     def _update_preview_image(self):
-        if not hasattr(self, 'initial_img') or self.initial_img is None:
+        if self.engine.initial_img is None:
             return
 
         scale = 0.25
-        img_w, img_h = self.initial_img.size
+        img_w, img_h = self.engine.initial_img.size
         new_w = int(img_w * scale)
         new_h = int(img_h * scale)
         if new_w <= 0 or new_h <= 0:
             return
 
-        resized = self.initial_img.copy().resize((new_w, new_h), Image.LANCZOS)
+        resized = downscale(self.engine.initial_img, (new_w, new_h), preview=True)
         draw = ImageDraw.Draw(resized)
 
         # Convertir les points ABSOLUS en coordonnées RELATIVES à la fenêtre cible
-        x0, y0, _, _ = self.target_rect
-        relative_points = [(px - x0, py - y0) for (px, py) in self.points]
+        x0, y0, _, _ = self.engine.target_rect
+        relative_points = [(px - x0, py - y0) for (px, py) in self.engine.points]
 
         # Mettre à l'échelle pour l'aperçu
         scaled_pts = [(int(rx * scale), int(ry * scale)) for (rx, ry) in relative_points]
@@ -429,8 +3733,13 @@ class QuadGridNodesApp:
         self.preview_label.config(image=tk_img)
         self.preview_label.image = tk_img  # keep reference
 
+    def _placement_area(self) -> Tuple[int, int, int, int]:
+        """Zone de travail (x, y, w, h) de l'écran qui porte la fenêtre Dofus ciblée."""
+        x, y, w, h = self.engine.target_rect
+        return tuple(self.screens.monitor_at(x + w / 2, y + h / 2)["work"])
+
     def _place_config_window(self):
-        _, _, work_w, work_h = get_work_area()
+        left, top, work_w, work_h = self._placement_area()
         self.root.update_idletasks()
         win_w = self.root.winfo_width()
         win_h = self.root.winfo_height()
@@ -439,35 +3748,38 @@ class QuadGridNodesApp:
             win_w = work_w
         if win_h > work_h:
             win_h = work_h
-        x = 0
-        y = work_h - win_h
-        if y < 0:
-            y = 0
+        x = left + self._stacked_x(win_w, work_w)
+        y = top + max(0, work_h - win_h)
         self.root.geometry(f"{win_w}x{win_h}+{x}+{y}")
 
+    def _stacked_x(self, win_w: int, work_w: int) -> int:
+        """Abscisse de la fenêtre : les vues multi-clients s'alignent de gauche à droite."""
+        return max(0, min(self.view_index * win_w, work_w - win_w))
+
     def _memory_window_limits(self):
-        _, _, work_w, work_h = get_work_area()
+        _, _, work_w, work_h = self._placement_area()
         ratio = CONFIG["memory_window_ratio"]
         max_w = max(1, int(work_w * ratio))
         max_h = max(1, int(work_h * ratio))
         return max_w, max_h
 
     def _place_memory_window(self):
-        _, _, work_w, work_h = get_work_area()
+        left, top, work_w, work_h = self._placement_area()
         win_w, win_h = self._memory_window_limits()
-        x = 0
-        y = work_h - win_h
-        if y < 0: y = 0
+        x = left + self._stacked_x(win_w, work_w)
+        y = top + max(0, work_h - win_h)
         self.root.geometry(f"{win_w}x{win_h}+{x}+{y}")
 
     def use_default_config(self):
-        self.points = self.load_points_from_ratios(self.default_ratios)
+        if self.engine.board_quad is None:
+            self.engine.points = self.engine.load_points_from_ratios(self.default_ratios)
         self._enter_capture_mode()
 
     def enter_config_mode(self):
         self.mode = "config"
         self._next_point_index = 0
-        self.points = self.load_points_from_ratios(self.default_ratios)
+        self.engine.board_quad = None
+        self.engine.points = self.engine.load_points_from_ratios(self.default_ratios)
         self.status.config(text="Appuyez sur ESPACE ×4 pour redéfinir les coins.")
 
         for widget in self.root.winfo_children():
@@ -488,13 +3800,13 @@ class QuadGridNodesApp:
         self.root.after(100, self._place_config_window)
 
     def reload_default_for_config(self):
-        self.points = self.load_points_from_ratios(self.default_ratios)
+        self.engine.points = self.engine.load_points_from_ratios(self.default_ratios)
         self._next_point_index = 0
         self.status.config(text="Configuration réinitialisée. Appuyez sur ESPACE ×4.")
         self._update_preview_image()
 
     def confirm_config(self):
-        if len(self.points) != 4:
+        if len(self.engine.points) != 4:
             messagebox.showwarning("Erreur", "4 points requis.")
             return
         self._enter_capture_mode()
@@ -508,19 +3820,23 @@ class QuadGridNodesApp:
         self.controls_frame = top
         top.pack(fill="x")
         tk.Label(top, text="n:", font=("Arial", 12, "bold")).pack(side="left")
-        self.n_var = tk.StringVar(value=str(self.n))
+        self.n_var = tk.StringVar(value=str(self.engine.n))
         tk.Entry(top, textvariable=self.n_var, width=4).pack(side="left", padx=5)
         tk.Label(top, text="m:", font=("Arial", 12, "bold")).pack(side="left")
-        self.m_var = tk.StringVar(value=str(self.m))
+        self.m_var = tk.StringVar(value=str(self.engine.m))
         tk.Entry(top, textvariable=self.m_var, width=4).pack(side="left", padx=5)
         tk.Label(top, text="Taille(px):", font=("Arial", 12, "bold")).pack(side="left")
-        self.cell_var = tk.StringVar(value=str(self.cell))
+        self.cell_var = tk.StringVar(value=str(self.engine.cell))
         tk.Entry(top, textvariable=self.cell_var, width=6).pack(side="left", padx=5)
+        # Relues ici (thread Tk), plus à chaque clic depuis l'écouteur.
+        self.cell_var.trace_add("write", lambda *_: self._on_cell_changed())
+        self.n_var.trace_add("write", lambda *_: self._on_grid_size_changed())
+        self.m_var.trace_add("write", lambda *_: self._on_grid_size_changed())
         tk.Button(top, text="Réinitialiser (R)", command=self.reset, font=("Arial", 10, "bold")).pack(side="right", padx=8, pady=4)
 
         self.status = tk.Label(self.root, text="✅ Mode capture activé.", font=("Arial", 11))
         self.status.pack(fill="x", pady=3)
-        self.click_history.clear()
+        self.engine.clear_history()
         if self.main_frame:
             self.main_frame.destroy()
         self.main_frame = tk.Frame(self.root)
@@ -535,10 +3851,12 @@ class QuadGridNodesApp:
         self._build_side_panel()
 
         self.read_params()
-        c1, c2, c3, c4 = self.points
-        self.grid = grid_intersections_in_quad(c1, c2, c3, c4, self.n, self.m)
+        self.engine.configure_grid()
+        self.engine.remember_calibration()
+        self.engine.follow_target(self._on_target_moved)
+        self.engine.open_click_pipeline(self._on_tile_captured, self._on_click_status, self._on_tile_preview)
         self.update_canvas_size()
-        self.start_global_listener()
+        (self.parent or self).start_global_listener()
         self.root.after(100, self._place_memory_window)
 
     def _build_side_panel(self):
@@ -563,52 +3881,159 @@ class QuadGridNodesApp:
             justify="center"
         )
         self.click_map_label.pack(fill="x", padx=8, pady=(4, 10))
+        self._click_map_photo = None
+        self._click_map_drawn = 0
+
+        self.memory_label = tk.Label(
+            self.side_panel,
+            bg="#1b1b1b",
+            fg="#9a9a9a",
+            font=("Arial", 9),
+            justify="left"
+        )
+        self.memory_label.pack(anchor="w", padx=8, pady=(0, 6))
+        self._refresh_memory_stats()
+
+    def _refresh_memory_stats(self):
+        if not self.memory_label:
+            return
+        stats = self.engine.sequence_store.stats()
+        mb = 1024 * 1024
+        self.memory_label.config(text=(
+            f"Mémoire : {stats['resident_bytes'] / mb:.1f} Mo en RAM ({stats['resident_count']}), "
+            f"{stats['spilled_bytes'] / mb:.1f} Mo sur disque ({stats['spilled_count']}), "
+            f"{stats['evicted_count']} évincée(s)"
+        ) + self._click_stats_text())
+
+    def _click_stats_text(self) -> str:
+        if self.engine.clicks is None:
+            return ""
+        clicks = self.engine.clicks.stats()
+        if not (clicks["coalesced"] or clicks["dropped"] or self.engine.cancelled_count):
+            return ""
+        return (f" — clics : {clicks['coalesced']} fusionné(s), {clicks['dropped']} refusé(s), "
+                f"{self.engine.cancelled_count} capture(s) remplacée(s)")
+
+    def _on_target_moved(self, old_rect, new_rect):
+        """Appelé par le tracker de fenêtre : la grille est déjà recalée, on informe l'utilisateur."""
+        dx, dy = new_rect[0] - old_rect[0], new_rect[1] - old_rect[1]
+
+        def notify():
+            if self.status:
+                self.status.config(text=f"Fenêtre Dofus déplacée ({dx:+d}, {dy:+d}) : grille recalée.")
+
+        self._post_ui(notify)
 
     def clear_click_history(self):
-        self.click_history.clear()
+        self.engine.clear_history()
+        self._refresh_memory_stats()
+        self._click_map_photo = None
+        self._click_map_drawn = 0
         if self.click_map_label:
             self.click_map_label.config(image="", text="Aucun clic pour l'instant")
             self.click_map_label.image = None
 
     def update_click_map_preview(self):
-        if not self.click_map_label or not hasattr(self, "initial_img") or self.initial_img is None:
+        """Ajoute les nouveaux marqueurs sur l'aperçu réduit déjà en cache.
+
+        L'image de base n'est réduite qu'une fois par initial_img ; chaque clic ne
+        dessine que son marqueur (en coordonnées d'aperçu) et ne pousse que la
+        zone modifiée dans la PhotoImage existante.
+        """
+        if not self.click_map_label or self.engine.initial_img is None:
             return
-        if not self.click_history:
+        if not self.engine.click_history:
             self.click_map_label.config(image="", text="Aucun clic pour l'instant")
             self.click_map_label.image = None
+            self._click_map_photo = None
+            self._click_map_drawn = 0
             return
 
-        base = self.initial_img.copy()
-        draw = ImageDraw.Draw(base)
+        rebuild = (
+            self._click_map_photo is None
+            or self._click_map_source is not self.engine.initial_img
+            or self._click_map_drawn > len(self.engine.click_history)
+        )
+        if rebuild:
+            self._reset_click_map_preview()
+        draw = ImageDraw.Draw(self._click_map_preview)
+        dirty = None
+        for idx in range(self._click_map_drawn + 1, len(self.engine.click_history) + 1):
+            box = self._draw_click_marker(draw, idx, self.engine.click_history[idx - 1])
+            dirty = box if dirty is None else (
+                min(dirty[0], box[0]), min(dirty[1], box[1]), max(dirty[2], box[2]), max(dirty[3], box[3])
+            )
+        self._click_map_drawn = len(self.engine.click_history)
+
+        if rebuild:
+            tk_img = ImageTk.PhotoImage(self._click_map_preview)
+            self._click_map_photo = tk_img
+            self.click_map_label.config(image=tk_img, text="")
+            self.click_map_label.image = tk_img
+        elif dirty is not None:
+            w, h = self._click_map_preview.size
+            x0, y0 = max(0, int(dirty[0])), max(0, int(dirty[1]))
+            x1, y1 = min(w, int(dirty[2]) + 1), min(h, int(dirty[3]) + 1)
+            if x1 > x0 and y1 > y0:
+                patch = ImageTk.PhotoImage(self._click_map_preview.crop((x0, y0, x1, y1)))
+                self.root.tk.call(str(self._click_map_photo), "copy", str(patch), "-to", x0, y0)
+
+    def _click_map_scale(self) -> float:
+        return min(0.4, max(0.15, 260 / max(self.engine.original_w, self.engine.original_h)))
+
+    def _reset_click_map_preview(self):
+        if self._click_map_source is not self.engine.initial_img or self._click_map_base is None:
+            scale = self._click_map_scale()
+            new_w = max(1, int(self.engine.original_w * scale))
+            new_h = max(1, int(self.engine.original_h * scale))
+            self._click_map_base = downscale(self.engine.initial_img, (new_w, new_h), preview=True)
+            self._click_map_source = self.engine.initial_img
+        self._click_map_preview = self._click_map_base.copy()
+        self._click_map_drawn = 0
+
+    def _draw_click_marker(self, draw, idx: int, snapshot) -> Tuple[float, float, float, float]:
+        """Dessine le marqueur n° idx en coordonnées d'aperçu ; retourne sa boîte englobante."""
         colors = ["#ff5252", "#ffa502", "#2ed573", "#1e90ff", "#a29bfe"]
-        for idx, snapshot in enumerate(self.click_history, 1):
-            rx, ry = snapshot.get("relative_point", (0, 0))
-            color = colors[(idx - 1) % len(colors)]
-            r = max(6, self.original_w // 80)
-            draw.ellipse((rx - r, ry - r, rx + r, ry + r), outline=color, width=3)
-            draw.text((rx + r + 2, ry - r), str(idx), fill=color)
-
-        scale = min(0.4, max(0.15, 260 / max(self.original_w, self.original_h)))
-        new_w = max(1, int(self.original_w * scale))
-        new_h = max(1, int(self.original_h * scale))
-        preview = base.resize((new_w, new_h), Image.LANCZOS)
-        tk_img = ImageTk.PhotoImage(preview)
-        self.click_map_label.config(image=tk_img, text="")
-        self.click_map_label.image = tk_img
+        scale = self._click_map_scale()
+        rx, ry = snapshot.get("relative_point", (0, 0))
+        x, y = rx * scale, ry * scale
+        color = colors[(idx - 1) % len(colors)]
+        r = max(2.0, max(6, self.engine.original_w // 80) * scale)
+        width = max(1, int(round(3 * scale)))
+        draw.ellipse((x - r, y - r, x + r, y + r), outline=color, width=width)
+        draw.text((x + r + 2, y - r), str(idx), fill=color)
+        tx0, ty0, tx1, ty1 = draw.textbbox((x + r + 2, y - r), str(idx))
+        return min(x - r, tx0) - 1, min(y - r, ty0) - 1, max(x + r, tx1) + 1, max(y + r, ty1) + 1
 
     def read_params(self):
-        try: self.n = max(1, int(self.n_var.get()))
-        except: self.n = 3
-        try: self.m = max(1, int(self.m_var.get()))
-        except: self.m = 5
-        try: self.cell = max(10, int(self.cell_var.get()))
-        except: self.cell = 200
+        try: self.engine.n = max(1, int(self.n_var.get()))
+        except: self.engine.n = 3
+        try: self.engine.m = max(1, int(self.m_var.get()))
+        except: self.engine.m = 5
+        try: self.engine.cell = max(10, int(self.cell_var.get()))
+        except: self.engine.cell = 200
+
+    def _on_cell_changed(self):
+        """Saisie de la taille de capture : seule la taille change, la grille reste."""
+        try: cell = int(self.cell_var.get())
+        except ValueError: return  # saisie en cours
+        self.engine.set_cell(cell)
+        self.engine.set_display_cell(self.display_cell)
+
+    def _on_grid_size_changed(self):
+        """Saisie de n ou m : la grille est recalculée et les tuiles de l'ancienne effacées."""
+        try: n, m = max(1, int(self.n_var.get())), max(1, int(self.m_var.get()))
+        except ValueError: return  # saisie en cours
+        if (n, m) == (self.engine.n, self.engine.m):
+            return
+        self.engine.configure_grid(n=n, m=m)
+        self.reset()
+        self.update_canvas_size()
 
     def update_canvas_size(self):
         """Redimensionne l'aire d'affichage pour rester dans la limite de 35 % de l'écran."""
         if not self.canvas:
             return
-        self.read_params()
         self.root.update_idletasks()
         max_win_w, max_win_h = self._memory_window_limits()
 
@@ -627,20 +4052,29 @@ class QuadGridNodesApp:
         available_w = max(1, max_win_w - side_panel_w - horizontal_padding)
         available_h = max(1, max_win_h - controls_h - status_h - vertical_padding)
 
-        width_based = max(1, available_w // max(1, (self.m + 1)))
-        height_based = max(1, available_h // max(1, (self.n + 1)))
-        self.display_cell = max(1, min(self.cell, width_based, height_based))
+        width_based = max(1, available_w // max(1, (self.engine.m + 1)))
+        height_based = max(1, available_h // max(1, (self.engine.n + 1)))
+        previous_cell = self.display_cell
+        self.display_cell = max(1, min(self.engine.cell, width_based, height_based))
+        self.engine.set_display_cell(self.display_cell)
+        if self.display_cell != previous_cell and self.engine.tile_history_keys:
+            self._rescale_tiles()
 
-        canvas_w = self.display_cell * (self.m + 1)
-        canvas_h = self.display_cell * (self.n + 1)
+        canvas_w = self.display_cell * (self.engine.m + 1)
+        canvas_h = self.display_cell * (self.engine.n + 1)
         self.canvas.config(width=canvas_w, height=canvas_h)
         self.canvas.configure(scrollregion=(0, 0, canvas_w, canvas_h))
+        if CONFIG["composite_renderer"]:
+            if self.tile_renderer is None or self.tile_renderer.canvas is not self.canvas:
+                self.tile_renderer = CompositeTileRenderer(self.canvas, self.engine.n + 1, self.engine.m + 1, self.display_cell)
+            else:
+                self.tile_renderer.configure(self.engine.n + 1, self.engine.m + 1, self.display_cell)
 
     def on_space(self, event=None):
         if self.mode != "config" or self._next_point_index >= 4:
             return
         coords = self._logical_to_physical_point((self.root.winfo_pointerx(), self.root.winfo_pointery()))
-        self.points[self._next_point_index] = coords
+        self.engine.points[self._next_point_index] = coords
         self._next_point_index += 1
         self._update_preview_image()
         if self._next_point_index < 4:
@@ -652,49 +4086,84 @@ class QuadGridNodesApp:
         self.clear_click_history()
         self._stop_animation_loop()
         self.tile_sequences.clear()
+        self.tile_durations.clear()
+        self.engine.reset()
+        self.resized_cache.clear()
+        if self.tile_renderer is not None:
+            self.tile_renderer.clear()
+            self.tile_renderer.configure(self.engine.n + 1, self.engine.m + 1, self.display_cell)
+        self._rescale_generation += 1
         for d in (self.tile_items, self.tile_border_items):
             for item in list(d.values()):
                 self.canvas.delete(item)
             d.clear()
-        self.tile_images.clear()
+        self.match_colors.clear()
         if self.status:
             self.status.config(text="Snapshots effacés.")
 
     def start_keyboard_listener(self):
+        _, keyboard = load_pynput()
+        if keyboard is None:
+            return
         def on_press(key):
             try:
                 if key == keyboard.Key.esc:
                     self.on_quit()
                 elif key == keyboard.Key.space:
-                    self.on_space()
+                    self._view_at_pointer().on_space()
                 elif hasattr(key, "char") and key.char and key.char.lower() == "r":
-                    if self.mode == "capture":
-                        self.reset()
+                    view = self._view_at_pointer()
+                    if view.mode == "capture":
+                        view.reset()
             except: pass
         listener = keyboard.Listener(on_press=on_press)
         listener.daemon = True
         listener.start()
         self.kb_listener = listener
 
+    def _view_at_pointer(self) -> "QuadGridNodesApp":
+        """Multi-clients : la vue dont la fenêtre Dofus est sous la souris (sinon celle-ci)."""
+        if not self.children:
+            return self
+        point = self._logical_to_physical_point((self.root.winfo_pointerx(), self.root.winfo_pointery()))
+        return next((view for view in [self] + self.children if view.engine.contains(point)), self)
+
     def on_quit(self):
         if self._quitting:
             return
         self._quitting = True
+        for child in list(self.children):
+            child.on_quit()
+        if self.mode == "capture":
+            # n, m, taille de case ou taille de fenêtre ont pu changer depuis l'entrée en capture.
+            self.engine.remember_calibration()
+        if self.parent is not None:
+            self._stop_animation_loop()
+            self.engine.close()
+            if self in self.parent.children:
+                self.parent.children.remove(self)
+            try: self.root.destroy()
+            except tk.TclError: pass
+            return
         self.stop_global_listener()
         self._stop_animation_loop()
-        if hasattr(self, "capture_executor") and self.capture_executor is not None:
-            try:
-                self.capture_executor.shutdown(wait=False, cancel_futures=True)
-            except TypeError:
-                self.capture_executor.shutdown(wait=False)
-            self.capture_executor = None
+        if self.resize_executor is not None:
+            self.resize_executor.shutdown(wait=False, cancel_futures=True)
+            self.resize_executor = None
+        if self.image_pool is not None:
+            self.image_pool.shutdown()
+            self.image_pool = None
+        self.engine.close()
+        if self.group is not None:
+            self.group.close()
         try: self.kb_listener.stop()
         except: pass
         self.root.destroy()
 
     def start_global_listener(self):
+        mouse, _ = load_pynput()
         with self.listener_lock:
-            if self.listener: return
+            if self.listener or mouse is None: return
             self.listener = mouse.Listener(on_click=self.on_global_click)
             self.listener.daemon = True
             self.listener.start()
@@ -707,70 +4176,146 @@ class QuadGridNodesApp:
                 self.listener = None
 
     def on_global_click(self, x, y, button, pressed):
-        if not pressed or str(button) != "Button.left" or self.grid is None:
+        """Thread de l'écouteur pynput : le clic part directement dans la file du moteur."""
+        clicks = self.group.clicks if self.group is not None else self.engine.clicks
+        if not pressed or str(button) != "Button.left" or clicks is None:
             return
-        self.root.after(200, lambda: self.update_tile_from_intersection(x, y))
+        trace = self.engine.latency.begin()
+        clicks.push(self._logical_to_physical_point((x, y)), trace)
 
-    def update_tile_from_intersection(self, sx, sy):
-        if self.grid is None:
-            return
-        sx, sy = self._logical_to_physical_point((sx, sy))
-        (px, py), (j, i) = closest_point_with_indices(self.grid, (sx, sy))
-        self.read_params()
-        half = self.cell // 2
-        monitor = {
-            "left": int(px - half),
-            "top": int(py - half),
-            "width": self.cell,
-            "height": self.cell
-        }
-        coord = (j, i)
-        if self.status:
-            self.status.config(text=f"Capture en cours pour ({j},{i})…")
-        if not hasattr(self, "capture_executor") or self.capture_executor is None:
-            return
-        try:
-            self.capture_executor.submit(self._capture_sequence_for_tile, coord, monitor, px, py)
-        except RuntimeError:
-            pass
+    def _on_tile_captured(self, coord, frames, px, py, trace: Optional[ClickTrace] = None):
+        """Thread de capture : la séquence est redimensionnée par les workers puis
+        remise au thread Tk déjà à la taille d'affichage."""
+        size = max(1, int(self.display_cell))
+
+        def failed():
+            if trace is not None:
+                self.engine.latency.reject(trace)
+            self._on_click_status("failed", coord, (px, py))
+
+        self._resize_in_background(
+            frames, size,
+            lambda resized: self._apply_tile_sequence(coord, frames, resized, size, px, py, trace),
+            trace, on_error=failed,
+        )
+
+    def _on_tile_preview(self, coord, frames, px, py, trace: Optional[ClickTrace] = None):
+        """Pré-enregistrement : affiche tout de suite les images d'avant le clic,
+        sans les ranger dans l'historique (la séquence complète suit)."""
+        size = max(1, int(self.display_cell))
+
+        def show(resized):
+            if not resized or not self.canvas or size != self.display_cell:
+                return
+            if trace is None or trace.first("sequence_complete") is None:  # sinon la série complète arrive
+                self._show_tile(coord, resized)
+                if trace is not None:
+                    trace.mark("first_frame_displayed")
+
+        self._resize_in_background(frames, size, show)
+
+    def _on_click_status(self, kind: str, coord, point):
+        if kind == "capturing":
+            text = f"Capture en cours pour ({coord[0]},{coord[1]})…"
+        elif kind == "dropped":
+            text = f"Trop de clics en attente : clic sur ({coord[0]},{coord[1]}) ignoré."
+        elif kind == "failed":
+            text = f"Capture impossible pour ({coord[0]},{coord[1]}) : cliquez à nouveau sur la tuile."
+        else:
+            text = f"Clic hors de la grille ({point[0]},{point[1]}) ignoré."
+
+        def show():
+            if self.status:
+                self.status.config(text=text)
+
+        self._post_ui(show)
+
+    def _post_ui(self, fn):
+        """Depuis n'importe quel thread : fn sera exécutée au prochain lot sur le thread Tk.
 
-    def _capture_sequence_for_tile(self, coord, monitor, px, py):
-        frames: List[Image.Image] = []
-        local_sct = mss.mss()
+        Le premier envoi d'un lot programme le vidage ; sans envoi, aucun réveil périodique."""
+        with self._ui_lock:
+            self._ui_pending.append(fn)
+            if self._ui_scheduled:
+                return
+            self._ui_scheduled = True
+        self._schedule_ui_drain()
+
+    def _schedule_ui_drain(self):
+        """Programme un vidage dans `ui_batch_interval` (root.after est relayé au thread Tk)."""
+        with self._ui_lock:
+            self._ui_scheduled = True
         try:
-            for idx in range(CONFIG["capture_frames"]):
-                raw = local_sct.grab(monitor)
-                img = Image.frombytes("RGB", (raw.width, raw.height), raw.rgb)
-                frames.append(img.copy())
-                if idx < CONFIG["capture_frames"] - 1:
-                    time.sleep(CONFIG["capture_interval"])
-        finally:
+            self.root.after(max(1, int(CONFIG["ui_batch_interval"] * 1000)), self._drain_ui)
+        except (tk.TclError, RuntimeError):
+            with self._ui_lock:
+                self._ui_scheduled = False
+
+    def _drain_ui(self):
+        """Exécute en un lot tout ce que les workers ont posté depuis la programmation."""
+        with self._ui_lock:
+            self._ui_scheduled = False
+            batch = list(self._ui_pending)
+            self._ui_pending.clear()
+        if self._quitting:
+            return
+        for fn in batch:
             try:
-                local_sct.close()
+                fn()
             except Exception:
-                pass
-        try:
-            self.root.after(0, lambda: self._apply_tile_sequence(coord, frames, px, py))
-        except tk.TclError:
+                # Une erreur dans un callback n'empêche pas le reste du lot.
+                traceback.print_exc()
+
+    def _resize_in_background(self, frames: DeltaFrames, size: int, callback, trace: Optional[ClickTrace] = None,
+                              on_error=None):
+        """Lance resize_sequence sur le pool (threads, ou processus si resize_processes > 0) ;
+        callback(resized) est appelé sur le thread Tk, on_error() (si fourni) depuis le
+        thread du pool quand le redimensionnement échoue."""
+        executor = self.resize_executor
+        if executor is None:
             return
 
-    def _apply_tile_sequence(self, coord, frames, px, py):
-        if not frames or not self.canvas:
+        def deliver(future):
+            if future.cancelled():
+                return
+            if future.exception() is not None:
+                if on_error is not None:
+                    on_error()
+                return
+            resized = future.result()
+            if trace is not None:
+                trace.mark("resized")
+            self._post_ui(lambda: callback(resized))
+
+        try:
+            if self.image_pool is not None:
+                future = self.image_pool.resize(frames, size)
+            else:
+                future = executor.submit(resize_sequence, frames, size)
+        except RuntimeError:
             return
+        future.add_done_callback(deliver)
+
+    def _show_tile(self, coord, resized: List[Image.Image]):
+        """Place une séquence déjà redimensionnée sur le canvas (PhotoImage par image,
+        ou blit dans l'image composite si le rendu composite est actif)."""
         j, i = coord
-        display_size = max(1, int(self.display_cell))
-        photos = [ImageTk.PhotoImage(frame.resize((display_size, display_size), Image.LANCZOS)) for frame in frames]
-        self.tile_sequences[coord] = photos
-        self.tile_images[coord] = photos
-        self.tile_animation_index[coord] = 0
-
-        cx = i * self.display_cell + self.display_cell // 2
-        cy = j * self.display_cell + self.display_cell // 2
-        if coord in self.tile_items:
-            self.canvas.coords(self.tile_items[coord], cx, cy)
-            self.canvas.itemconfig(self.tile_items[coord], image=photos[0])
+        if self.tile_renderer is not None:
+            self.tile_renderer.set_tile(coord, resized)
         else:
-            self.tile_items[coord] = self.canvas.create_image(cx, cy, image=photos[0])
+            photos = [ImageTk.PhotoImage(frame) for frame in resized]
+            self.tile_sequences[coord] = photos
+            self.tile_durations[coord] = getattr(resized, "durations", None) or [1] * len(photos)
+            self.tile_animation_index[coord] = 0
+            self.tile_hold[coord] = self.tile_durations[coord][0]
+
+            cx = i * self.display_cell + self.display_cell // 2
+            cy = j * self.display_cell + self.display_cell // 2
+            if coord in self.tile_items:
+                self.canvas.coords(self.tile_items[coord], cx, cy)
+                self.canvas.itemconfig(self.tile_items[coord], image=photos[0])
+            else:
+                self.tile_items[coord] = self.canvas.create_image(cx, cy, image=photos[0])
 
         rect_coords = (
             i * self.display_cell, j * self.display_cell,
@@ -779,42 +4324,149 @@ class QuadGridNodesApp:
         if coord in self.tile_border_items:
             self.canvas.coords(self.tile_border_items[coord], *rect_coords)
         else:
-            self.tile_border_items[coord] = self.canvas.create_rectangle(*rect_coords, outline="#ff3366", width=2)
-
-        target_rect = getattr(self, "target_rect", (self.vmon["left"], self.vmon["top"], self.vmon["width"], self.vmon["height"]))
-        rel_point = (int(px - target_rect[0]), int(py - target_rect[1]))
-        snapshot_data = {
-            "index": len(self.click_history) + 1,
-            "coord": coord,
-            "relative_point": rel_point,
-            "timestamp": time.strftime("%H:%M:%S"),
-            "frames": frames
-        }
-        self.click_history.append(snapshot_data)
+            self.tile_border_items[coord] = self.canvas.create_rectangle(
+                *rect_coords, outline=self.match_colors.get(coord, self.BORDER_COLOR), width=2
+            )
+
+    def _apply_tile_sequence(self, coord, frames, resized, size, px, py, trace: Optional[ClickTrace] = None):
+        if not frames or not resized or not self.canvas:
+            return
+        j, i = coord
+        for key in [key for key in self.resized_cache if key[0] == coord]:
+            del self.resized_cache[key]
+        self.resized_cache[(coord, size)] = resized
+        # Enregistrée avant l'affichage : _rescale_tiles doit voir la nouvelle séquence.
+        self.engine.record_sequence(coord, frames, px, py)
+        if size == self.display_cell:
+            self._show_tile(coord, resized)
+            if trace is not None:
+                trace.mark("first_frame_displayed")
+                self.engine.latency.finish(trace)
+        else:
+            # display_cell a changé pendant le redimensionnement : on relance en arrière-plan.
+            self._rescale_tiles()
+            if trace is not None:
+                self.engine.latency.finish(trace)
+
+        matches = self._highlight_matches(coord)
         self.update_click_map_preview()
+        self._refresh_memory_stats()
+        self.root.after(500, self._refresh_memory_stats)
         if self.status:
-            self.status.config(text=f"Série capturée pour ({j},{i})")
+            text = f"Série capturée pour ({j},{i})"
+            if matches:
+                text += " — paire probable : " + ", ".join(f"({mj},{mi})" for mj, mi in matches)
+            if CONFIG["latency_in_status"] and self.engine.latency.summary_text():
+                text += f" — {self.engine.latency.summary_text()}"
+            self.status.config(text=text)
         self._ensure_animation_loop()
 
+    def _highlight_matches(self, coord):
+        """Colore les bordures des tuiles appariées par l'index de signatures.
+
+        Seules la tuile capturée, ses correspondances et les tuiles déjà colorées
+        sont revues : le coût ne dépend pas de la taille de la grille.
+        """
+        index = self.engine.tile_index
+        matches = index.matches(coord)
+        wanted = {}
+        if matches:
+            color = self.MATCH_COLORS[index.groups.get(coord, 0) % len(self.MATCH_COLORS)]
+            wanted = {other: color for other in (coord, *matches)}
+        for other in list(self.match_colors):
+            if other not in wanted and other not in index.groups:
+                del self.match_colors[other]
+                self._set_border_color(other, self.BORDER_COLOR)
+        for other, color in wanted.items():
+            if self.match_colors.get(other) != color:
+                self.match_colors[other] = color
+                self._set_border_color(other, color)
+        return matches
+
+    def _set_border_color(self, coord, color: str):
+        item = self.tile_border_items.get(coord)
+        if item is not None and self.canvas:
+            self.canvas.itemconfig(item, outline=color)
+
+    def _rescale_tiles(self):
+        """Redimensionne en arrière-plan toutes les tuiles absentes du cache pour le
+        display_cell courant, puis les remplace toutes d'un coup sur le thread Tk."""
+        size = max(1, int(self.display_cell))
+        self._rescale_generation += 1
+        generation = self._rescale_generation
+        pending = {}
+        for coord in list(self.engine.tile_history_keys):
+            if (coord, size) in self.resized_cache:
+                continue
+            frames = self.engine.tile_sequence(coord)
+            if frames is not None:
+                pending[coord] = frames
+        if not pending:
+            self._swap_rescaled_tiles(size)
+            return
+        remaining = set(pending)
+
+        def on_resized(coord, frames, resized):
+            if generation != self._rescale_generation:
+                return
+            if self.engine.tile_sequence(coord) is frames:
+                self.resized_cache[(coord, size)] = resized
+            remaining.discard(coord)
+            if not remaining:
+                self._swap_rescaled_tiles(size)
+
+        for coord, frames in pending.items():
+            self._resize_in_background(
+                frames, size,
+                lambda resized, coord=coord, frames=frames: on_resized(coord, frames, resized)
+            )
+
+    def _swap_rescaled_tiles(self, size: int):
+        if size != self.display_cell or not self.canvas:
+            return
+        for coord in list(self.engine.tile_history_keys):
+            resized = self.resized_cache.get((coord, size))
+            if resized:
+                self._show_tile(coord, resized)
+        # Ne garder en cache que la taille affichée.
+        for key in [key for key in self.resized_cache if key[1] != size]:
+            del self.resized_cache[key]
+
+    def _animation_interval_ms(self) -> int:
+        interval = CONFIG["animation_interval"]
+        if CONFIG["animation_max_fps"]:
+            interval = max(interval, 1.0 / CONFIG["animation_max_fps"])
+        return max(10, int(interval * 1000))
+
     def _ensure_animation_loop(self):
         if self.animation_job is not None or not self.root:
             return
-        interval_ms = max(10, int(CONFIG["animation_interval"] * 1000))
-        self.animation_job = self.root.after(interval_ms, self._animation_loop)
+        self.animation_job = self.root.after(self._animation_interval_ms(), self._animation_loop)
 
     def _animation_loop(self):
         if not self.canvas:
             self._stop_animation_loop()
             return
-        interval_ms = max(10, int(CONFIG["animation_interval"] * 1000))
-        active = False
-        for coord, frames in list(self.tile_sequences.items()):
-            if not frames or coord not in self.tile_items:
-                continue
-            active = True
-            idx = self.tile_animation_index.get(coord, 0) % len(frames)
-            self.canvas.itemconfig(self.tile_items[coord], image=frames[idx])
-            self.tile_animation_index[coord] = (idx + 1) % len(frames)
+        interval_ms = self._animation_interval_ms()
+        if self.tile_renderer is not None:
+            active = self.tile_renderer.tick()
+        else:
+            active = False
+            index, holds, durations = self.tile_animation_index, self.tile_hold, self.tile_durations
+            for coord, frames in list(self.tile_sequences.items()):
+                if not frames or coord not in self.tile_items:
+                    continue
+                active = True
+                if len(frames) < 2:
+                    continue
+                hold = holds.get(coord, 1)
+                if hold > 1:
+                    holds[coord] = hold - 1
+                    continue
+                idx = (index.get(coord, -1) + 1) % len(frames)
+                index[coord] = idx
+                holds[coord] = durations[coord][idx]
+                self.canvas.itemconfig(self.tile_items[coord], image=frames[idx])
         if active:
             try:
                 self.animation_job = self.root.after(interval_ms, self._animation_loop)
@@ -831,6 +4483,84 @@ class QuadGridNodesApp:
                 pass
             self.animation_job = None
         self.tile_animation_index.clear()
+        self.tile_hold.clear()
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Memory Helper — Mémoire de Blop")
+    parser.add_argument("--source", choices=("mss", "synthetic", "replay"), default=CONFIG["frame_source"],
+                        help="backend de capture (synthetic/replay : exécution sans Dofus)")
+    parser.add_argument("--replay", metavar="DOSSIER", help="session enregistrée à rejouer (--source replay)")
+    parser.add_argument("--replay-steps", action="store_true",
+                        help="rejeu image par image au lieu du timing d'origine")
+    parser.add_argument("--record", metavar="DOSSIER", help="enregistre toutes les captures dans ce dossier")
+    parser.add_argument("--latency", metavar="FICHIER",
+                        help="exporte les latences clic→affichage à la fermeture (.json ou .csv)")
+    parser.add_argument("--latency-status", action="store_true",
+                        help="affiche p50/p95/p99 de la latence clic→affichage dans la barre d'état")
+    parser.add_argument("--composite", action="store_true",
+                        help="rendu composite : une seule image pour toute la grille (grandes grilles)")
+    parser.add_argument("--session", metavar="FICHIER",
+                        help="journalise chaque capture de tuile dans ce fichier de session")
+    parser.add_argument("--preroll", metavar="SECONDES", type=float,
+                        help="garde en continu les SECONDES précédant chaque clic (ex. 0.4)")
+    parser.add_argument("--multi", action="store_true",
+                        help="plusieurs fenêtres Dofus dans une seule instance (une grille par client)")
+    parser.add_argument("--resize-processes", metavar="N", type=int,
+                        help="redimensionne les tuiles dans N processus (mémoire partagée) au lieu de threads")
+    parser.add_argument("--quality", choices=sorted(RESAMPLE_TIERS),
+                        help="réductions d'images : fast, balanced (défaut) ou best (LANCZOS partout)")
+    parser.add_argument("--capture-reduce", action="store_true",
+                        help="stocke les captures réduites quand les tuiles sont affichées bien plus petites")
+    parser.add_argument("--no-calibration", action="store_true",
+                        help="ne cherche pas le plateau dans la capture (coins par défaut)")
+    parser.add_argument("--calibrate-check", metavar="DOSSIER",
+                        help="teste la détection du plateau sur des captures annotées (image + .json) puis quitte")
+    parser.add_argument("--calibration-cache", metavar="FICHIER",
+                        help="fichier des calibrations mémorisées par fenêtre (titre + résolution)")
+    parser.add_argument("--reconfigure", action="store_true",
+                        help="ignore la calibration mémorisée : aperçu et configuration des coins au lancement")
+    parser.add_argument("--session-info", metavar="FICHIER",
+                        help="liste les captures d'un fichier de session puis quitte")
+    args = parser.parse_args()
+    if args.calibrate_check:
+        try:
+            checks = check_calibration(args.calibrate_check)
+        except OSError as exc:
+            parser.error(str(exc))
+        for check in checks:
+            error = "plateau non trouvé" if check["error_px"] is None else f"écart max {check['error_px']:.1f} px"
+            print(f"{'OK ' if check['ok'] else 'KO '} {check['image']} {check['size'][0]}×{check['size'][1]} : "
+                  f"{error}, {check['seconds'] * 1000:.0f} ms")
+        sys.exit(0 if checks and all(check["ok"] for check in checks) else 1)
+    if args.session_info:
+        try:
+            reader = SessionReader(args.session_info)
+        except (OSError, ValueError) as exc:
+            parser.error(str(exc))
+        for k in range(len(reader)):
+            meta = reader.meta(k)
+            seq = reader.frames(k)
+            print(f"#{meta.get('index')} tuile {tuple(meta['coord'])} : {len(seq)} images, "
+                  f"{seq.nbytes / 1024:.0f} Kio, grille {meta['n']}×{meta['m']} case {meta['cell']}")
+        reader.close()
+        sys.exit(0)
+    CONFIG["frame_source"] = args.source
+    CONFIG["replay_dir"] = args.replay
+    CONFIG["replay_realtime"] = not args.replay_steps
+    CONFIG["record_dir"] = args.record
+    CONFIG["composite_renderer"] = CONFIG["composite_renderer"] or args.composite
+    CONFIG["latency_export"] = args.latency or CONFIG["latency_export"]
+    CONFIG["latency_in_status"] = CONFIG["latency_in_status"] or args.latency_status
+    CONFIG["session_file"] = args.session or CONFIG["session_file"]
+    CONFIG["multi_client"] = CONFIG["multi_client"] or args.multi
+    CONFIG["auto_calibrate"] = CONFIG["auto_calibrate"] and not args.no_calibration
+    CONFIG["calibration_cache"] = args.calibration_cache or CONFIG["calibration_cache"]
+    CONFIG["warm_start"] = CONFIG["warm_start"] and not args.reconfigure
+    CONFIG["resample_quality"] = args.quality or CONFIG["resample_quality"]
+    CONFIG["capture_reduce"] = CONFIG["capture_reduce"] or args.capture_reduce
+    if args.resize_processes is not None:
+        CONFIG["resize_processes"] = max(0, args.resize_processes)
+    if args.preroll is not None:
+        CONFIG["preroll"] = max(0.0, args.preroll)
     QuadGridNodesApp()